@@ -5,37 +5,91 @@ os.environ['GLOG_minloglevel'] = '3'
 import cv2
 import mediapipe as mp
 import numpy as np
-import socket
-import json
+import threading
 sys.path.append('..')
-from computerVisionModules import head, elbows, Landmarks
+from computerVisionModules import head, elbows, Landmarks, roi
 from outputModule import output
+from pipelineModule import pipeline, metrics, scheduler, preview, recording, sender
 
 # Configuración de constantes
 ANGLE_TYPE = "Degree"
 TARGET_FPS = 30
 SOCKET_TIMEOUT = 2.0
+RECONNECT_BACKOFF_MAX = 10.0  # Segundos máximos entre reintentos de conexión con el robot
+PIPELINED = True          # Captura, inferencia y visualización en hilos separados
+STATS_INTERVAL = 5.0      # Segundos entre reportes de colas del pipeline
+WINDOW_NAME = "NAO Robot - Seguimiento Postural"
+DISPLAY_MODE = "window"   # "window", "preview" (hilo aparte, reducido) o "headless" (sin dibujo)
+PREVIEW_FPS = 5.0
+PREVIEW_SCALE = 0.5
+PREVIEW_PATH = None       # Ruta JPEG para la vista previa en lugar de una ventana
+WIRE_FORMAT = "json"      # "json" o "binary" (outputModule/protocol.py)
+TRANSPORT = "tcp"         # "tcp" o "udp" (un datagrama por pose, con secuencia)
+ROI_ENABLED = True        # Inferencia sobre recortes alrededor de la persona/cabeza
+ROI_MAX_SIDE = 480        # Lado máximo del recorte enviado a los modelos (None = sin reducir)
+POSE_EVERY = 1            # Ejecutar Pose cada N frames inferidos
+FACE_EVERY = 3            # Ejecutar FaceMesh cada N frames inferidos
+MOTION_THRESHOLD = 1.5    # Diferencia media (0-255) para considerar movimiento; None = siempre inferir
+MAX_IDLE_FRAMES = 15      # Frames seguidos sin inferencia como máximo
+EXTRAPOLATE = True        # Extrapolar ángulos entre inferencias (si no, se mantienen)
+ADAPTIVE_QUALITY = True   # Bajar/subir calidad según el costo real por frame
+LOW_RESOLUTION_SCALE = 0.5  # Escala de entrada en el nivel "low_resolution"
+METRICS_ENABLED = True    # Histogramas de latencia por etapa
+METRICS_EXPORT_PATH = "vision_metrics.prom"  # .prom (Prometheus) o .csv; None para desactivar
+RECORD_PATH = None        # Grabar landmarks por frame para reproducirlos con replay.py
+
+# Dibujos que se desactivan en el nivel de calidad "no_overlays"
+OVERLAY_KEYS = ("HeadText", "HeadMesh", "ElbowsText", "DrawSkeleton", "MetricsText")
 
 class VisionSystem:
     def __init__(self):
         self.cap = None
         self.face_mesh = None
         self.pose = None
-        self.client_socket = None
-        self.last_frame_time = 0
+        self.face_mesh_crop = None  # Instancias sin tracking para los recortes del ROI
+        self.pose_crop = None
+        self.sender = None  # Envío en segundo plano (pipelineModule/sender.py)
         self.program_output = output.Output()
+        self.metrics = metrics.StageMetrics(enabled=METRICS_ENABLED)
+        self.scheduler = scheduler.InferenceScheduler(
+            pose_every=POSE_EVERY, face_every=FACE_EVERY,
+            motion_threshold=MOTION_THRESHOLD, max_idle_frames=MAX_IDLE_FRAMES)
+        self.extrapolator = scheduler.AngleExtrapolator(len(self.program_output.joints.radians))
+        self.head_mask = output.group_mask("Head")
+        self.elbows_mask = output.group_mask("Elbows")
+        self.last_body_results = None
+        self.last_face_results = None
+        self.deadline = scheduler.DeadlineScheduler(
+            TARGET_FPS, max_level=None if ADAPTIVE_QUALITY else 0)
+        self.inference_scale = 1.0
+        self.pose_complexity = 1
+        self.preview = None
+        self.recorder = None
+        self.frame_id = 0
+        self.inferred = False  # Si el último process_frame ejecutó algún modelo
         self.landmark_handler = Landmarks.Landmarks()
         self.elbows_processor = elbows.Elbows()
+        self.head_estimator = head.HeadPoseEstimator()
+        self.body_roi = roi.RoiTracker(padding=0.3, max_side=ROI_MAX_SIDE, enabled=ROI_ENABLED)
+        self.face_roi = roi.RoiTracker(landmark_ids=roi.HEAD_LANDMARKS, padding=0.8,
+                                       min_size=0.1, max_side=ROI_MAX_SIDE, enabled=ROI_ENABLED)
         
         # Configuración inicial
         self.interface_inputs = {
             "Head": True,
             "HeadText": True,
+            "HeadMesh": True,
             "Elbows": True,
             "ElbowsText": True,
             "DrawSkeleton": True,
+            "MetricsText": True,
             "BlackBackground": False
         }
+        if DISPLAY_MODE != "window":
+            # Sin ventana: el camino de inferencia no dibuja nada
+            for key in OVERLAY_KEYS:
+                self.interface_inputs[key] = False
+        self.overlay_defaults = {key: self.interface_inputs[key] for key in OVERLAY_KEYS}
 
     def init_camera(self):
         """Inicializa la cámara con múltiples intentos y backends"""
@@ -52,90 +106,289 @@ class VisionSystem:
         return None
 
     def connect_to_nao(self, ip='127.0.0.1', port=65432):
-        """Establece conexión con el robot NAO"""
-        try:
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.settimeout(SOCKET_TIMEOUT)
-            self.client_socket.connect((ip, port))
-            print("Conectado al robot NAO")
-            return True
-        except Exception as e:
-            print(f"Error de conexión con NAO: {str(e)}")
-            self.client_socket = None
-            return False
+        """Arranca el envío al robot NAO; la conexión y las reconexiones
+        ocurren en el hilo del emisor, sin bloquear la captura"""
+        self.sender = sender.PoseSender(ip, port, TRANSPORT, WIRE_FORMAT, SOCKET_TIMEOUT,
+                                        backoff_max=RECONNECT_BACKOFF_MAX, metrics=self.metrics)
 
-    def process_frame(self, frame):
+    def process_frame(self, frame, capture_time=None):
         """Procesa un frame y devuelve los resultados"""
+        stage = self.metrics.stage
+        self.frame_id += 1
+        self.inferred = False
         try:
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            
-            # Detección de landmarks
-            face_results = self.face_mesh.process(image)
-            body_results = self.pose.process(image)
-            
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            
-            # Procesamiento de cabeza
-            if (self.interface_inputs["Head"] and 
-                face_results.multi_face_landmarks):
-                head_angle = head.get_head_positions(
-                    image, face_results, ANGLE_TYPE,
-                    show_text=self.interface_inputs["HeadText"]
-                )
-                self.program_output.output["Angles"]["Head"] = head_angle
-            
-            # Procesamiento de codos
-            if (self.interface_inputs["Elbows"] and 
-                body_results.pose_landmarks):
-                body_info = self.landmark_handler.get_body_landmarks_info(body_results, image)
-                elbows_angle = self.elbows_processor.get_elbows_info(
-                    image, body_info, ANGLE_TYPE,
-                    show_text=self.interface_inputs["ElbowsText"]
-                )
-                self.program_output.output["Angles"]["Elbows"] = elbows_angle
+            with stage("process"):
+                if self.inference_scale < 1.0:
+                    with stage("downscale"):
+                        frame = cv2.resize(frame, None, fx=self.inference_scale,
+                                           fy=self.inference_scale, interpolation=cv2.INTER_AREA)
+
+                # Cada modelo corre a su ritmo; sin movimiento no se infiere nada
+                with stage("schedule"):
+                    run_pose, run_face = self.scheduler.plan(frame)
+                self.inferred = run_pose or run_face
+
+                if run_pose or run_face:
+                    with stage("to_rgb"):
+                        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                        image.flags.writeable = False
+                    
+                    # Detección de landmarks: la pose usa el ROI del frame anterior y
+                    # FaceMesh un recorte alrededor de la cabeza de la pose actual
+                    if run_pose:
+                        with stage("pose"):
+                            self.last_body_results = self.body_roi.process(
+                                self.pose, image, roi.pose_landmark_lists, self.pose_crop)
+                            self.body_roi.update(self.last_body_results.pose_landmarks)
+                    if run_face:
+                        with stage("face_mesh"):
+                            if self.last_body_results is not None:
+                                self.face_roi.update(self.last_body_results.pose_landmarks)
+                            self.last_face_results = self.face_roi.process(
+                                self.face_mesh, image, roi.face_landmark_lists, self.face_mesh_crop)
+                    
+                    if self.needs_annotation():
+                        with stage("to_bgr"):
+                            image.flags.writeable = True
+                            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+                    else:
+                        image = frame  # Nada que dibujar: se evita la conversión de vuelta
+
+                    if self.recorder is not None:
+                        with stage("record"):
+                            self.recorder.record(
+                                self.frame_id, capture_time or time.time(), frame.shape,
+                                self.last_body_results if run_pose else None,
+                                self.last_face_results if run_face else None)
+                else:
+                    image = frame
+
+                # Entre inferencias se reutilizan los últimos resultados
+                body_results = self.last_body_results
+                face_results = self.last_face_results
+                head_measured = elbows_measured = False
                 
-                if self.interface_inputs["DrawSkeleton"]:
-                    mp.solutions.drawing_utils.draw_landmarks(
-                        image, body_results.pose_landmarks, 
-                        mp.solutions.pose.POSE_CONNECTIONS,
-                        mp.solutions.drawing_utils.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2),
-                        mp.solutions.drawing_utils.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-                    )
-            
-            return image, self.program_output.output
+                # Procesamiento de cabeza (solvePnP y malla)
+                if (run_face and self.interface_inputs["Head"] and 
+                    face_results.multi_face_landmarks):
+                    with stage("head"):
+                        self.head_estimator.draw_mesh = self.interface_inputs["HeadMesh"]
+                        head_angle = self.head_estimator.get_head_positions(
+                            image, face_results, ANGLE_TYPE,
+                            show_text=self.interface_inputs["HeadText"],
+                            timestamp=capture_time
+                        )
+                        self.program_output.set_group("Head", head_angle)
+                        head_measured = True
+                elif run_face and not face_results.multi_face_landmarks:
+                    # Cara perdida: el siguiente solvePnP no arranca de la pose vieja
+                    self.head_estimator.reset()
+                
+                # Procesamiento de codos
+                if (run_pose and self.interface_inputs["Elbows"] and 
+                    body_results.pose_landmarks):
+                    with stage("elbows"):
+                        body_info = self.landmark_handler.get_body_landmarks_array(body_results, image)
+                        elbows_angle = self.elbows_processor.get_elbows_info(
+                            image, body_info, ANGLE_TYPE,
+                            show_text=self.interface_inputs["ElbowsText"],
+                            timestamp=capture_time
+                        )
+                        self.program_output.set_group("Elbows", elbows_angle["Angles"]["Elbows"])
+                        elbows_measured = True
+
+                self.update_extrapolation(head_measured, elbows_measured)
+                    
+                if (body_results is not None and body_results.pose_landmarks and
+                        self.interface_inputs["DrawSkeleton"]):
+                    with stage("draw"):
+                        mp.solutions.drawing_utils.draw_landmarks(
+                            image, body_results.pose_landmarks, 
+                            mp.solutions.pose.POSE_CONNECTIONS,
+                            mp.solutions.drawing_utils.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2),
+                            mp.solutions.drawing_utils.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
+                        )
+                
+                return image, self.program_output.output
         
         except Exception as e:
             print(f"Error en procesamiento: {str(e)}")
             return frame, None
 
-    def send_to_nao(self, data):
-        """Envía datos al NAO con manejo de errores"""
-        if not self.client_socket:
-            return False
-            
-        try:
-            self.client_socket.sendall((json.dumps(data) + "\n").encode('utf-8'))
-            return True
-        except Exception as e:
-            print(f"Error en envío de datos: {str(e)}")
-            self.client_socket = None
+    def update_extrapolation(self, head_measured, elbows_measured):
+        """Registra los ángulos medidos en este frame y extrapola el resto.
+
+        Solo cuenta como medición un grupo que se recalculó (modelo ejecutado,
+        detección presente y grupo activo); lo demás conserva el valor
+        extrapolado, que nunca se vuelve a registrar como medido.
+        """
+        now = time.monotonic()
+        joints = self.program_output.joints
+        measured = np.zeros_like(self.head_mask)
+        if head_measured:
+            measured |= self.head_mask
+        if elbows_measured:
+            measured |= self.elbows_mask
+        self.extrapolator.update(now, joints.radians, measured)
+
+        skipped = (self.head_mask | self.elbows_mask) & ~measured
+        if EXTRAPOLATE and skipped.any() and self.extrapolator.predict(now, joints.radians, skipped):
+            joints.version += 1
+
+    def needs_annotation(self):
+        return any(self.interface_inputs[key] for key in OVERLAY_KEYS)
+
+    def present(self, image):
+        """Muestra o entrega el frame según DISPLAY_MODE; devuelve True para salir"""
+        if DISPLAY_MODE == "window":
+            return self.show_frame(image) == ord('q')
+        if self.preview is not None:
+            body_results = self.last_body_results
+            self.preview.submit(image, body_results.pose_landmarks if body_results else None,
+                                self.program_output.joints)
+            return self.preview.quit_requested
+        return False
+
+    def poll_quit(self):
+        """Atiende la ventana cuando no hay frame nuevo; devuelve True para salir"""
+        if DISPLAY_MODE == "window":
+            return cv2.waitKey(1) & 0xFF == ord('q')
+        return self.preview is not None and self.preview.quit_requested
+
+    def show_frame(self, image):
+        """Muestra el frame (con resumen de latencia opcional) y devuelve la tecla"""
+        with self.metrics.stage("imshow"):
+            if self.interface_inputs["MetricsText"] and self.metrics.enabled:
+                total = self.metrics.histograms.get("process")
+                if total is not None:
+                    cv2.putText(image, f"process p50 {total.percentile(50):.0f} ms  p95 {total.percentile(95):.0f} ms",
+                                (10, image.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            cv2.imshow(WINDOW_NAME, image)
+            return cv2.waitKey(1) & 0xFF
+
+    def report_metrics(self, extra=None):
+        """Resumen periódico por stdout y exportación a archivo"""
+        if extra:
+            print(extra)
+        print(f"Inferencia: {self.scheduler.stats()} | calidad: {self.deadline.level_name}, "
+              f"deadlines perdidos: {self.deadline.missed_deadlines}")
+        if ROI_ENABLED:
+            print(f"ROI pose: {self.body_roi.stats()} | ROI cara: {self.face_roi.stats()}")
+        if self.sender is not None:
+            print(f"Envío: {self.sender.stats()}")
+            clock = self.sender.clock
+            if clock.offset is not None:
+                print(f"Reloj del robot: desfase {clock.offset * 1000:+.1f} ms, "
+                      f"ida y vuelta {clock.round_trip * 1000:.1f} ms")
+        if not self.metrics.enabled:
+            return
+        print(self.metrics.summary())
+        if METRICS_EXPORT_PATH:
+            try:
+                self.metrics.export(METRICS_EXPORT_PATH)
+            except OSError as e:
+                print(f"Error exportando métricas: {str(e)}")
+
+    def send_to_nao(self, capture_time=None, frame_id=0, inference_time=None):
+        """Entrega la pose actual al emisor; nunca espera a la red.
+
+        Si el envío anterior sigue en curso, la pose pendiente se reemplaza
+        (gana la más reciente). Cada mensaje lleva el bloque "Timing"
+        (outputModule/tracing.py) para el desglose de latencia del robot.
+        """
+        if self.sender is None:
             return False
+        if capture_time is None:
+            capture_time = time.time()
+        self.sender.submit(self.program_output.joints, capture_time, frame_id, inference_time)
+        return True
 
-    def run(self):
-        """Bucle principal del sistema de visión"""
-        # Inicializar modelos
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+    def init_models(self):
+        """Inicializa los modelos de MediaPipe"""
+        self.face_mesh = self.create_face_mesh()
+        self.pose = self.create_pose(self.pose_complexity)
+        if ROI_ENABLED:
+            # Los recortes cambian de caja en cada frame: sin tracking
+            self.face_mesh_crop = self.create_face_mesh(static_image_mode=True)
+            self.pose_crop = self.create_pose(self.pose_complexity, static_image_mode=True)
+
+    def create_face_mesh(self, static_image_mode=False):
+        return mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=static_image_mode,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5,
             max_num_faces=1
         )
-        
-        self.pose = mp.solutions.pose.Pose(
+
+    def create_pose(self, model_complexity, static_image_mode=False):
+        return mp.solutions.pose.Pose(
+            static_image_mode=static_image_mode,
             min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
+            min_tracking_confidence=0.5,
+            model_complexity=model_complexity
         )
+
+    def apply_quality_level(self, level):
+        """Aplica un nivel de scheduler.DeadlineScheduler.LEVELS (acumulativo).
+
+        Debe llamarse desde el hilo que ejecuta process_frame.
+        """
+        levels = scheduler.DeadlineScheduler.LEVELS
+        overlays = level < levels.index("no_overlays")
+        for key in OVERLAY_KEYS:
+            self.interface_inputs[key] = self.overlay_defaults[key] and overlays
+
+        self.inference_scale = LOW_RESOLUTION_SCALE if level >= levels.index("low_resolution") else 1.0
+
+        complexity = 0 if level >= levels.index("light_model") else 1
+        if complexity != self.pose_complexity:
+            self.pose.close()
+            self.pose = self.create_pose(complexity)
+            if self.pose_crop is not None:
+                self.pose_crop.close()
+                self.pose_crop = self.create_pose(complexity, static_image_mode=True)
+            self.pose_complexity = complexity
+            self.body_roi.reset()
+            self.last_body_results = None
+
+    def process_with_deadline(self, frame, capture_time=None):
+        """process_frame midiendo su costo y ajustando la calidad.
+
+        Devuelve (None, None) si el nivel de calidad actual omite el frame.
+        """
+        if self.deadline.should_skip():
+            return None, None
+        start = time.monotonic()
+        result = self.process_frame(frame, capture_time)
+        cost = time.monotonic() - start
+        # Solo los frames inferidos miden la carga real de la calidad actual
+        level = self.deadline.record(cost) if self.inferred else None
+        if level is not None:
+            self.apply_quality_level(level)
+        return result
+
+    def release(self):
+        """Libera cámara, ventana, socket y modelos"""
+        self.cap.release()
+        if self.preview is not None:
+            self.preview.close()
+        if DISPLAY_MODE == "window":
+            cv2.destroyAllWindows()
+        if self.sender is not None:
+            self.sender.close()
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"Grabación: {self.recorder.frames} frames en {RECORD_PATH}")
+        self.face_mesh.close()
+        self.pose.close()
+        if self.pose_crop is not None:
+            self.face_mesh_crop.close()
+            self.pose_crop.close()
+
+    def run(self):
+        """Bucle principal del sistema de visión"""
+        # Inicializar modelos
+        self.init_models()
         
         # Inicializar cámara
         self.cap = self.init_camera()
@@ -145,43 +398,125 @@ class VisionSystem:
         
         # Conectar con NAO (opcional)
         self.connect_to_nao()
-        
-        # Bucle principal
+
+        if RECORD_PATH:
+            self.recorder = recording.LandmarkRecorder(RECORD_PATH)
+
+        if DISPLAY_MODE == "preview":
+            self.preview = preview.PreviewRenderer(WINDOW_NAME, PREVIEW_FPS, PREVIEW_SCALE, PREVIEW_PATH)
+        elif DISPLAY_MODE == "headless":
+            print("Modo headless: Ctrl+C para salir")
+
+        try:
+            if PIPELINED:
+                self.run_pipelined()
+            else:
+                self.run_serial()
+        except KeyboardInterrupt:
+            pass
+
+        # Liberar recursos
+        self.release()
+
+    def run_serial(self):
+        """Captura, inferencia, visualización y envío en un solo hilo"""
+        last_stats = time.monotonic()
         while True:
-            # Control de FPS
-            current_time = time.time()
-            elapsed = current_time - self.last_frame_time
-            if elapsed < 1.0/TARGET_FPS:
-                time.sleep((1.0/TARGET_FPS) - elapsed)
-            self.last_frame_time = current_time
+            # Control de FPS por deadlines absolutos
+            self.deadline.wait_for_next_frame()
             
             # Capturar frame
-            ret, frame = self.cap.read()
+            with self.metrics.stage("capture"):
+                ret, frame = self.cap.read()
+            capture_time = time.time()
             if not ret:
                 print("Error: No se pudo capturar frame")
                 break
             
-            # Procesar frame
-            processed_frame, angles = self.process_frame(frame)
-            
-            # Mostrar resultados
-            cv2.imshow("NAO Robot - Seguimiento Postural", processed_frame)
+            # Procesar frame (puede omitirse en el nivel de calidad más bajo)
+            processed_frame, angles = self.process_with_deadline(frame, capture_time)
+            if processed_frame is None:
+                continue
+            inference_time = time.time()
             
             # Enviar datos al NAO
-            if angles and self.client_socket:
-                self.send_to_nao(angles)
+            if angles:
+                self.send_to_nao(capture_time, self.frame_id, inference_time)
             
-            # Salir con 'Q'
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # Mostrar resultados y salir con 'Q'
+            if self.present(processed_frame):
                 break
-        
-        # Liberar recursos
-        self.cap.release()
-        cv2.destroyAllWindows()
-        if self.client_socket:
-            self.client_socket.close()
-        self.face_mesh.close()
-        self.pose.close()
+
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                self.report_metrics()
+                last_stats = now
+
+    def run_pipelined(self):
+        """Captura -> inferencia -> visualización/envío en hilos separados.
+
+        Las etapas se conectan con buffers de una posición que descartan
+        frames viejos, así la latencia cámara-robot es un tiempo de
+        inferencia y no la suma de todas las etapas.
+        """
+        stop_event = threading.Event()
+        capture_slot = pipeline.LatestSlot("capture")
+        result_slot = pipeline.LatestSlot("inference")
+
+        def capture_step():
+            with self.metrics.stage("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                print("Error: No se pudo capturar frame")
+                return False
+            capture_slot.put((time.time(), frame))
+
+        def inference_step():
+            item = capture_slot.get(timeout=0.1)
+            if item is None:
+                return
+            capture_time, frame = item
+            processed_frame, angles = self.process_with_deadline(frame, capture_time)
+            if processed_frame is None:
+                return
+            # Se envía desde aquí, antes de la visualización, con los ángulos de este frame
+            if angles:
+                self.send_to_nao(capture_time, self.frame_id, time.time())
+            result_slot.put(processed_frame)
+
+        threads = [
+            pipeline.StageThread("capture", capture_step, stop_event),
+            pipeline.StageThread("inference", inference_step, stop_event)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # La ventana de OpenCV (modo "window") debe atenderse desde el hilo principal
+        last_stats = time.monotonic()
+        try:
+            while not stop_event.is_set():
+                processed_frame = result_slot.get(timeout=0.1)
+                if processed_frame is not None:
+                    quit_requested = self.present(processed_frame)
+                else:
+                    quit_requested = self.poll_quit()
+
+                if quit_requested:
+                    break
+
+                now = time.monotonic()
+                if now - last_stats >= STATS_INTERVAL:
+                    slots = [capture_slot, result_slot]
+                    if self.sender is not None:
+                        slots.append(self.sender.slot)
+                    self.report_metrics("Pipeline -> " + pipeline.format_stats(slots))
+                    last_stats = now
+        finally:
+            stop_event.set()
+            capture_slot.close()
+            result_slot.close()
+            for thread in threads:
+                thread.join(timeout=1.0)
 
 if __name__ == "__main__":
     vision_system = VisionSystem()
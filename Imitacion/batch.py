@@ -0,0 +1,182 @@
+"""Procesamiento offline de videos grabados.
+
+Divide cada video en tramos, los procesa en paralelo con un pool de
+procesos (cada tramo con sus propias instancias de Pose/FaceMesh) y guarda
+por video un archivo NPZ columnar con landmarks y ángulos por frame.
+
+Uso:
+    python batch.py sesion1.mp4 sesion2.mp4 --output-dir datos --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from computerVisionModules import elbows, head, Landmarks
+from computerVisionModules.Landmarks import NUM_BODY_LANDMARKS
+from outputModule import output, protocol
+
+ANGLE_TYPE = "Degree"
+CHUNK_FRAMES = 900     # Frames por tramo (30 s a 30 FPS)
+WARMUP_FRAMES = 30     # Frames previos procesados y descartados para estabilizar el tracking
+
+# Opciones del proceso trabajador (se fijan en init_worker)
+_worker = {}
+
+
+def init_worker(filter_on):
+    _worker["filter_on"] = filter_on
+
+
+def create_models():
+    """Pose/FaceMesh en modo tracking, nuevos para cada tramo"""
+    face_mesh = mp.solutions.face_mesh.FaceMesh(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+        max_num_faces=1)
+    pose = mp.solutions.pose.Pose(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5)
+    return face_mesh, pose
+
+
+def plan_chunks(path, chunk_frames=CHUNK_FRAMES, warmup_frames=WARMUP_FRAMES):
+    """Devuelve los tramos (path, warmup_start, start, end) de un video"""
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total <= 0:
+        raise ValueError(f"No se pudo leer el número de frames de {path}")
+    return [(path, max(0, start - warmup_frames), start, min(start + chunk_frames, total))
+            for start in range(0, total, chunk_frames)]
+
+
+def process_chunk(task):
+    """Procesa un tramo y devuelve sus columnas (solo frames fuera del warm-up)"""
+    path, warmup_start, start, end = task
+
+    # Estado de tracking/filtrado nuevo en cada tramo (modelos incluidos, para
+    # no arrastrar el tracking del tramo o video anterior); el warm-up lo estabiliza
+    face_mesh, pose = create_models()
+    landmark_handler = Landmarks.Landmarks()
+    elbows_processor = elbows.Elbows()
+    elbows_processor.filter_on = _worker["filter_on"]
+    head_estimator = head.HeadPoseEstimator(draw_mesh=False, filter_on=_worker["filter_on"])
+    joint_state = output.JointState()
+
+    size = end - start
+    columns = {
+        "frame_index": np.arange(start, end, dtype=np.int32),
+        "timestamp_ms": np.full(size, np.nan),
+        "pose_landmarks": np.full((size, NUM_BODY_LANDMARKS, 4), np.nan, dtype=np.float32),
+        "body_angles": np.full((size, len(landmark_handler.joint_angle_engine.joint_ids)),
+                               np.nan, dtype=np.float32),
+        "joint_radians": np.full((size, protocol.NUM_JOINTS), np.nan, dtype=np.float32),
+        "image_size": np.zeros(2, dtype=np.int32),  # ancho, alto (landmarks en píxeles)
+    }
+
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+    try:
+        for frame_index in range(warmup_start, end):
+            success, frame = cap.read()
+            if not success:
+                break
+            row = frame_index - start
+            timestamp = frame_index / fps  # Tiempo del video: los filtros no dependen del ritmo del proceso
+            if row >= 0:
+                columns["timestamp_ms"][row] = frame_index * 1000.0 / fps
+                columns["image_size"] = np.array(frame.shape[1::-1], dtype=np.int32)
+
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            image.flags.writeable = False
+            face_results = face_mesh.process(image)
+            body_results = pose.process(image)
+
+            # Articulaciones sin detección en este frame quedan como NaN
+            joint_state.radians[:] = np.nan
+            head_angle = head_estimator.get_head_positions(frame, face_results, ANGLE_TYPE, show_text=False,
+                                                           timestamp=timestamp)
+            joint_state.set_group("Head", head_angle)
+
+            if body_results.pose_landmarks:
+                body_info = landmark_handler.get_body_landmarks_array(body_results, frame)
+                elbows_angle = elbows_processor.get_elbows_info(frame, body_info, ANGLE_TYPE, show_text=False,
+                                                                timestamp=timestamp)
+                joint_state.set_group("Elbows", elbows_angle["Angles"]["Elbows"])
+                # Elbows conserva el último valor de un codo no visible: aquí va NaN
+                for joint_name, visible in zip(elbows.ELBOW_JOINTS, elbows_processor.visible):
+                    if not visible:
+                        joint_state.set(joint_name, None)
+                if row >= 0:
+                    columns["pose_landmarks"][row] = body_info
+                    degrees, visible = landmark_handler.get_joint_angles()
+                    columns["body_angles"][row] = np.where(visible, degrees, np.nan)
+
+            if row >= 0:
+                columns["joint_radians"][row] = joint_state.radians
+    finally:
+        cap.release()
+        face_mesh.close()
+        pose.close()
+    return columns
+
+
+def output_path(video_path, output_dir):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(output_dir, name + ".npz")
+
+
+def run_batch(videos, output_dir, workers=None, chunk_frames=CHUNK_FRAMES,
+              warmup_frames=WARMUP_FRAMES, filter_on=False):
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for video in videos:
+        tasks.extend(plan_chunks(video, chunk_frames, warmup_frames))
+    print(f"{len(videos)} videos, {len(tasks)} tramos")
+
+    start_time = time.time()
+    results = {video: [] for video in videos}
+    # "spawn": MediaPipe crea hilos internos que no sobreviven bien a fork
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=init_worker, initargs=(filter_on,)) as pool:
+        # imap conserva el orden de los tramos
+        for task, columns in zip(tasks, pool.imap(process_chunk, tasks)):
+            results[task[0]].append(columns)
+            print(f"Tramo {task[2]}-{task[3]} de {task[0]} listo")
+
+    total_frames = 0
+    landmark_handler = Landmarks.Landmarks()
+    for video, chunks in results.items():
+        merged = {key: np.concatenate([chunk[key] for chunk in chunks])
+                  for key in chunks[0] if key != "image_size"}
+        merged["image_size"] = chunks[0]["image_size"]
+        merged["joint_names"] = np.array(protocol.JOINT_NAMES)
+        merged["body_angle_ids"] = np.array(landmark_handler.joint_angle_engine.joint_ids)
+        np.savez_compressed(output_path(video, output_dir), **merged)
+        total_frames += len(merged["frame_index"])
+
+    elapsed = time.time() - start_time
+    print(f"{total_frames} frames en {elapsed:.1f} s ({total_frames / max(elapsed, 1e-9):.1f} FPS)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Procesa videos grabados a series de ángulos (NPZ)")
+    parser.add_argument("videos", nargs="+", help="Archivos de video")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto: núcleos)")
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES)
+    parser.add_argument("--warmup-frames", type=int, default=WARMUP_FRAMES)
+    parser.add_argument("--filter", action="store_true", help="Aplicar el filtro de ángulos de cabeza y codos")
+    args = parser.parse_args()
+    run_batch(args.videos, args.output_dir, args.workers, args.chunk_frames,
+              args.warmup_frames, args.filter)
+
+
+if __name__ == "__main__":
+    main()
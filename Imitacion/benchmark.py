@@ -0,0 +1,142 @@
+"""Micro-benchmarks sin cámara de las etapas por frame.
+
+Construye resultados sintéticos con la forma de MediaPipe (33 landmarks de
+pose, 468 de cara) y un frame sintético, y mide cada etapa por separado.
+
+Uso:
+    python benchmark.py                          # reporte
+    python benchmark.py --save baseline.json     # guardar línea base
+    python benchmark.py --compare baseline.json  # comparar (código 1 si hay regresión)
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from computerVisionModules import elbows, head, Landmarks, synthetic
+from outputModule import output, protocol
+
+ANGLE_TYPE = "Degree"
+REGRESSION_THRESHOLD = 0.25  # p50 un 25 % más lento que la línea base
+
+
+def build_stages(width=640, height=480):
+    """Devuelve {nombre: función sin argumentos} para cada etapa"""
+    frame = synthetic.make_frame(width, height)
+    pose_results = synthetic.make_pose_results()
+    face_results = synthetic.make_face_results()
+
+    landmark_handler = Landmarks.Landmarks()
+    body_array = landmark_handler.get_body_landmarks_array(pose_results, frame).copy()
+    elbows_processor = elbows.Elbows()
+    head_estimator = head.HeadPoseEstimator(draw_mesh=False)
+    points = (body_array[11], body_array[13], body_array[15])
+
+    program_output = output.Output()
+    program_output.set_group("Head", head_estimator.get_head_positions(frame, face_results, ANGLE_TYPE, False))
+    program_output.set_group("Elbows", elbows_processor.get_elbows_info(
+        frame, body_array, ANGLE_TYPE, show_text=False)["Angles"]["Elbows"])
+    json_path = os.path.join(tempfile.gettempdir(), "benchmark_output.json")
+
+    def json_dumps():
+        program_output.joints.version += 1  # fuerza reconstruir la vista
+        return json.dumps(program_output.output)
+
+    return {
+        "landmarks.get_body_landmarks_array": lambda: landmark_handler.get_body_landmarks_array(pose_results, frame),
+        "landmarks.get_body_landmarks_info": lambda: landmark_handler.get_body_landmarks_info(pose_results, frame),
+        "elbows.get_elbows_info": lambda: elbows_processor.get_elbows_info(frame, body_array, ANGLE_TYPE, show_text=False),
+        "utils.get_angle": lambda: elbows_processor.get_angle(points, frame, joint="LElbowRoll"),
+        "utils.apply_angle_filter": lambda: elbows_processor.apply_angle_filter(90.0, "LElbowRoll"),
+        "head.get_head_positions": lambda: head_estimator.get_head_positions(frame, face_results, ANGLE_TYPE, show_text=False),
+        "output.write_json_data": lambda: program_output.write_json_data(json_path),
+        "output.json_dumps": json_dumps,
+        "protocol.encode": lambda: program_output.joints.encode(0, 0.0),
+    }
+
+
+def measure(function, iterations, warmup=50):
+    """Tiempos por llamada (segundos)"""
+    for _ in range(warmup):
+        function()
+    times = np.empty(iterations)
+    clock = time.perf_counter
+    for i in range(iterations):
+        start = clock()
+        function()
+        times[i] = clock() - start
+    return times
+
+
+def summarize(times):
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {
+        "ops_per_sec": float(len(times) / times.sum()),
+        "p50_us": float(p50 * 1e6),
+        "p95_us": float(p95 * 1e6),
+        "p99_us": float(p99 * 1e6),
+    }
+
+
+def run(iterations, only=None):
+    results = {}
+    for name, function in build_stages().items():
+        if only and only not in name:
+            continue
+        results[name] = summarize(measure(function, iterations))
+    return results
+
+
+def print_report(results, baseline=None, threshold=REGRESSION_THRESHOLD):
+    header = f"{'etapa':40s} {'ops/s':>12s} {'p50 us':>10s} {'p95 us':>10s} {'p99 us':>10s}"
+    if baseline:
+        header += f" {'vs base':>9s}"
+    print(header)
+    regressions = []
+    for name, stats in results.items():
+        line = (f"{name:40s} {stats['ops_per_sec']:12.0f} {stats['p50_us']:10.1f} "
+                f"{stats['p95_us']:10.1f} {stats['p99_us']:10.1f}")
+        if baseline and name in baseline:
+            ratio = stats["p50_us"] / baseline[name]["p50_us"] - 1.0
+            line += f" {ratio:+8.0%}"
+            if ratio > threshold:
+                line += "  REGRESIÓN"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las etapas de visión sin cámara")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--only", help="Solo etapas cuyo nombre contiene este texto")
+    parser.add_argument("--save", help="Guardar resultados como línea base (JSON)")
+    parser.add_argument("--compare", help="Comparar con una línea base guardada")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Fracción de empeoramiento del p50 considerada regresión")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+    regressions = print_report(results, baseline, args.threshold)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"iterations": args.iterations, "protocol_packet_bytes": protocol.PACKET_SIZE,
+                       "results": results}, file, indent=2)
+        print(f"Línea base guardada en {args.save}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
+import time
 import cv2
 import mediapipe as mp
 import numpy as np
-from computerVisionModules import elbows, head, Landmarks
-from outputModule import output
+from computerVisionModules import elbows, head, Landmarks, roi
+from outputModule import output, channel
 
 # Inicialización de modelos MediaPipe
 mp_drawing = mp.solutions.drawing_utils
@@ -19,22 +20,40 @@ pose = mp_pose.Pose(
     min_detection_confidence=0.5,
     min_tracking_confidence=0.5)
 
+# Sin tracking para los recortes del ROI (cambian de caja en cada frame)
+face_mesh_crop = mp_face_mesh.FaceMesh(
+    static_image_mode=True,
+    min_detection_confidence=0.5,
+    max_num_faces=1)
+pose_crop = mp_pose.Pose(
+    static_image_mode=True,
+    min_detection_confidence=0.5)
+
 # Instancias de módulos propios
 elbows_processor = elbows.Elbows()
-head_processor = head  # Módulo con función get_head_positions()
+head_processor = head.HeadPoseEstimator()  # Pose de cabeza con arranque en caliente
 landmark_handler = Landmarks.Landmarks()
 program_output = output.Output()
+program_output.start_json_writer("./output.json", max_rate=10.0)  # Escritura en segundo plano
+pose_channel = channel.PoseChannelWriter()  # Pose para la simulación (memoria compartida)
 
 ANGLE_TYPE = "Degree"
 
-def run_computer_vision(frame):
+# Recortes alrededor de la persona y de la cabeza antes de la inferencia
+body_roi = roi.RoiTracker(padding=0.3, max_side=480)
+face_roi = roi.RoiTracker(landmark_ids=roi.HEAD_LANDMARKS, padding=0.8, min_size=0.1, max_side=480)
+
+def run_computer_vision(frame, capture_time=None, frame_id=0):
     # Convertir la imagen a RGB
     image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     image.flags.writeable = False
     
-    # Detección de landmarks
-    face_results = face_mesh.process(image)
-    body_results = pose.process(image)
+    # Detección de landmarks (pose sobre el ROI previo, cara sobre la cabeza de la pose)
+    body_results = body_roi.process(pose, image, roi.pose_landmark_lists, pose_crop)
+    body_roi.update(body_results.pose_landmarks)
+    face_roi.update(body_results.pose_landmarks)
+    face_results = face_roi.process(face_mesh, image, roi.face_landmark_lists, face_mesh_crop)
+    inference_time = time.time()
     
     image.flags.writeable = True
     image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
@@ -45,7 +64,7 @@ def run_computer_vision(frame):
         return image
     
     # Obtener info de landmarks para cálculo de ángulos
-    body_info = landmark_handler.get_body_landmarks_info(body_results, image)
+    body_info = landmark_handler.get_body_landmarks_array(body_results, image)
     
     # Calcular ángulo de cabeza
     head_angle = {"Pitch": {"Degree": 0, "Radian": 0},
@@ -53,14 +72,18 @@ def run_computer_vision(frame):
                   "Yaw": {"Degree": 0, "Radian": 0}}
     
     if face_results.multi_face_landmarks:
-        head_angle = head_processor.get_head_positions(image, face_results, ANGLE_TYPE, show_text=True)
+        head_angle = head_processor.get_head_positions(image, face_results, ANGLE_TYPE, show_text=True,
+                                                       timestamp=capture_time)
+    else:
+        head_processor.reset()  # Cara perdida: sin arranque en caliente en la siguiente
     
     # Calcular ángulos de codos
-    elbows_angle = elbows_processor.get_elbows_info(image, body_info, ANGLE_TYPE, show_text=True)
+    elbows_angle = elbows_processor.get_elbows_info(image, body_info, ANGLE_TYPE, show_text=True,
+                                                    timestamp=capture_time)
     
     # Actualizar salida
-    program_output.output["Angles"]["Head"] = head_angle
-    program_output.output["Angles"]["Elbows"] = elbows_angle
+    program_output.set_group("Head", head_angle)
+    program_output.set_group("Elbows", elbows_angle["Angles"]["Elbows"])
     
     # Dibujar esqueleto
     mp_drawing.draw_landmarks(
@@ -69,8 +92,12 @@ def run_computer_vision(frame):
         mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
     )
     
-    # Guardar resultados en JSON (puedes reducir la frecuencia para mejor rendimiento)
-    program_output.write_json_data("./output.json")
+    # Publicar la pose en memoria compartida (lectura sin locks en la simulación)
+    pose_channel.write_joints(program_output.joints, capture_time,
+                              frame_id=frame_id, inference_time=inference_time)
+
+    # Guardar resultados en JSON desde el hilo de fondo (último estado gana)
+    program_output.submit_json_data()
     
     return image
 
@@ -81,14 +108,17 @@ cap = cv2.VideoCapture(0)  # 0 para cámara predeterminada
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
 
+frame_id = 0
 while cap.isOpened():
     success, frame = cap.read()
+    capture_time = time.time()
+    frame_id += 1
     if not success:
         print("No se pudo obtener frame de la cámara")
         break
     
     # Procesar frame
-    processed_frame = run_computer_vision(frame)
+    processed_frame = run_computer_vision(frame, capture_time, frame_id)
     
     # Mostrar resultado
     cv2.imshow('Seguimiento Postural', processed_frame)
@@ -100,4 +130,8 @@ while cap.isOpened():
 
 # Liberar recursos
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+cv2.destroyAllWindows()
+pose_channel.close()
+program_output.json_writer.close()
+print(f"JSON: {program_output.json_writer.stats()}")
+print(f"ROI pose: {body_roi.stats()} | ROI cara: {face_roi.stats()}")
\ No newline at end of file
@@ -1,19 +1,46 @@
 # Landmarks.py
+import numpy as np
 from computerVisionModules import Utils
+from computerVisionModules.angles import AngleEngine
+
+NUM_BODY_LANDMARKS = 33
 
 class Landmarks(Utils.Utils):
     def __init__(self):
         super().__init__()
         self.body_landmarks_info = {}
+        # x, y, z (coordenadas de imagen) y visibilidad, reutilizado en cada frame
+        self.body_landmarks_array = np.zeros((NUM_BODY_LANDMARKS, 4), dtype=np.float64)
+        self._scale = np.ones(4, dtype=np.float64)
+        self._image_shape = None
+        # Ángulos de bodyComponents.JOINT_COMBINATIONS en una sola pasada
+        self.joint_angle_engine = AngleEngine.from_joint_combinations(
+            visibility_threshold=self.VISIBILITY_THRESHOLD)
 
-    def get_body_landmarks_info(self, results, image):
-        for id, landmark in enumerate(results.pose_landmarks.landmark):
-            x = landmark.x
-            y = landmark.y
-            z = landmark.z
-            visibility = landmark.visibility  
+    def get_body_landmarks_array(self, results, image):
+        """Rellena el array (33, 4) preasignado con los landmarks del frame"""
+        landmarks = results.pose_landmarks.landmark
+        values = np.fromiter(
+            (v for lm in landmarks for v in (lm.x, lm.y, lm.z, lm.visibility)),
+            dtype=np.float64, count=NUM_BODY_LANDMARKS * 4)
+
+        if image.shape[:2] != self._image_shape:
+            self._image_shape = image.shape[:2]
+            self._scale[0] = image.shape[1]
+            self._scale[1] = image.shape[0]
+            self._scale[2] = image.shape[1] / self.Z_MAGNITUDE
 
-            coordinates = self.get_coordinate_of_point((x, y, z), image)
-            self.body_landmarks_info[id] = coordinates + (visibility,)
+        np.multiply(values.reshape(NUM_BODY_LANDMARKS, 4), self._scale,
+                    out=self.body_landmarks_array)
+        return self.body_landmarks_array
 
+    def get_body_landmarks_info(self, results, image):
+        """Versión en dict {id: (x, y, z, visibility)} para compatibilidad"""
+        array = self.get_body_landmarks_array(results, image)
+        self.body_landmarks_info = dict(enumerate(map(tuple, array.tolist())))
         return self.body_landmarks_info
+
+    def get_joint_angles(self, dimension="3D"):
+        """Ángulos (grados) y visibilidad de todas las articulaciones de
+        JOINT_COMBINATIONS, en el orden de joint_angle_engine.joint_ids"""
+        return self.joint_angle_engine.compute(self.body_landmarks_array, dimension)
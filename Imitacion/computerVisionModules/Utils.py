@@ -1,11 +1,18 @@
 import numpy as np
 import cv2
 from computerVisionModules import bodyComponents 
+from computerVisionModules.filters import FilterBank
 
 class Utils:
-    def __init__(self, filter_on=True, filter_deviation=5, filter_difference=30, filter_frame_number=5):
+    def __init__(self, filter_on=True, filter_deviation=5, filter_difference=30, filter_frame_number=5,
+                 filter_method="wma", filter_keys=()):
+        """filter_keys: articulaciones del NAO ("LElbowRoll", ...) con estado de filtrado propio"""
         self.landmarks_name_id_dict = bodyComponents.BODY_LANDMARKS
-        self.previous_frames_angles = {"Left": [], "Right": []}
+        # Estado de filtrado preasignado por articulación (ver filters.FilterBank)
+        self.angle_filter = FilterBank(filter_keys, method=filter_method,
+                                       frame_number=filter_frame_number,
+                                       deviation=filter_deviation,
+                                       difference=filter_difference)
         self.filter_deviation = filter_deviation
         self.filter_difference = filter_difference
         self.filter_frame_number = filter_frame_number
@@ -30,23 +37,22 @@ class Utils:
         """Verifica si los puntos son visibles según su score de confianza"""
         return all(point[3] > self.VISIBILITY_THRESHOLD for point in points)
 
-    def get_angle(self, points, image, dimension="3D", side="Left"):
+    def get_angle(self, points, image, dimension="3D", joint=None, timestamp=None):
         """Calcula el ángulo entre tres puntos en 3D (o 2D si se especifica)
         
         Args:
-            points: Tupla de 3 puntos de landmarks
-            image: Imagen numpy array para obtener dimensiones
+            points: Tupla de 3 puntos de landmarks ya en coordenadas de imagen
+                (ver Landmarks.get_body_landmarks_array)
+            image: Imagen numpy array (se mantiene por compatibilidad)
             dimension: "3D" o "2D" para tipo de cálculo
-            side: "Left" o "Right" para filtrado independiente
+            joint: Articulación del NAO cuyo filtro se aplica (None = sin filtro)
+            timestamp: Instante de captura del frame (segundos), para los filtros temporales
         """
         if not self.is_points_visible(points):
             print("Aviso: Puntos no visibles para cálculo de ángulo preciso")
             return None
 
-        p1, p2, p3 = points
-        coord_p1 = self.get_coordinate_of_point(p1, image)
-        coord_p2 = self.get_coordinate_of_point(p2, image)
-        coord_p3 = self.get_coordinate_of_point(p3, image)
+        coord_p1, coord_p2, coord_p3 = (point[:3] for point in points)
 
         if dimension == "3D":
             degree = self.calculate_3d_angle(coord_p1, coord_p2, coord_p3)
@@ -54,8 +60,12 @@ class Utils:
             points_2d = self.get_dimension_axis(coord_p1, coord_p2, coord_p3, dimension)
             degree, _ = self.calculate_2d_angle(points_2d)
 
-        if self.filter_on:
-            degree = self.apply_angle_filter(degree, side)
+        return self.build_angle(degree, joint, timestamp)
+
+    def build_angle(self, degree, joint=None, timestamp=None):
+        """Aplica el filtro y devuelve el par Degree/Radian"""
+        if self.filter_on and joint is not None:
+            degree = self.apply_angle_filter(degree, joint, timestamp)
 
         return {
             "Degree": degree,
@@ -85,24 +95,6 @@ class Utils:
 
         return np.degrees(radian), radian
 
-    def apply_angle_filter(self, angle, side):
-        """Filtro mejorado con media móvil ponderada"""
-        if side not in self.previous_frames_angles:
-            return angle
-            
-        frames = self.previous_frames_angles[side]
-        frames.append(angle)
-        
-        if len(frames) > self.filter_frame_number:
-            frames.pop(0)
-        
-        # Media ponderada (más peso a valores recientes)
-        weights = np.linspace(1, 2, len(frames))
-        filtered = np.average(frames, weights=weights)
-        
-        # Solo aplicar si no hay cambio brusco
-        if abs(angle - filtered) < self.filter_difference:
-            if abs(angle - filtered) > self.filter_deviation:
-                return filtered
-                
-        return angle
\ No newline at end of file
+    def apply_angle_filter(self, angle, joint, timestamp=None):
+        """Filtra un ángulo con el estado propio de `joint` (sin filtro si no existe)"""
+        return self.angle_filter.update_one(joint, angle, timestamp)
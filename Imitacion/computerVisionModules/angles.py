@@ -0,0 +1,57 @@
+import numpy as np
+from computerVisionModules import bodyComponents
+
+
+class AngleEngine:
+    """Calcula en una sola pasada de NumPy los ángulos de varias ternas de landmarks.
+
+    Cada terna (a, b, c) define el ángulo en el vértice b entre los segmentos
+    b->a y b->c. Los índices se compilan una vez y los buffers de salida se
+    reutilizan en cada frame.
+    """
+
+    def __init__(self, triplets, visibility_threshold=0.5):
+        self.triplets = np.asarray(triplets, dtype=np.intp).reshape(-1, 3)
+        self.a = self.triplets[:, 0]
+        self.b = self.triplets[:, 1]
+        self.c = self.triplets[:, 2]
+        self.visibility_threshold = visibility_threshold
+
+        size = len(self.triplets)
+        self.degrees = np.zeros(size, dtype=np.float64)
+        self.visible = np.zeros(size, dtype=bool)
+
+    @classmethod
+    def from_joint_combinations(cls, combinations=None, **kwargs):
+        """Crea el motor a partir de un dict {joint_id: (a, b, c)}"""
+        if combinations is None:
+            combinations = bodyComponents.JOINT_COMBINATIONS
+        engine = cls(list(combinations.values()), **kwargs)
+        engine.joint_ids = list(combinations.keys())
+        return engine
+
+    def compute(self, landmarks, dimension="3D"):
+        """Devuelve (grados, visibles) para todas las ternas.
+
+        Args:
+            landmarks: Array (33, 4) con x, y, z en coordenadas de imagen y visibilidad
+            dimension: "3D" o "2D" (ignora z)
+        """
+        axes = 3 if dimension == "3D" else 2
+        points = landmarks[:, :axes]
+        ba = points[self.a] - points[self.b]
+        bc = points[self.c] - points[self.b]
+
+        dot = np.einsum("ij,ij->i", ba, bc)
+        norms = np.sqrt(np.einsum("ij,ij->i", ba, ba) * np.einsum("ij,ij->i", bc, bc))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cosine = dot / norms
+        np.clip(cosine, -1.0, 1.0, out=cosine)
+        np.degrees(np.arccos(cosine), out=self.degrees)
+
+        visibility = landmarks[:, 3]
+        np.logical_and.reduce(visibility[self.triplets] > self.visibility_threshold,
+                              axis=1, out=self.visible)
+        # Segmentos degenerados (puntos coincidentes) no dan un ángulo válido
+        self.visible &= norms > 0
+        return self.degrees, self.visible
@@ -1,15 +1,23 @@
 from computerVisionModules.Utils import Utils  # Importa la clase específica
+from computerVisionModules.angles import AngleEngine
 
 import numpy as np
 
+# Articulación del NAO de cada codo, en el orden de Elbows.elbows
+ELBOW_JOINTS = ("LElbowRoll", "RElbowRoll")
+
 class Elbows(Utils):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, filter_method="wma"):
+        """filter_method: "wma", "one_euro" o "kalman" (ver filters.FilterBank)"""
+        super().__init__(filter_method=filter_method, filter_keys=ELBOW_JOINTS)
         self.elbows = ["left_elbow", "right_elbow"]
         self.joint_combinations = {
             13: (11, 13, 15),  # left_elbow: (left_shoulder, left_elbow, left_wrist)
             14: (12, 14, 16)   # right_elbow: (right_shoulder, right_elbow, right_wrist)
         }
+        # Todas las ternas de codos se calculan en una sola pasada
+        self.angle_engine = AngleEngine.from_joint_combinations(
+            self.joint_combinations, visibility_threshold=self.VISIBILITY_THRESHOLD)
         # Estructura compatible con mover_codos_nao
         self.elbows_output = {
             "Angles": {
@@ -20,28 +28,44 @@ class Elbows(Utils):
             }
         }
         self.textColor = (250, 250, 250)
+        self.visible = np.zeros(len(self.elbows), dtype=bool)  # Codos calculados en la última llamada
+
+    def get_elbows_info(self, image, body_landmarks, angle_type="Degree", show_text=True, timestamp=None):
+        """Calcula el ángulo de ambos codos.
 
-    def get_elbows_info(self, image, body_landmarks, angle_type="Degree", show_text=True):
-        if isinstance(x, (int, float)) and isinstance(y, (int, float)):
-          self.visualize_text(image, (int(x + offset), int(y)), text, self.textColor)
+        Args:
+            body_landmarks: Array (33, 4) de Landmarks.get_body_landmarks_array
+                (también acepta el dict de get_body_landmarks_info)
+            timestamp: Instante de captura del frame (segundos); los filtros
+                One-Euro y Kalman lo usan en lugar del reloj actual
+        """
+        if isinstance(body_landmarks, dict):
+            body_landmarks = np.array([body_landmarks[i] for i in sorted(body_landmarks)])
 
-        for elbow in self.elbows:
-            elbow_id = self.landmarks_name_id_dict[elbow]
-            p1, p2, p3 = self.joint_combinations[elbow_id]
-            points = (body_landmarks[p1], body_landmarks[p2], body_landmarks[p3])
+        degrees, visible = self.angle_engine.compute(body_landmarks, dimension="3D")
+        self.visible = visible.copy()  # compute() reescribe su buffer en cada llamada
 
-            x = int(body_landmarks[elbow_id][0] * image.shape[1])
-            y = int(body_landmarks[elbow_id][1] * image.shape[0])
+        # Ambos codos se filtran en un solo paso; NaN = sin dato este frame
+        degrees = np.where(visible, degrees, np.nan)
+        if self.filter_on:
+            degrees = self.angle_filter.update(degrees, timestamp)
 
+        for index, elbow in enumerate(self.elbows):
             side = "Left" if elbow == "left_elbow" else "Right"
-            angle_data = self.get_angle(points, image, dimension="3D", side=side)
-            
-            if angle_data:
-                self.elbows_output["Angles"]["Elbows"][side]["Roll"] = angle_data
 
-                if show_text:
-                    text = f"({abs(angle_data[angle_type]):.1f})"
-                    offset = 20 if side == "Left" else -100
-                    self.visualize_text(image, (x+offset, y), text, self.textColor)
+            if not visible[index]:
+                print("Aviso: Puntos no visibles para cálculo de ángulo preciso")
+                continue
+
+            degree = float(degrees[index])
+            angle_data = {"Degree": degree, "Radian": np.deg2rad(degree)}
+            self.elbows_output["Angles"]["Elbows"][side]["Roll"] = angle_data
+
+            if show_text:
+                elbow_id = self.landmarks_name_id_dict[elbow]
+                x, y = body_landmarks[elbow_id][0], body_landmarks[elbow_id][1]
+                text = f"({abs(angle_data[angle_type]):.1f})"
+                offset = 20 if side == "Left" else -100
+                self.visualize_text(image, (x+offset, y), text, self.textColor)
 
-        return self.elbows_output
\ No newline at end of file
+        return self.elbows_output
@@ -0,0 +1,171 @@
+import time
+import numpy as np
+
+
+class FilterBank:
+    """Banco de filtros de ángulos sobre todas las articulaciones seguidas.
+
+    Cada articulación tiene su propio estado en arrays preasignados y todas se
+    actualizan en un solo paso vectorizado por frame. Métodos:
+
+        "wma":     media móvil ponderada (más peso a lo reciente) sobre un
+                   buffer circular, con las mismas reglas de desviación y
+                   diferencia del filtro original de Utils.
+        "one_euro": filtro One-Euro (suaviza en reposo, sigue rápido en movimiento).
+        "kalman":  Kalman de velocidad constante (ángulo y velocidad por articulación).
+
+    Los valores NaN en la entrada indican articulaciones sin dato en el
+    frame: no actualizan su estado y se devuelven tal cual.
+    """
+
+    METHODS = ("wma", "one_euro", "kalman")
+
+    def __init__(self, keys, method="wma", frame_number=5, deviation=5, difference=30,
+                 min_cutoff=1.0, beta=0.05, derivative_cutoff=1.0,
+                 process_noise=1000.0, measurement_noise=4.0):
+        if method not in self.METHODS:
+            raise ValueError(f"Método de filtro desconocido: {method}")
+        self.keys = list(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.method = method
+        size = len(self.keys)
+
+        # Media móvil ponderada
+        self.frame_number = frame_number
+        self.deviation = deviation
+        self.difference = difference
+        self.history = np.zeros((size, frame_number))
+        self.head = np.zeros(size, dtype=np.intp)
+        self.count = np.zeros(size, dtype=np.intp)
+        self._slots = np.arange(frame_number)
+
+        # One-Euro
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.value = np.zeros(size)
+        self.derivative = np.zeros(size)
+        self.last_time = np.full(size, np.nan)
+
+        # Kalman de velocidad constante: estado [ángulo, velocidad] y covarianza 2x2
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.rate = np.zeros(size)
+        self.p00 = np.zeros(size)
+        self.p01 = np.zeros(size)
+        self.p11 = np.zeros(size)
+
+        self.output = np.zeros(size)
+
+    def reset(self, key=None):
+        """Olvida el estado de una articulación (o de todas)"""
+        rows = slice(None) if key is None else self.index[key]
+        self.count[rows] = 0
+        self.head[rows] = 0
+        self.last_time[rows] = np.nan
+
+    def update(self, values, timestamp=None):
+        """Filtra un array con un valor por articulación (en el orden de `keys`)"""
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        if self.method == "wma":
+            filtered = self._update_wma(values, valid)
+        elif self.method == "one_euro":
+            filtered = self._update_one_euro(values, valid, timestamp)
+        else:
+            filtered = self._update_kalman(values, valid, timestamp)
+
+        np.copyto(self.output, values)
+        np.copyto(self.output, filtered, where=valid)
+        return self.output
+
+    def update_one(self, key, value, timestamp=None):
+        """Filtra una sola articulación; devuelve el valor sin cambios si la clave no existe"""
+        if key not in self.index:
+            return value
+        values = np.full(len(self.keys), np.nan)
+        values[self.index[key]] = value
+        return self.update(values, timestamp)[self.index[key]]
+
+    def _update_wma(self, values, valid):
+        rows = np.flatnonzero(valid)
+        self.history[rows, self.head[rows]] = values[rows]
+        self.head[rows] = (self.head[rows] + 1) % self.frame_number
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.frame_number)
+
+        # Antigüedad de cada posición del buffer (0 = la más reciente)
+        age = (self.head[:, None] - 1 - self._slots) % self.frame_number
+        count = self.count[:, None]
+        span = np.maximum(count - 1, 1)
+        # Equivalente a np.linspace(1, 2, count) de la más vieja a la más nueva
+        weights = np.where(age < count, 1.0 + (count - 1 - age) / span, 0.0)
+        total = weights.sum(axis=1)
+        total[total == 0] = 1.0
+        average = (weights * self.history).sum(axis=1) / total
+
+        # Solo aplicar si no hay cambio brusco
+        change = np.abs(values - average)
+        use_filtered = (change < self.difference) & (change > self.deviation)
+        return np.where(use_filtered, average, values)
+
+    def _elapsed(self, valid, timestamp):
+        dt = timestamp - self.last_time
+        first = valid & np.isnan(self.last_time)
+        dt = np.where(np.isnan(dt) | (dt <= 0), 1e-3, dt)
+        self.last_time[valid] = timestamp
+        return dt, first
+
+    def _update_one_euro(self, values, valid, timestamp):
+        dt, first = self._elapsed(valid, timestamp)
+
+        def alpha(cutoff):
+            tau = 1.0 / (2 * np.pi * cutoff)
+            return 1.0 / (1.0 + tau / dt)
+
+        raw_derivative = (values - self.value) / dt
+        a_d = alpha(self.derivative_cutoff)
+        derivative = self.derivative + a_d * (raw_derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * np.abs(derivative)
+        value = self.value + alpha(cutoff) * (values - self.value)
+
+        # La primera muestra inicializa el estado sin filtrar
+        value = np.where(first, values, value)
+        derivative = np.where(first, 0.0, derivative)
+        np.copyto(self.value, value, where=valid)
+        np.copyto(self.derivative, derivative, where=valid)
+        return self.value
+
+    def _update_kalman(self, values, valid, timestamp):
+        dt, first = self._elapsed(valid, timestamp)
+        q, r = self.process_noise, self.measurement_noise
+
+        # Predicción
+        angle = self.value + dt * self.rate
+        p00 = self.p00 + 2 * dt * self.p01 + dt * dt * self.p11 + q * dt ** 3 / 3
+        p01 = self.p01 + dt * self.p11 + q * dt ** 2 / 2
+        p11 = self.p11 + q * dt
+
+        # Corrección
+        gain0 = p00 / (p00 + r)
+        gain1 = p01 / (p00 + r)
+        residual = values - angle
+        angle = angle + gain0 * residual
+        rate = self.rate + gain1 * residual
+        p11 = p11 - gain1 * p01
+        p01 = (1 - gain0) * p01
+        p00 = (1 - gain0) * p00
+
+        # La primera muestra inicializa el estado con incertidumbre de medición
+        angle = np.where(first, values, angle)
+        rate = np.where(first, 0.0, rate)
+        p00 = np.where(first, r, p00)
+        p01 = np.where(first, 0.0, p01)
+        p11 = np.where(first, q, p11)
+
+        for state, new in ((self.value, angle), (self.rate, rate), (self.p00, p00),
+                           (self.p01, p01), (self.p11, p11)):
+            np.copyto(state, new, where=valid)
+        return self.value
@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 import mediapipe as mp
 
+from computerVisionModules.filters import FilterBank
+
 drawing_mp = mp.solutions.drawing_utils
 pose_mp = mp.solutions.pose
 face_mesh_mp = mp.solutions.face_mesh
@@ -19,64 +21,147 @@ def scale_angle(value, axis): # scaling for the degree of freedom of human head.
         return round(degree), round(radian,4)
 
 
-def get_head_positions(image, results, angle_type, show_text=True):
-    output = {
-        "Pitch" : {
-            "Degree" : None ,
-            "Radian" : None
-        } ,
-        "Yaw" : {
-            "Degree" : None ,
-            "Radian" : None
-        }
-    }
-    img_h , img_w , img_c = image.shape
-    face_3d = []
-    face_2d = []
+# Landmarks de FaceMesh usados para el PnP (ojos, nariz, boca y mentón)
+HEAD_POSE_LANDMARKS = (1, 33, 61, 199, 263, 291)
+HEAD_JOINTS = ("HeadPitch", "HeadYaw")  # Claves del filtro de ángulos
 
-    if results.multi_face_landmarks :
-        for face_landmarks in results.multi_face_landmarks :
-            drawing_spec = drawing_mp.DrawingSpec(thickness=1, circle_radius=1)
 
-            for idx , landmark in enumerate(face_landmarks.landmark) :
-                # borders of head mesh
-                if idx == 33 or idx == 263 or idx == 1 or idx == 61 or idx == 291 or idx == 199:
-                    x, y = int(landmark.x * img_w) , int(landmark.y * img_h)
-                    face_2d.append([x , y]) # 2D Coordinates
-                    face_3d.append([x , y , landmark.z]) # 3D Coordinates
+class HeadPoseEstimator:
+    """Estimación de pose de cabeza con estado entre frames.
 
-            face_2d = np.array(face_2d , dtype=np.float64)
-            face_3d = np.array(face_3d , dtype=np.float64)
+    Toma los seis landmarks por índice directo sobre arrays preasignados,
+    cachea la matriz de cámara por resolución y arranca solvePnP desde la
+    rotación/traslación del frame anterior. Si se pierde la cara o la
+    solución se aleja demasiado, vuelve a resolver desde cero. Pitch y Yaw
+    se filtran por articulación como los codos (filters.FilterBank).
+    """
 
+    def __init__(self, draw_mesh=True, max_rotation_jump=0.5, filter_on=True, filter_method="wma"):
+        self.draw_mesh = draw_mesh
+        self.filter_on = filter_on
+        self.angle_filter = FilterBank(HEAD_JOINTS, method=filter_method)
+        self.max_rotation_jump = max_rotation_jump  # radianes entre frames
+        self.face_2d = np.zeros((len(HEAD_POSE_LANDMARKS), 2), dtype=np.float64)
+        self.face_3d = np.zeros((len(HEAD_POSE_LANDMARKS), 3), dtype=np.float64)
+        # The distortion parameters
+        self.distortion_matrix = np.zeros((4, 1), dtype=np.float64)
+        self.drawing_spec = drawing_mp.DrawingSpec(thickness=1, circle_radius=1)
+        self._camera_matrix = None
+        self._resolution = None
+        self.rotation_vector = None
+        self.translation_vector = None
+        self.warm_starts = 0
+        self.full_solves = 0
 
+    def get_camera_matrix(self, img_w, img_h):
+        if self._resolution != (img_w, img_h):
             focal_length = 1 * img_w # default calibration
-            camera_matrix = np.array([[focal_length, 0, img_h / 2], [0, focal_length, img_w / 2], [0 , 0 , 1]])
-            # The distortion parameters
-            distortion_matrix = np.zeros((4 , 1) , dtype=np.float64)
-            # PnP Problem
-            success , rotational_vector , trans_vec = cv2.solvePnP(face_3d , face_2d , camera_matrix , distortion_matrix)
-            # Get rotational matrix
-            rotational_matrix , jacobian = cv2.Rodrigues(rotational_vector)
-            # Get angles
-            angles , matrixR , matrixQ , QX , QY , QZ = cv2.RQDecomp3x3(rotational_matrix)
-
-            head_pitch_degree, head_pitch_radian = scale_angle(angles[0],"x")
-            head_yaw_degree, head_yaw_radian = scale_angle(angles[1],"y")
+            self._camera_matrix = np.array([[focal_length, 0, img_h / 2], [0, focal_length, img_w / 2], [0 , 0 , 1]])
+            self._resolution = (img_w, img_h)
+            self.reset()
+        return self._camera_matrix
+
+    def reset(self):
+        """Olvida la pose anterior (pérdida de tracking)"""
+        self.rotation_vector = None
+        self.translation_vector = None
+
+    def solve(self, face_landmarks, img_w, img_h):
+        """Resuelve el PnP y devuelve el vector de rotación (o None)"""
+        landmarks = face_landmarks.landmark
+        for row, idx in enumerate(HEAD_POSE_LANDMARKS):
+            landmark = landmarks[idx]
+            x, y = int(landmark.x * img_w), int(landmark.y * img_h)
+            self.face_2d[row, 0] = x
+            self.face_2d[row, 1] = y
+            self.face_3d[row, 0] = x
+            self.face_3d[row, 1] = y
+            self.face_3d[row, 2] = landmark.z
+
+        camera_matrix = self.get_camera_matrix(img_w, img_h)
+
+        if self.rotation_vector is not None:
+            previous = self.rotation_vector.copy()
+            success, rotational_vector, trans_vec = cv2.solvePnP(
+                self.face_3d, self.face_2d, camera_matrix, self.distortion_matrix,
+                self.rotation_vector, self.translation_vector,
+                useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE)
+            if success and np.linalg.norm(rotational_vector - previous) <= self.max_rotation_jump:
+                self.warm_starts += 1
+                self.rotation_vector, self.translation_vector = rotational_vector, trans_vec
+                return rotational_vector
+
+        # PnP Problem desde cero
+        self.full_solves += 1
+        success, rotational_vector, trans_vec = cv2.solvePnP(
+            self.face_3d, self.face_2d, camera_matrix, self.distortion_matrix)
+        if not success:
+            self.reset()
+            return None
+        self.rotation_vector, self.translation_vector = rotational_vector, trans_vec
+        return rotational_vector
+
+    def get_head_positions(self, image, results, angle_type, show_text=True, timestamp=None):
+        """Pitch/Yaw de la cabeza; timestamp es el instante de captura (para el filtro)"""
+        output = {
+            "Pitch" : {
+                "Degree" : None ,
+                "Radian" : None
+            } ,
+            "Yaw" : {
+                "Degree" : None ,
+                "Radian" : None
+            }
+        }
 
+        if not results.multi_face_landmarks:
+            self.reset()
+            return output
+
+        img_h , img_w = image.shape[:2]
+        face_landmarks = results.multi_face_landmarks[0]  # max_num_faces=1
+
+        rotational_vector = self.solve(face_landmarks, img_w, img_h)
+        if rotational_vector is None:
+            return output
+
+        # Get rotational matrix
+        rotational_matrix , jacobian = cv2.Rodrigues(rotational_vector)
+        # Get angles
+        angles , matrixR , matrixQ , QX , QY , QZ = cv2.RQDecomp3x3(rotational_matrix)
+
+        head_pitch_degree, head_pitch_radian = scale_angle(angles[0],"x")
+        head_yaw_degree, head_yaw_radian = scale_angle(angles[1],"y")
+        if self.filter_on:
+            head_pitch_degree, head_yaw_degree = (
+                float(value) for value in self.angle_filter.update((head_pitch_degree, head_yaw_degree), timestamp))
+            head_pitch_radian = round(np.deg2rad(head_pitch_degree), 4)
+            head_yaw_radian = round(np.deg2rad(head_yaw_degree), 4)
+
+        if self.draw_mesh:
             drawing_mp.draw_landmarks(
                 image=image,
                 landmark_list=face_landmarks,
                 connections=face_mesh_mp.FACEMESH_CONTOURS,
-                landmark_drawing_spec=drawing_spec,
-                connection_drawing_spec=drawing_spec)
+                landmark_drawing_spec=self.drawing_spec,
+                connection_drawing_spec=self.drawing_spec)
+
+        if show_text:
+            if angle_type == "Degree":
+                cv2.putText(image,"HeadPitch: " + str(head_pitch_degree) + "        HeadYaw: " + str(head_yaw_degree), (image.shape[1]//2-290,100), cv2.FONT_HERSHEY_SIMPLEX , 1 , (255 , 255 , 255) , 2)
+
+        output["Pitch"]["Degree"] = head_pitch_degree
+        output["Pitch"]["Radian"] = head_pitch_radian
+        output["Yaw"]["Degree"] = head_yaw_degree
+        output["Yaw"]["Radian"] = head_yaw_radian
+
+        return output
+
 
-            if show_text:
-                if angle_type == "Degree":
-                    cv2.putText(image,"HeadPitch: " + str(head_pitch_degree) + "        HeadYaw: " + str(head_yaw_degree), (image.shape[1]//2-290,100), cv2.FONT_HERSHEY_SIMPLEX , 1 , (255 , 255 , 255) , 2)
+_default_estimator = HeadPoseEstimator()
 
-            output["Pitch"]["Degree"] = head_pitch_degree
-            output["Pitch"]["Radian"] = head_pitch_radian
-            output["Yaw"]["Degree"] = head_yaw_degree
-            output["Yaw"]["Radian"] = head_yaw_radian
 
-    return output
\ No newline at end of file
+def get_head_positions(image, results, angle_type, show_text=True, draw_mesh=True):
+    """Compatibilidad: usa un HeadPoseEstimator compartido a nivel de módulo"""
+    _default_estimator.draw_mesh = draw_mesh
+    return _default_estimator.get_head_positions(image, results, angle_type, show_text)
@@ -0,0 +1,151 @@
+import cv2
+import numpy as np
+
+# Landmarks de pose de la cabeza (nariz, ojos, orejas, boca): ROI de FaceMesh
+HEAD_LANDMARKS = tuple(range(0, 11))
+
+
+class RoiTracker:
+    """Región de interés adaptativa para la inferencia de MediaPipe.
+
+    A partir de landmarks normalizados calcula una caja con margen, recorta
+    (y opcionalmente reduce) la imagen que recibe el modelo y devuelve los
+    landmarks a coordenadas del frame completo.
+
+    Los recortes cambian de tamaño y posición entre frames, lo que rompe el
+    tracking interno de MediaPipe: deben ir a un modelo en
+    static_image_mode, y el frame completo a la instancia con tracking. Si
+    el recorte no detecta nada no se repite la inferencia en ese frame: se
+    descarta la caja y el siguiente frame va completo.
+    """
+
+    def __init__(self, landmark_ids=None, padding=0.3, min_size=0.2, max_side=None,
+                 visibility_threshold=0.5, enabled=True):
+        """
+        Args:
+            landmark_ids: Índices de landmarks que definen la caja (None = todos)
+            padding: Margen relativo al tamaño de la caja en cada lado
+            min_size: Lado mínimo de la caja como fracción del frame
+            max_side: Lado máximo en píxeles de la imagen enviada al modelo (None = sin reducir)
+        """
+        self.landmark_ids = landmark_ids
+        self.padding = padding
+        self.min_size = min_size
+        self.max_side = max_side
+        self.visibility_threshold = visibility_threshold
+        self.enabled = enabled
+        self.box = None  # (x0, y0, x1, y1) normalizados
+
+        self.frames = 0
+        self.roi_frames = 0
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        self.box = None
+
+    def update(self, landmark_list):
+        """Calcula la caja del próximo recorte a partir de landmarks del frame completo"""
+        if landmark_list is None:
+            self.box = None
+            return
+        landmarks = landmark_list.landmark
+        ids = self.landmark_ids if self.landmark_ids is not None else range(len(landmarks))
+        points = np.array([(landmarks[i].x, landmarks[i].y, getattr(landmarks[i], "visibility", 1.0))
+                           for i in ids])
+        if self.visibility_threshold is not None:
+            points = points[points[:, 2] > self.visibility_threshold]
+        if len(points) < 2:
+            self.box = None
+            return
+
+        x0, y0 = np.clip(points[:, :2].min(axis=0), 0.0, 1.0)
+        x1, y1 = np.clip(points[:, :2].max(axis=0), 0.0, 1.0)
+        half_w = max((x1 - x0) * (0.5 + self.padding), self.min_size / 2)
+        half_h = max((y1 - y0) * (0.5 + self.padding), self.min_size / 2)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        box = (max(cx - half_w, 0.0), max(cy - half_h, 0.0),
+               min(cx + half_w, 1.0), min(cy + half_h, 1.0))
+        # Si la caja cubre casi todo el frame no vale la pena recortar
+        self.box = None if (box[2] - box[0]) * (box[3] - box[1]) > 0.8 else box
+
+    def crop(self, image):
+        """Devuelve (imagen para el modelo, roi en píxeles o None si es el frame completo)"""
+        if not self.enabled or self.box is None:
+            return image, None
+        h, w = image.shape[:2]
+        x0, y0 = int(self.box[0] * w), int(self.box[1] * h)
+        x1, y1 = int(np.ceil(self.box[2] * w)), int(np.ceil(self.box[3] * h))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return image, None
+        cropped = image[y0:y1, x0:x1]
+        if self.max_side and max(cropped.shape[:2]) > self.max_side:
+            scale = self.max_side / max(cropped.shape[:2])
+            cropped = cv2.resize(cropped, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            cropped = np.ascontiguousarray(cropped)
+        return cropped, (x0, y0, x1, y1)
+
+    @staticmethod
+    def remap(landmark_list, roi, image_shape):
+        """Pasa landmarks normalizados del recorte al frame completo (in place).
+
+        La escala uniforme del recorte no cambia las coordenadas normalizadas;
+        z de MediaPipe está en la escala del ancho, por eso se ajusta con él.
+        """
+        h, w = image_shape[:2]
+        x0, y0, x1, y1 = roi
+        sx, sy = (x1 - x0) / w, (y1 - y0) / h
+        ox, oy = x0 / w, y0 / h
+        for landmark in landmark_list.landmark:
+            landmark.x = ox + landmark.x * sx
+            landmark.y = oy + landmark.y * sy
+            landmark.z = landmark.z * sx
+
+    def process(self, model, image, get_landmarks, crop_model=None):
+        """Ejecuta el modelo sobre el ROI, o `model` sobre el frame completo si no hay caja.
+
+        Args:
+            model: Instancia con tracking para el frame completo
+            get_landmarks: Función resultados -> lista de landmark_lists (vacía si no hay detección)
+            crop_model: Instancia en static_image_mode para los recortes (None = `model`)
+        """
+        self.frames += 1
+        cropped, roi = self.crop(image)
+        if roi is None:
+            return model.process(image)
+
+        self.roi_frames += 1
+        results = (crop_model or model).process(cropped)
+        landmark_lists = get_landmarks(results)
+        if landmark_lists:
+            self.hits += 1
+            for landmark_list in landmark_lists:
+                self.remap(landmark_list, roi, image.shape)
+        else:
+            # Pérdida en el recorte: el próximo frame vuelve al frame completo
+            self.misses += 1
+            self.reset()
+        return results
+
+    @property
+    def hit_rate(self):
+        """Fracción de recortes con detección"""
+        return self.hits / self.roi_frames if self.roi_frames else 0.0
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "roi_frames": self.roi_frames,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3)
+        }
+
+
+def pose_landmark_lists(results):
+    return [results.pose_landmarks] if results.pose_landmarks else []
+
+
+def face_landmark_lists(results):
+    return list(results.multi_face_landmarks or [])
@@ -0,0 +1,64 @@
+"""Resultados con la forma de MediaPipe construidos a partir de arrays.
+
+Permiten ejecutar los módulos de visión sin cámara ni modelos: benchmarks,
+reproducción de sesiones grabadas, pruebas de carga.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+NUM_POSE_LANDMARKS = 33
+NUM_FACE_LANDMARKS = 468
+
+
+def make_landmarks(points):
+    """Lista de landmarks (x, y, z[, visibility]) con atributos como en MediaPipe"""
+    landmarks = []
+    for point in np.asarray(points, dtype=np.float64).tolist():
+        visibility = point[3] if len(point) > 3 else 1.0
+        landmarks.append(SimpleNamespace(x=point[0], y=point[1], z=point[2], visibility=visibility))
+    return SimpleNamespace(landmark=landmarks)
+
+
+def random_pose_points(seed=0):
+    """(33, 4) normalizados con visibilidad alta"""
+    rng = np.random.default_rng(seed)
+    points = np.empty((NUM_POSE_LANDMARKS, 4))
+    points[:, :2] = rng.uniform(0.2, 0.8, (NUM_POSE_LANDMARKS, 2))
+    points[:, 2] = rng.uniform(-0.3, 0.3, NUM_POSE_LANDMARKS)
+    points[:, 3] = rng.uniform(0.8, 1.0, NUM_POSE_LANDMARKS)
+    return points
+
+
+def random_face_points(seed=0):
+    """(468, 3) normalizados agrupados como una cara en el centro de la imagen"""
+    rng = np.random.default_rng(seed)
+    points = np.empty((NUM_FACE_LANDMARKS, 3))
+    points[:, 0] = rng.normal(0.5, 0.05, NUM_FACE_LANDMARKS)
+    points[:, 1] = rng.normal(0.4, 0.07, NUM_FACE_LANDMARKS)
+    points[:, 2] = rng.normal(0.0, 0.02, NUM_FACE_LANDMARKS)
+    return points
+
+
+def make_pose_results(points=None, seed=0):
+    """Equivalente a Pose.process(): None en pose_landmarks si no hay puntos"""
+    if points is None:
+        points = random_pose_points(seed)
+    elif np.isnan(points).all():
+        return SimpleNamespace(pose_landmarks=None)
+    return SimpleNamespace(pose_landmarks=make_landmarks(points))
+
+
+def make_face_results(points=None, seed=0):
+    """Equivalente a FaceMesh.process(): None en multi_face_landmarks si no hay puntos"""
+    if points is None:
+        points = random_face_points(seed)
+    elif np.isnan(points).all():
+        return SimpleNamespace(multi_face_landmarks=None)
+    return SimpleNamespace(multi_face_landmarks=[make_landmarks(points)])
+
+
+def make_frame(width=640, height=480, seed=0):
+    """Frame BGR con ruido (uint8)"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
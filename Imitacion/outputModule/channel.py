@@ -0,0 +1,130 @@
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from outputModule import protocol
+
+# Registro de tamaño fijo: contador de versión (seqlock) + paquete de protocol.py
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "nao_pose.channel")
+_VERSION = struct.Struct("<Q")
+PACKET_OFFSET = _VERSION.size
+RECORD_SIZE = PACKET_OFFSET + protocol.PACKET_SIZE
+
+
+class PoseChannelWriter:
+    """Publica la última pose en un archivo mapeado en memoria.
+
+    El contador de versión es impar mientras se escribe y par cuando el
+    registro está completo, así el lector detecta lecturas a medias sin
+    usar locks.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.sequence = 0
+        # No se trunca un canal existente: un lector con el archivo mapeado
+        # recibiría SIGBUS al acceder a páginas truncadas
+        if not os.path.exists(path) or os.path.getsize(path) < RECORD_SIZE:
+            with open(path, "wb") as file:
+                file.write(b"\0" * RECORD_SIZE)
+        self._file = open(path, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), RECORD_SIZE)
+        # Se continúa la versión anterior para que los lectores vean el cambio
+        version = _VERSION.unpack_from(self._mmap, 0)[0]
+        self.version = version + (version % 2)
+
+    def write(self, packet):
+        self.version += 1  # impar: escritura en curso
+        _VERSION.pack_into(self._mmap, 0, self.version)
+        self._mmap[PACKET_OFFSET:RECORD_SIZE] = packet
+        self.version += 1  # par: registro consistente
+        _VERSION.pack_into(self._mmap, 0, self.version)
+
+    def write_output(self, output, timestamp=None):
+        """Empaqueta Output.output y lo publica"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.write(protocol.encode_output(output, self.sequence, timestamp))
+        self.sequence += 1
+
+    def write_joints(self, joints, timestamp=None, **timing):
+        """Publica un JointState desde su buffer plano (sin pasar por el dict).
+
+        timestamp es el instante de captura; timing son los campos de
+        latencia de protocol.encode (el envío es este momento)
+        """
+        now = time.time()
+        if timestamp is None:
+            timestamp = now
+        timing.setdefault("send_time", now)
+        self.write(joints.encode(self.sequence, timestamp, **timing))
+        self.sequence += 1
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+class PoseChannelReader:
+    """Lee sin bloquear la pose más reciente publicada por PoseChannelWriter"""
+
+    def __init__(self, path=DEFAULT_PATH, max_retries=8, reopen_interval=1.0):
+        self.path = path
+        self.max_retries = max_retries
+        self.reopen_interval = reopen_interval
+        self.last_version = 0
+        self.torn_reads = 0
+        self.reads = 0
+        self._file = None
+        self._mmap = None
+        self._last_open_attempt = 0.0
+
+    def _open(self):
+        now = time.monotonic()
+        if now - self._last_open_attempt < self.reopen_interval:
+            return False
+        self._last_open_attempt = now
+        try:
+            if os.path.getsize(self.path) < RECORD_SIZE:
+                return False
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), RECORD_SIZE, access=mmap.ACCESS_READ)
+            return True
+        except OSError:
+            return False
+
+    def read(self):
+        """Devuelve el paquete nuevo (bytes) o None si no cambió desde la última lectura"""
+        if self._mmap is None and not self._open():
+            return None
+
+        for _ in range(self.max_retries):
+            before = _VERSION.unpack_from(self._mmap, 0)[0]
+            if before == self.last_version:
+                return None
+            if before % 2:
+                self.torn_reads += 1  # escritor a mitad de registro
+                continue
+            packet = self._mmap[PACKET_OFFSET:RECORD_SIZE]
+            if _VERSION.unpack_from(self._mmap, 0)[0] != before:
+                self.torn_reads += 1
+                continue
+            self.last_version = before
+            self.reads += 1
+            return packet
+        return None
+
+    def read_output(self):
+        """Como read() pero con el esquema anidado de Output.output"""
+        packet = self.read()
+        if packet is None:
+            return None
+        return protocol.decode_to_output(packet)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
@@ -1,120 +1,168 @@
 import json
+import numpy as np
+from outputModule import protocol, writer
 
-class Output:
-  def __init__(self, angleType = "Degree"):
-    self.angleType = angleType  # Degree or "Radian"
+# Orden de las articulaciones en el esquema anidado original de Output.output
+VIEW_JOINTS = (
+  "HeadPitch", "HeadYaw",
+  "LShoulderRoll", "LShoulderPitch", "RShoulderRoll", "RShoulderPitch",
+  "LElbowRoll", "RElbowRoll",
+  "LWristYaw", "RWristYaw",
+  "LHipRoll", "LHipPitch", "RHipRoll", "RHipPitch"
+)
+_JOINT_PATHS = dict(protocol.JOINTS)
+_GROUP_JOINTS = {}
+for _name, _path in protocol.JOINTS:
+  _GROUP_JOINTS.setdefault(_path[0], []).append((_name, _path[1:]))
 
-    self.output = {
-      "Angles" : {
-        "Head" : {
-          "Pitch": {
-            "Degree": None,
-            "Radian": None
-          },
-          "Yaw": {
-            "Degree": None,
-            "Radian": None
-          }
-        },
-        "Shoulders": {
-          "Left": {
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            },
-            "Pitch": {
-              "Degree": None,
-              "Radian": None
-            }
-          },
-          "Right": {
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            },
-            "Pitch": {
-              "Degree": None,
-              "Radian": None
-            }
-          }
-        },
-        "Elbows": {
-          "Left":{
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            }
-          },
-          "Right": {
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            }
-          }
-        },
-        "Wrists": {
-          "Left":{
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            }
-          },
-          "Right": {
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            }
-          }
-        },
-        "Hip": {
-          "Left": {
-            "Roll" : {
-              "Degree": None,
-              "Radian": None
-            },
-            "Pitch": {
-              "Degree": None,
-              "Radian": None
-            }
-          },
-          "Right": {
-            "Roll": {
-              "Degree": None,
-              "Radian": None
-            },
-            "Pitch": {
-              "Degree": None,
-              "Radian": None
-            }
-          }
-        }
-      },
+
+def group_mask(group):
+  """Máscara booleana (orden de protocol.JOINTS) de las articulaciones de un grupo"""
+  mask = np.zeros(protocol.NUM_JOINTS, dtype=bool)
+  for joint_name, _ in _GROUP_JOINTS[group]:
+    mask[protocol.JOINT_INDEX[joint_name]] = True
+  return mask
+
+
+class JointState:
+  """Estado compacto de articulaciones: un float64 en radianes por articulación
+  del NAO (índices de protocol.JOINT_INDEX), NaN si no hay dato.
+
+  Los grados se derivan al pedirlos; `version` aumenta con cada cambio.
+  """
+  __slots__ = ("radians", "left_hand_open", "right_hand_open", "version")
+
+  def __init__(self):
+    self.radians = np.full(protocol.NUM_JOINTS, np.nan)
+    self.left_hand_open = None   # None = estado de la mano desconocido
+    self.right_hand_open = None
+    self.version = 0
+
+  def set(self, joint_name, radian):
+    self.radians[protocol.JOINT_INDEX[joint_name]] = np.nan if radian is None else radian
+    self.version += 1
+
+  def get_radian(self, joint_name):
+    value = self.radians[protocol.JOINT_INDEX[joint_name]]
+    return None if np.isnan(value) else float(value)
+
+  def get_degree(self, joint_name):
+    value = self.get_radian(joint_name)
+    return None if value is None else float(np.degrees(value))
+
+  def set_group(self, group, angles):
+    """Actualiza un grupo ("Head", "Elbows", ...) desde su sub-dict anidado
+    con pares Degree/Radian, el formato que devuelven head y elbows"""
+    for joint_name, path in _GROUP_JOINTS[group]:
+      ref = angles
+      try:
+        for key in path:
+          ref = ref[key]
+        radian = ref.get("Radian")
+      except (KeyError, TypeError, AttributeError):
+        continue
+      self.radians[protocol.JOINT_INDEX[joint_name]] = np.nan if radian is None else radian
+    self.version += 1
+
+  def set_hands(self, left_open, right_open):
+    self.left_hand_open = left_open
+    self.right_hand_open = right_open
+    self.version += 1
+
+  def copy(self):
+    state = JointState()
+    state.radians[:] = self.radians
+    state.left_hand_open = self.left_hand_open
+    state.right_hand_open = self.right_hand_open
+    state.version = self.version
+    return state
+
+  def flags(self):
+    flags = 0
+    if self.left_hand_open is not None:
+      flags |= protocol.FLAG_LEFT_HAND_VALID
+      if self.left_hand_open:
+        flags |= protocol.FLAG_LEFT_HAND_OPEN
+    if self.right_hand_open is not None:
+      flags |= protocol.FLAG_RIGHT_HAND_VALID
+      if self.right_hand_open:
+        flags |= protocol.FLAG_RIGHT_HAND_OPEN
+    return flags
+
+  def encode(self, sequence, timestamp, **timing):
+    """Paquete binario de protocol.py directamente desde el buffer plano.
+
+    timing: frame_id, inference_time, send_time, clock_offset (ver protocol.encode)
+    """
+    return protocol.encode(self.radians.tolist(), sequence, timestamp, self.flags(), **timing)
+
+  def to_dict(self):
+    """Esquema anidado original {"Angles": ..., "Status": ...}"""
+    angles = {}
+    for joint_name in VIEW_JOINTS:
+      path = _JOINT_PATHS[joint_name]
+      ref = angles
+      for key in path[:-1]:
+        ref = ref.setdefault(key, {})
+      radian = self.get_radian(joint_name)
+      ref[path[-1]] = {
+        "Degree": None if radian is None else float(np.degrees(radian)),
+        "Radian": radian
+      }
+    return {
+      "Angles": angles,
       "Status": {
-        "Hands" : {
-          "Left" : {
-            "is_open" : True
-          } ,
-          "Right" : {
-            "is_open" : False
-          }
+        "Hands": {
+          "Left": {"is_open": self.left_hand_open},
+          "Right": {"is_open": self.right_hand_open}
         }
       }
     }
 
+
+class Output:
+  def __init__(self, angleType = "Degree"):
+    self.angleType = angleType  # Degree or "Radian"
+    self.json_writer = None  # AsyncJsonWriter opcional (start_json_writer)
+    self.joints = JointState()
+    self._view = None
+    self._view_version = -1
+
+  @property
+  def output(self):
+    """Vista anidada (compatibilidad), reconstruida solo si el estado cambió.
+
+    Es de solo lectura en la práctica: los cambios se hacen con set_group,
+    set_joint o sobre self.joints.
+    """
+    if self._view_version != self.joints.version:
+      self._view = self.joints.to_dict()
+      self._view_version = self.joints.version
+    return self._view
+
+  def set_group(self, group, angles):
+    self.joints.set_group(group, angles)
+
+  def set_joint(self, joint_name, radian):
+    self.joints.set(joint_name, radian)
+
   def get_json_file(self,path):
       with open(path,"r",encoding="utf-8") as dfile :
         return json.load(dfile)
 
   def write_json_data(self, path):
+    """Escritura síncrona y atómica (archivo temporal + os.replace)"""
+    writer.write_json_atomic(self.output, path)
 
+  def start_json_writer(self, path, max_rate=10.0):
+    """Crea un escritor en segundo plano para usar con submit_json_data"""
+    self.json_writer = writer.AsyncJsonWriter(path, max_rate, serialize=JointState.to_dict)
+    return self.json_writer
 
-    with open(path,"w",encoding="utf-8") as file:
-
-      file.seek(0)
-
-      json.dump(self.output, file, ensure_ascii=False)
-
-      file.truncate()
+  def submit_json_data(self):
+    """Entrega una copia del buffer plano al escritor de fondo; el dict
+    anidado se construye en su hilo"""
+    self.json_writer.submit(self.joints.copy())
 
 
 
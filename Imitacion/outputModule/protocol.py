@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Protocolo binario de tamaño fijo entre VisionSystem y el servidor RobotActua.
+
+Compatible con Python 2.7 (RobotActua) y Python 3 (Imitacion): solo usa
+la librería estándar.
+
+Paquete (little endian):
+    magic "NP" | versión u8 | flags u8 | secuencia u32 | timestamp de captura f64 |
+    máscara de articulaciones u32 | un float32 en radianes por articulación de JOINTS |
+    id de frame u32 | fin de inferencia y envío en ms desde la captura (2 x f32) |
+    desfase de relojes robot - visión f64 (NaN = ausente)
+
+Los campos finales son el bloque "Timing" de tracing.py.
+"""
+import math
+import struct
+
+MAGIC = b"NP"
+VERSION = 2
+
+# Articulación del NAO -> ruta dentro de Output.output["Angles"]
+JOINTS = (
+    ("HeadPitch", ("Head", "Pitch")),
+    ("HeadYaw", ("Head", "Yaw")),
+    ("LShoulderPitch", ("Shoulders", "Left", "Pitch")),
+    ("LShoulderRoll", ("Shoulders", "Left", "Roll")),
+    ("RShoulderPitch", ("Shoulders", "Right", "Pitch")),
+    ("RShoulderRoll", ("Shoulders", "Right", "Roll")),
+    ("LElbowRoll", ("Elbows", "Left", "Roll")),
+    ("RElbowRoll", ("Elbows", "Right", "Roll")),
+    ("LWristYaw", ("Wrists", "Left", "Roll")),
+    ("RWristYaw", ("Wrists", "Right", "Roll")),
+    ("LHipRoll", ("Hip", "Left", "Roll")),
+    ("LHipPitch", ("Hip", "Left", "Pitch")),
+    ("RHipRoll", ("Hip", "Right", "Roll")),
+    ("RHipPitch", ("Hip", "Right", "Pitch")),
+)
+JOINT_NAMES = tuple(name for name, _ in JOINTS)
+JOINT_INDEX = dict((name, index) for index, name in enumerate(JOINT_NAMES))
+NUM_JOINTS = len(JOINTS)
+
+# Bits del campo flags
+FLAG_LEFT_HAND_OPEN = 0x01
+FLAG_RIGHT_HAND_OPEN = 0x02
+# Sin el bit *_VALID el estado de esa mano es desconocido y no se comanda
+FLAG_LEFT_HAND_VALID = 0x04
+FLAG_RIGHT_HAND_VALID = 0x08
+
+HEADER_FORMAT = "<2sBBIdI"
+TIMING_FORMAT = "Iffd"
+PACKET_FORMAT = HEADER_FORMAT + "%df" % NUM_JOINTS + TIMING_FORMAT
+_PACKET = struct.Struct(PACKET_FORMAT)
+_NAN = float("nan")
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+PACKET_SIZE = _PACKET.size
+
+
+def _since(instant, timestamp):
+    return _NAN if instant is None else (instant - timestamp) * 1000.0
+
+
+def _absent(value):
+    return value is None or value != value
+
+
+def encode(radians, sequence, timestamp, flags=0, frame_id=0, inference_time=None,
+           send_time=None, clock_offset=None):
+    """Empaqueta una lista de radianes (None o NaN = articulación ausente).
+
+    timestamp es el instante de captura; inference_time y send_time son
+    instantes absolutos del mismo reloj (ver tracing.make_timing).
+    """
+    mask = 0
+    values = [0.0] * NUM_JOINTS
+    for index, value in enumerate(radians):
+        if _absent(value):
+            continue
+        mask |= 1 << index
+        values[index] = value
+    values.extend((frame_id & 0xFFFFFFFF, _since(inference_time, timestamp),
+                   _since(send_time, timestamp), _NAN if clock_offset is None else clock_offset))
+    return _PACKET.pack(MAGIC, VERSION, flags, sequence & 0xFFFFFFFF,
+                        timestamp, mask, *values)
+
+
+def decode_timing(fields, timestamp):
+    frame_id, inference_ms, send_ms, clock_offset = fields
+    return {
+        "FrameId": frame_id,
+        "Capture": timestamp,
+        "Inference": None if _absent(inference_ms) else timestamp + inference_ms / 1000.0,
+        "Send": None if _absent(send_ms) else timestamp + send_ms / 1000.0,
+        "ClockOffset": None if _absent(clock_offset) else clock_offset
+    }
+
+
+def decode(packet):
+    """Devuelve (secuencia, timestamp, flags, radianes, timing) con None en las ausentes"""
+    if len(packet) != PACKET_SIZE:
+        raise ValueError("Tamaño de paquete inválido: {}".format(len(packet)))
+    fields = _PACKET.unpack(packet)
+    magic, version, flags, sequence, timestamp, mask = fields[:6]
+    if magic != MAGIC:
+        raise ValueError("Magic inválido: {!r}".format(magic))
+    if version != VERSION:
+        raise ValueError("Versión de protocolo no soportada: {}".format(version))
+    radians = [value if mask & (1 << index) else None
+               for index, value in enumerate(fields[6:6 + NUM_JOINTS])]
+    return sequence, timestamp, flags, radians, decode_timing(fields[6 + NUM_JOINTS:], timestamp)
+
+
+def encode_output(output, sequence, timestamp):
+    """Empaqueta el dict anidado de Output.output"""
+    angles = output["Angles"]
+    radians = []
+    for _, path in JOINTS:
+        ref = angles
+        try:
+            for key in path:
+                ref = ref[key]
+            radians.append(ref.get("Radian"))
+        except (KeyError, TypeError, AttributeError):
+            radians.append(None)
+
+    flags = 0
+    hands = output.get("Status", {}).get("Hands", {})
+    for side, valid, opened in (("Left", FLAG_LEFT_HAND_VALID, FLAG_LEFT_HAND_OPEN),
+                                ("Right", FLAG_RIGHT_HAND_VALID, FLAG_RIGHT_HAND_OPEN)):
+        is_open = hands.get(side, {}).get("is_open")
+        if is_open is not None:
+            flags |= valid | (opened if is_open else 0)
+    return encode(radians, sequence, timestamp, flags)
+
+
+def _hand_state(flags, valid, opened):
+    """True/False si el paquete trae el estado de la mano, None si no"""
+    return bool(flags & opened) if flags & valid else None
+
+
+def decode_to_output(packet):
+    """Reconstruye el esquema anidado de Output.output a partir de un paquete"""
+    sequence, timestamp, flags, radians, timing = decode(packet)
+    angles = {}
+    for (_, path), radian in zip(JOINTS, radians):
+        ref = angles
+        for key in path[:-1]:
+            ref = ref.setdefault(key, {})
+        ref[path[-1]] = {
+            "Degree": math.degrees(radian) if radian is not None else None,
+            "Radian": radian
+        }
+    return {
+        "Angles": angles,
+        "Status": {
+            "Hands": {
+                "Left": {"is_open": _hand_state(flags, FLAG_LEFT_HAND_VALID, FLAG_LEFT_HAND_OPEN)},
+                "Right": {"is_open": _hand_state(flags, FLAG_RIGHT_HAND_VALID, FLAG_RIGHT_HAND_OPEN)}
+            }
+        },
+        "Sequence": sequence,
+        "Timestamp": timestamp,
+        "Timing": timing
+    }
+
+
+def _self_test():
+    """Prueba de ida y vuelta del codec; ejecutar con python2.7 y python3"""
+    radians = [0.1 * (index + 1) for index in range(NUM_JOINTS)]
+    radians[3] = None
+    radians[5] = float("nan")
+    hand_flags = FLAG_LEFT_HAND_VALID | FLAG_RIGHT_HAND_VALID | FLAG_RIGHT_HAND_OPEN
+    packet = encode(radians, 2 ** 32 + 7, 1234.5, hand_flags)
+    assert len(packet) == PACKET_SIZE
+    sequence, timestamp, flags, decoded, timing = decode(packet)
+    assert (sequence, timestamp, flags) == (7, 1234.5, hand_flags)
+    assert timing["FrameId"] == 0 and timing["Inference"] is None and timing["ClockOffset"] is None
+    for expected, value in zip(radians, decoded):
+        if expected is None or expected != expected:
+            assert value is None
+        else:
+            assert abs(expected - value) < 1e-6
+
+    output = decode_to_output(packet)
+    assert encode_output(output, sequence, timestamp) == packet
+    assert output["Status"]["Hands"]["Right"]["is_open"]
+    assert output["Status"]["Hands"]["Left"]["is_open"] is False
+
+    # Sin bits de validez las manos quedan desconocidas en ambos sentidos
+    unknown = encode(radians, 7, 1234.5, FLAG_RIGHT_HAND_OPEN)
+    output = decode_to_output(unknown)
+    assert output["Status"]["Hands"]["Right"]["is_open"] is None
+    assert decode(encode_output(output, 7, 1234.5))[2] == 0
+
+    packet = encode(radians, 1, 1000.0, frame_id=42, inference_time=1000.025,
+                    send_time=1000.03, clock_offset=-3.5)
+    timing = decode(packet)[4]
+    assert timing["FrameId"] == 42 and timing["ClockOffset"] == -3.5
+    assert abs(timing["Inference"] - 1000.025) < 1e-6 and abs(timing["Send"] - 1000.03) < 1e-6
+
+    for bad in (packet[:-1], b"XX" + packet[2:]):
+        try:
+            decode(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Se esperaba ValueError")
+    print("protocol OK ({} bytes por paquete)".format(PACKET_SIZE))
+
+
+if __name__ == "__main__":
+    _self_test()
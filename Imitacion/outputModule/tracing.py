@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Trazas de latencia captura -> comando entre la visión y el robot.
+
+Compatible con Python 2.7 (RobotActua) y Python 3 (Imitacion): solo usa
+la librería estándar.
+
+Cada pose lleva un bloque "Timing" con el id del frame y los instantes de
+captura, fin de inferencia y envío (reloj del proceso de visión), más la
+última estimación del desfase de relojes. El receptor agrega los instantes
+de recepción y de comando, y LatencyTrace arma el desglose por tramo.
+
+El desfase se estima como en NTP sobre el mismo enlace: el robot responde
+de vez en cuando a una pose con (T0 envío, T1 recepción, T2 respuesta) y
+la visión anota T3 al leer la respuesta. La muestra de menor ida y vuelta
+de una ventana es la más confiable.
+"""
+import json
+from collections import deque
+
+SEGMENTS = ("capture->inference", "inference->send", "send->receive", "receive->command", "total")
+
+
+def make_timing(frame_id, capture, inference=None, send=None, clock_offset=None):
+    """Bloque "Timing" de una pose (segundos, reloj de la visión)"""
+    return {
+        "FrameId": frame_id,
+        "Capture": capture,
+        "Inference": inference,
+        "Send": send,
+        "ClockOffset": clock_offset  # reloj del robot - reloj de la visión
+    }
+
+
+def sync_reply(t0, t1, t2):
+    """Respuesta de sincronización del robot (una línea JSON)"""
+    return (json.dumps({"SyncReply": [t0, t1, t2]}) + "\n").encode("utf-8")
+
+
+def parse_sync_replies(buffer):
+    """Separa las respuestas completas de un buffer de bytes.
+
+    Devuelve ([(t0, t1, t2), ...], bytes restantes).
+    """
+    replies = []
+    lines = buffer.split(b"\n")
+    for line in lines[:-1]:
+        try:
+            t0, t1, t2 = json.loads(line.decode("utf-8"))["SyncReply"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        replies.append((t0, t1, t2))
+    return replies, lines[-1]
+
+
+class ClockOffsetEstimator(object):
+    """Desfase (reloj remoto - reloj local) a partir de intercambios NTP"""
+
+    def __init__(self, window=16):
+        self.samples = deque(maxlen=window)  # (ida y vuelta, desfase)
+
+    def add(self, t0, t1, t2, t3):
+        """t0/t3 en el reloj local, t1/t2 en el remoto"""
+        round_trip = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0
+        self.samples.append((round_trip, offset))
+
+    @property
+    def offset(self):
+        if not self.samples:
+            return None
+        return min(self.samples)[1]
+
+    @property
+    def round_trip(self):
+        if not self.samples:
+            return None
+        return min(self.samples)[0]
+
+
+class LatencyTrace(object):
+    """Desglose de latencia por tramo en el reloj del receptor"""
+
+    def __init__(self, window=1000):
+        self.values = dict((segment, deque(maxlen=window)) for segment in SEGMENTS)
+        self.frames = 0
+        self.unsynced = 0  # Poses sin desfase estimado (se asume reloj común)
+
+    def record(self, timing, receive_time, command_time):
+        """Agrega una pose comandada; devuelve su desglose en segundos (o None)"""
+        if not timing or timing.get("Capture") is None:
+            return None
+        offset = timing.get("ClockOffset")
+        if offset is None:
+            offset = 0.0
+            self.unsynced += 1
+
+        capture = timing["Capture"]
+        inference = timing.get("Inference")
+        send = timing.get("Send")
+        breakdown = {"total": command_time - (capture + offset),
+                     "receive->command": command_time - receive_time}
+        if inference is not None:
+            breakdown["capture->inference"] = inference - capture
+        if send is not None:
+            breakdown["send->receive"] = receive_time - (send + offset)
+            if inference is not None:
+                breakdown["inference->send"] = send - inference
+
+        for segment, value in breakdown.items():
+            self.values[segment].append(value)
+        self.frames += 1
+        return breakdown
+
+    def percentiles(self, segment, fractions=(0.5, 0.95)):
+        ordered = sorted(self.values[segment])
+        if not ordered:
+            return None
+        return [ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] for fraction in fractions]
+
+    def summary(self):
+        parts = []
+        for segment in SEGMENTS:
+            values = self.percentiles(segment)
+            if values is not None:
+                parts.append("{} p50 {:.1f} / p95 {:.1f} ms".format(segment, values[0] * 1000, values[1] * 1000))
+        line = "Latencia ({} poses): ".format(self.frames) + (", ".join(parts) if parts else "sin datos")
+        if self.unsynced:
+            line += " [{} sin sincronizar]".format(self.unsynced)
+        return line
+
+
+def _self_test():
+    """Desfase conocido y desglose; ejecutar con python2.7 y python3"""
+    estimator = ClockOffsetEstimator()
+    remote_offset = 100.0
+    # Ida 5 ms, vuelta 5 ms; una muestra con cola de 40 ms se descarta por ida y vuelta mayor
+    estimator.add(10.0, 10.005 + remote_offset, 10.006 + remote_offset, 10.011)
+    estimator.add(11.0, 11.045 + remote_offset, 11.046 + remote_offset, 11.051)
+    assert abs(estimator.offset - remote_offset) < 1e-6 and abs(estimator.round_trip - 0.010) < 1e-6
+
+    replies, rest = parse_sync_replies(sync_reply(1.0, 2.0, 3.0) + b"basura\n" + sync_reply(4.0, 5.0, 6.0)[:5])
+    assert replies == [(1.0, 2.0, 3.0)] and rest
+
+    trace = LatencyTrace()
+    timing = make_timing(7, 10.0, 10.030, 10.032, estimator.offset)
+    breakdown = trace.record(timing, 10.040 + remote_offset, 10.050 + remote_offset)
+    assert abs(breakdown["send->receive"] - 0.008) < 1e-6
+    assert abs(breakdown["total"] - 0.050) < 1e-6
+    assert trace.unsynced == 0
+    print("tracing OK: " + trace.summary())
+
+
+if __name__ == "__main__":
+    _self_test()
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+
+
+def write_json_atomic(data, path):
+    """Escribe en un archivo temporal y lo reemplaza con os.replace.
+
+    Los lectores ven el archivo anterior o el nuevo completo, nunca uno truncado.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class AsyncJsonWriter:
+    """Escribe JSON en un hilo de fondo con tasa máxima y "el último estado gana".
+
+    submit() solo guarda la referencia al estado más reciente; el hilo lo
+    serializa como mucho `max_rate` veces por segundo. Los envíos que llegan
+    entre dos escrituras se cuentan como coalescidos.
+    """
+
+    def __init__(self, path, max_rate=10.0, serialize=None):
+        """
+        Args:
+            serialize: Función opcional que convierte el estado enviado en
+                datos JSON; se ejecuta en el hilo de fondo.
+        """
+        self.path = path
+        self.serialize = serialize
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self._cond = threading.Condition()
+        self._pending = None
+        self._running = True
+
+        self.submitted = 0
+        self.written = 0
+        self.coalesced = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="json-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = data
+            self.submitted += 1
+            self._cond.notify()
+
+    def _run(self):
+        last_write = 0.0
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+
+            # Esperar fuera del lock para no frenar a submit()
+            delay = self.min_interval - (time.monotonic() - last_write)
+            if delay > 0 and self._running:
+                time.sleep(delay)
+
+            with self._cond:
+                data, self._pending = self._pending, None
+            if data is None:
+                continue
+            try:
+                if self.serialize is not None:
+                    data = self.serialize(data)
+                write_json_atomic(data, self.path)
+                self.written += 1
+            except Exception as e:
+                # Cualquier fallo (también en serialize) no debe matar el hilo
+                self.errors += 1
+                print(f"Error escribiendo {self.path}: {str(e)}")
+            last_write = time.monotonic()
+
+    def close(self, timeout=2.0):
+        """Escribe el último estado pendiente y detiene el hilo"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "errors": self.errors
+        }
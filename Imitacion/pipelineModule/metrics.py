@@ -0,0 +1,149 @@
+import bisect
+import os
+import threading
+import time
+
+# Límites fijos de los buckets en milisegundos; registrar una muestra es una
+# búsqueda binaria y un incremento, sin asignaciones
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 25, 33, 50, 75,
+                    100, 150, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # el último bucket es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q):
+        """Límite superior del bucket que contiene el percentil q (0-100),
+        acotado por el máximo observado"""
+        if self.count == 0:
+            return 0.0
+        target = q / 100.0 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+class _StageTimer:
+    """Context manager de un solo uso: stage() crea uno por medición para que
+    dos hilos midiendo la misma etapa no se pisen el inicio"""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class StageMetrics:
+    """Latencia por etapa con histogramas de buckets fijos (p50/p95/p99).
+
+    Uso:
+        with metrics.stage("pose"):
+            results = pose.process(image)
+    """
+
+    def __init__(self, enabled=True, prefix="nao_vision"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(name))
+
+    def observe(self, name, seconds):
+        """Registra una duración medida fuera de stage()"""
+        if self.enabled:
+            self._histogram(name).observe(seconds * 1000.0)
+
+    def summary(self):
+        lines = []
+        for name, histogram in list(self.histograms.items()):
+            lines.append(f"{name:14s} n={histogram.count:6d} p50={histogram.percentile(50):7.2f} "
+                         f"p95={histogram.percentile(95):7.2f} p99={histogram.percentile(99):7.2f} "
+                         f"max={histogram.max:7.2f} ms")
+        return "\n".join(lines)
+
+    def export_prometheus(self, path):
+        """Escribe los histogramas en formato de texto de Prometheus (atómico)"""
+        metric = f"{self.prefix}_stage_latency_ms"
+        lines = [f"# HELP {metric} Latencia por etapa del sistema de visión en milisegundos",
+                 f"# TYPE {metric} histogram"]
+        for name, histogram in list(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        self._write(path, "\n".join(lines) + "\n")
+
+    def export_csv(self, path):
+        lines = ["stage,count,mean_ms,p50_ms,p95_ms,p99_ms,max_ms"]
+        for name, histogram in list(self.histograms.items()):
+            lines.append(f"{name},{histogram.count},{histogram.mean:.4f},{histogram.percentile(50)},"
+                         f"{histogram.percentile(95)},{histogram.percentile(99)},{histogram.max:.4f}")
+        self._write(path, "\n".join(lines) + "\n")
+
+    def export(self, path):
+        """Elige el formato por extensión: .csv o Prometheus en cualquier otro caso"""
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_prometheus(path)
+
+    @staticmethod
+    def _write(path, text):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
@@ -0,0 +1,97 @@
+import threading
+
+
+class LatestSlot:
+    """Buffer de una sola posición con semántica "el último frame gana".
+
+    Cada put() reemplaza el elemento pendiente (si lo hay) y lo cuenta como
+    descartado, de modo que el consumidor siempre recibe el dato más reciente
+    y nunca se acumula latencia entre etapas.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self._closed = False
+
+        # Contadores de la etapa
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Devuelve el último elemento o None si vence el timeout / se cerró"""
+        with self._cond:
+            if not self._has_item and not self._closed:
+                self._cond.wait(timeout)
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            self.get_count += 1
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def depth(self):
+        return 1 if self._has_item else 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": self.depth(),
+                "put": self.put_count,
+                "get": self.get_count,
+                "dropped": self.dropped
+            }
+
+
+class StageThread(threading.Thread):
+    """Hilo de etapa que repite `step` hasta que se activa `stop_event`"""
+
+    def __init__(self, name, step, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.step = step
+        self.stop_event = stop_event
+        self.iterations = 0
+        self.errors = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                if self.step() is False:
+                    self.stop_event.set()
+                    break
+                self.iterations += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Error en etapa {self.name}: {str(e)}")
+
+
+def format_stats(slots):
+    """Texto compacto con profundidad y descartes por etapa"""
+    parts = []
+    for slot in slots:
+        s = slot.stats()
+        parts.append(f"{slot.name}: depth={s['depth']} put={s['put']} "
+                     f"get={s['get']} dropped={s['dropped']}")
+    return " | ".join(parts)
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import cv2
+import mediapipe as mp
+
+from pipelineModule import pipeline
+
+drawing_mp = mp.solutions.drawing_utils
+pose_mp = mp.solutions.pose
+
+
+class PreviewRenderer:
+    """Vista previa reducida y anotada dibujada en su propio hilo.
+
+    El hilo de inferencia solo entrega referencias con submit(); el
+    redimensionado, el dibujo del esqueleto, el texto y la ventana (o el
+    archivo de salida) se hacen aquí a baja frecuencia. Todas las llamadas
+    a HighGUI ocurren en este hilo.
+    """
+
+    def __init__(self, window_name, fps=5.0, scale=0.5, output_path=None):
+        """
+        Args:
+            output_path: Si se indica, se escribe un JPEG en lugar de abrir una ventana
+        """
+        self.window_name = window_name
+        self.period = 1.0 / fps
+        self.scale = scale
+        self.output_path = output_path
+        self.slot = pipeline.LatestSlot("preview")
+        self.quit_requested = False
+        self.rendered = 0
+        self._last_submit = 0.0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="preview", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, pose_landmarks=None, joints=None):
+        """Entrega el último frame; fuera del ritmo de la vista previa no hace nada"""
+        now = time.monotonic()
+        if now - self._last_submit < self.period:
+            return
+        self._last_submit = now
+        self.slot.put((frame, pose_landmarks, joints.copy() if joints is not None else None))
+
+    def _run(self):
+        drawing_spec = drawing_mp.DrawingSpec(color=(245, 66, 230), thickness=1, circle_radius=1)
+        while not self._stop_event.is_set():
+            item = self.slot.get(timeout=self.period)
+            if item is None:
+                if self.output_path is None and cv2.waitKey(1) & 0xFF == ord('q'):
+                    self.quit_requested = True
+                continue
+            frame, pose_landmarks, joints = item
+            image = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            if pose_landmarks is not None:
+                drawing_mp.draw_landmarks(image, pose_landmarks, pose_mp.POSE_CONNECTIONS,
+                                          drawing_spec, drawing_spec)
+            if joints is not None:
+                self._draw_angles(image, joints)
+
+            if self.output_path is not None:
+                cv2.imwrite(self.output_path, image)
+            else:
+                cv2.imshow(self.window_name, image)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    self.quit_requested = True
+            self.rendered += 1
+
+        if self.output_path is None:
+            cv2.destroyAllWindows()
+
+    @staticmethod
+    def _draw_angles(image, joints):
+        y = 15
+        for joint_name in ("HeadPitch", "HeadYaw", "LElbowRoll", "RElbowRoll"):
+            degree = joints.get_degree(joint_name)
+            if degree is None:
+                continue
+            cv2.putText(image, f"{joint_name}: {degree:.0f}", (5, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+            y += 15
+
+    def close(self):
+        self._stop_event.set()
+        self.slot.close()
+        self._thread.join(timeout=1.0)
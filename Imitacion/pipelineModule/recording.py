@@ -0,0 +1,177 @@
+"""Grabación y lectura de secuencias de landmarks.
+
+Formato: una cabecera de 16 bytes seguida de registros de tamaño fijo
+(RECORD_DTYPE), uno por frame. Los registros solo se agregan al final, así
+un corte a mitad de escritura pierde como mucho el último frame, y el
+archivo completo se puede mapear en memoria como un array estructurado.
+
+Los landmarks se guardan normalizados (como los entrega MediaPipe, ya en
+coordenadas del frame completo) en float32; NaN indica que no hubo
+detección.
+"""
+import os
+import struct
+import time
+
+import numpy as np
+
+from computerVisionModules import synthetic
+
+MAGIC = b"NLMK"
+VERSION = 1
+# magic, versión, landmarks de pose, landmarks de cara, reservado, tamaño de registro
+HEADER = struct.Struct("<4sHHHHI")
+
+FLAG_POSE_RAN = 0x01  # Pose se ejecutó en este frame (si no, se reutilizó el resultado anterior)
+FLAG_FACE_RAN = 0x02  # FaceMesh se ejecutó en este frame
+
+RECORD_DTYPE = np.dtype([
+    ("frame_id", "<u8"),
+    ("capture_time", "<f8"),   # time.time() de la captura
+    ("width", "<u2"),
+    ("height", "<u2"),
+    ("flags", "<u4"),
+    ("pose", "<f4", (synthetic.NUM_POSE_LANDMARKS, 4)),   # x, y, z, visibility
+    ("face", "<f4", (synthetic.NUM_FACE_LANDMARKS, 3)),   # x, y, z
+])
+
+
+def _header():
+    return HEADER.pack(MAGIC, VERSION, synthetic.NUM_POSE_LANDMARKS,
+                       synthetic.NUM_FACE_LANDMARKS, 0, RECORD_DTYPE.itemsize)
+
+
+def _check_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: archivo sin cabecera")
+    magic, version, num_pose, num_face, _, record_size = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: no es una grabación de landmarks v{VERSION}")
+    if (num_pose, num_face, record_size) != (synthetic.NUM_POSE_LANDMARKS,
+                                            synthetic.NUM_FACE_LANDMARKS, RECORD_DTYPE.itemsize):
+        raise ValueError(f"{path}: formato de registro incompatible")
+
+
+def _fill(target, landmark_list, dims):
+    if landmark_list is None:
+        target[:] = np.nan
+        return
+    if dims == 4:
+        target[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark]
+    else:
+        target[:] = [(lm.x, lm.y, lm.z) for lm in landmark_list.landmark]
+
+
+class LandmarkRecorder:
+    """Agrega un registro por frame al final del archivo"""
+
+    def __init__(self, path, flush_every=30):
+        self.path = path
+        self.flush_every = flush_every
+        self.frames = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                _check_header(file.read(HEADER.size), path)
+            # Se descarta un registro incompleto (corte durante una escritura)
+            size = os.path.getsize(path)
+            complete = HEADER.size + (size - HEADER.size) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            self._file = open(path, "r+b")
+            self._file.truncate(complete)
+            self._file.seek(complete)
+        else:
+            self._file = open(path, "wb")
+            self._file.write(_header())
+
+    def record(self, frame_id, capture_time, image_shape, body_results=None, face_results=None):
+        """
+        Args:
+            image_shape: frame.shape del frame procesado (alto, ancho, ...)
+            body_results/face_results: Resultados de MediaPipe, o None si ese
+                modelo no se ejecutó en este frame
+        """
+        record = self._record[0]
+        record["frame_id"] = frame_id
+        record["capture_time"] = capture_time
+        record["height"], record["width"] = image_shape[:2]
+
+        flags = 0
+        pose_landmarks = face_landmarks = None
+        if body_results is not None:
+            flags |= FLAG_POSE_RAN
+            pose_landmarks = body_results.pose_landmarks
+        if face_results is not None:
+            flags |= FLAG_FACE_RAN
+            if face_results.multi_face_landmarks:
+                face_landmarks = face_results.multi_face_landmarks[0]
+        record["flags"] = flags
+        _fill(record["pose"], pose_landmarks, 4)
+        _fill(record["face"], face_landmarks, 3)
+
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class LandmarkLog:
+    """Grabación mapeada en memoria (solo lectura)"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            _check_header(file.read(HEADER.size), path)
+        count = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                     offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def duration(self):
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records["capture_time"][-1] - self.records["capture_time"][0])
+
+    @staticmethod
+    def results(record):
+        """(body_results, face_results) con la forma de MediaPipe; None para
+        el modelo que no se ejecutó en ese frame"""
+        flags = int(record["flags"])
+        body_results = synthetic.make_pose_results(record["pose"]) if flags & FLAG_POSE_RAN else None
+        face_results = synthetic.make_face_results(record["face"]) if flags & FLAG_FACE_RAN else None
+        return body_results, face_results
+
+    def replay(self, speed=1.0):
+        """Itera los registros respetando los tiempos de captura.
+
+        speed: 1.0 tiempo real, 2.0 el doble de rápido; None o 0 sin esperas.
+        Devuelve pares (registro, atraso en segundos respecto del horario).
+        """
+        if len(self.records) == 0:
+            return
+        first = float(self.records["capture_time"][0])
+        start = time.monotonic()
+        for record in self.records:
+            if not speed:
+                yield record, 0.0
+                continue
+            due = start + (float(record["capture_time"]) - first) / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield record, max(0.0, -delay)
+
+    def close(self):
+        # El mapa se libera al soltar la última referencia
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
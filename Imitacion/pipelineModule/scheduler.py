@@ -0,0 +1,205 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class InferenceScheduler:
+    """Decide por frame qué modelos ejecutar.
+
+    Cada modelo tiene su propio periodo (p. ej. Pose cada frame, FaceMesh
+    cada 3) y, si la diferencia con el último frame inferido en una versión
+    reducida en grises no supera el umbral, se omite la inferencia por
+    completo (como mucho `max_idle_frames` seguidos).
+    """
+
+    def __init__(self, pose_every=1, face_every=3, motion_threshold=1.5,
+                 motion_size=(64, 48), max_idle_frames=15):
+        """
+        Args:
+            motion_threshold: Diferencia absoluta media (0-255) que cuenta como movimiento;
+                None desactiva el filtrado por movimiento
+        """
+        self.pose_every = pose_every
+        self.face_every = face_every
+        self.motion_threshold = motion_threshold
+        self.motion_size = motion_size
+        self.max_idle_frames = max_idle_frames
+        self._reference = None
+        self._small = None
+        self._idle = 0
+        self._pose_due = 0
+        self._face_due = 0
+
+        self.frames = 0
+        self.motion_skips = 0
+        self.pose_runs = 0
+        self.face_runs = 0
+        self.last_motion = 0.0
+
+    def motion(self, frame):
+        """Diferencia media con el último frame inferido (0-255)"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self._small = cv2.resize(gray, self.motion_size, interpolation=cv2.INTER_AREA)
+        if self._reference is None:
+            return float("inf")
+        return float(cv2.absdiff(self._small, self._reference).mean())
+
+    def plan(self, frame):
+        """Devuelve (ejecutar_pose, ejecutar_cara) para este frame"""
+        self.frames += 1
+        if self.motion_threshold is not None:
+            self.last_motion = self.motion(frame)
+            if self.last_motion < self.motion_threshold and self._idle < self.max_idle_frames:
+                self._idle += 1
+                self.motion_skips += 1
+                return False, False
+        self._idle = 0
+        self._reference = self._small
+
+        run_pose = self._pose_due <= 0
+        run_face = self._face_due <= 0
+        self._pose_due = self.pose_every - 1 if run_pose else self._pose_due - 1
+        self._face_due = self.face_every - 1 if run_face else self._face_due - 1
+        self.pose_runs += run_pose
+        self.face_runs += run_face
+        return run_pose, run_face
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "motion_skips": self.motion_skips,
+            "pose_runs": self.pose_runs,
+            "face_runs": self.face_runs,
+            "last_motion": round(self.last_motion, 2)
+        }
+
+
+class AngleExtrapolator:
+    """Extrapolación lineal por articulación entre inferencias.
+
+    Guarda el último valor y la velocidad de cada articulación y predice
+    hacia adelante como mucho `max_horizon` segundos desde la última
+    medición real; pasado ese tiempo la articulación queda donde está.
+    """
+
+    def __init__(self, size, max_horizon=0.15):
+        self.max_horizon = max_horizon
+        self.value = np.full(size, np.nan)
+        self.velocity = np.zeros(size)
+        self.time = np.full(size, np.nan)
+
+    def update(self, timestamp, values, mask):
+        """Registra valores medidos para las articulaciones de `mask`"""
+        mask = mask & ~np.isnan(values)
+        dt = timestamp - self.time
+        known = mask & ~np.isnan(self.value) & (dt > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            velocity = (values - self.value) / dt
+        self.velocity[known] = velocity[known]
+        self.velocity[mask & ~known] = 0.0
+        self.value[mask] = values[mask]
+        self.time[mask] = timestamp
+
+    def predict(self, timestamp, out, mask):
+        """Escribe en `out` la predicción para las articulaciones de `mask`.
+
+        Devuelve True si escribió alguna; las que superaron `max_horizon`
+        desde su última medición se dejan sin tocar.
+        """
+        mask = mask & ~np.isnan(self.value)
+        dt = timestamp - self.time
+        mask &= dt <= self.max_horizon
+        if not mask.any():
+            return False
+        dt = np.maximum(dt, 0.0)
+        out[mask] = self.value[mask] + self.velocity[mask] * dt[mask]
+        return True
+
+
+class DeadlineScheduler:
+    """Ritmo por deadlines y degradación automática de calidad.
+
+    El ritmo se basa en deadlines absolutos (no en el inicio del frame
+    anterior): si un frame llega tarde no se intenta recuperar el atraso.
+    El costo real de cada frame se suaviza con una media exponencial; si
+    supera el presupuesto 1/target_fps durante `down_after` frames se baja
+    un nivel de la escalera de calidad, y si queda holgura durante
+    `up_after` frames se sube uno. Solo deben registrarse los frames que
+    ejecutaron inferencia: los que omite el detector de movimiento cuestan
+    casi nada y harían subir la calidad por error. Se guardan las últimas
+    `history` transiciones.
+    """
+
+    LEVELS = ("full", "no_overlays", "low_resolution", "light_model", "frame_skip")
+
+    def __init__(self, target_fps, down_after=10, up_after=60, headroom=0.7,
+                 smoothing=0.2, max_level=None, history=100):
+        self.period = 1.0 / target_fps
+        self.down_after = down_after
+        self.up_after = up_after
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.max_level = len(self.LEVELS) - 1 if max_level is None else max_level
+        self.level = 0
+        self.average_cost = None
+        self.next_deadline = None
+        self._over = 0
+        self._under = 0
+        self._frame = 0
+
+        self.missed_deadlines = 0
+        self.transitions = deque(maxlen=history)  # (timestamp, nivel anterior, nivel nuevo, costo medio)
+
+    @property
+    def level_name(self):
+        return self.LEVELS[self.level]
+
+    def wait_for_next_frame(self):
+        """Duerme hasta el próximo deadline; si ya pasó un periodo completo, re-sincroniza"""
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        delay = self.next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        elif -delay > self.period:
+            self.missed_deadlines += 1
+            self.next_deadline = now
+        self.next_deadline += self.period
+
+    def should_skip(self):
+        """En el último nivel se procesa solo uno de cada dos frames"""
+        self._frame += 1
+        return self.level >= self.LEVELS.index("frame_skip") and self._frame % 2 == 0
+
+    def record(self, cost):
+        """Registra el costo (s) de un frame inferido; devuelve el nuevo nivel si cambió, si no None"""
+        if self.average_cost is None:
+            self.average_cost = cost
+        else:
+            self.average_cost += self.smoothing * (cost - self.average_cost)
+
+        if self.average_cost > self.period:
+            self._over += 1
+            self._under = 0
+        elif self.average_cost < self.period * self.headroom:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_after and self.level < self.max_level:
+            return self._transition(self.level + 1)
+        if self._under >= self.up_after and self.level > 0:
+            return self._transition(self.level - 1)
+        return None
+
+    def _transition(self, level):
+        previous, self.level = self.level, level
+        self._over = self._under = 0
+        self.transitions.append((time.time(), previous, level, self.average_cost))
+        print(f"[calidad] {self.LEVELS[previous]} -> {self.LEVELS[level]} "
+              f"(costo medio {self.average_cost * 1000:.1f} ms, presupuesto {self.period * 1000:.1f} ms)")
+        return level
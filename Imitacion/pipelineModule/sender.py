@@ -0,0 +1,171 @@
+import json
+import socket
+import threading
+import time
+
+from outputModule import tracing
+from pipelineModule import pipeline
+
+
+class PoseSender:
+    """Envío de poses al robot desde un hilo propio.
+
+    El bucle de visión solo deja la última pose en un buzón de una posición
+    (pipeline.LatestSlot) y nunca espera a la red: si el envío se atrasa, las
+    poses reemplazadas se descartan. Ante cualquier error de socket se
+    reconecta con espera exponencial. Las respuestas de sincronización del
+    robot se leen en otro hilo para estimar el desfase de relojes.
+    """
+
+    def __init__(self, host, port, transport="tcp", wire_format="json", timeout=2.0,
+                 backoff_initial=0.5, backoff_max=10.0, metrics=None):
+        """
+        Args:
+            transport: "tcp" o "udp"
+            wire_format: "json" o "binary" (outputModule/protocol.py)
+            timeout: Segundos máximos de connect/sendall antes de reconectar
+            metrics: StageMetrics opcional; el envío se mide como etapa "send"
+        """
+        self.address = (host, port)
+        self.transport = transport
+        self.wire_format = wire_format
+        self.timeout = timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.metrics = metrics
+        self.clock = tracing.ClockOffsetEstimator()  # Desfase con el reloj del robot
+        self.slot = pipeline.LatestSlot("sender")
+        self.sock = None
+        self.sequence = 0
+
+        # Estadísticas
+        self.sent = 0
+        self.errors = 0
+        self.connects = 0
+        self.reconnects = 0
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sender", daemon=True)
+        self._thread.start()
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+    def submit(self, joints, capture_time, frame_id=0, inference_time=None):
+        """Deja una copia de la pose en el buzón; no bloquea"""
+        self.slot.put((joints.copy(), capture_time, frame_id, inference_time))
+
+    def _connect(self):
+        kind = socket.SOCK_DGRAM if self.transport == "udp" else socket.SOCK_STREAM
+        sock = socket.socket(socket.AF_INET, kind)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        if self.transport == "tcp":
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Las respuestas de sincronización se leen al llegar para fechar bien T3
+        threading.Thread(target=self._listen_sync_replies, args=(sock,),
+                         name="clock-sync", daemon=True).start()
+        self.sock = sock
+        if self.connects:
+            self.reconnects += 1
+            self.clock = tracing.ClockOffsetEstimator()  # Puede ser otro proceso u otra máquina
+        self.connects += 1
+        print(f"Conectado al robot NAO ({self.transport}, {self.address[0]}:{self.address[1]})")
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def _encode(self, joints, capture_time, frame_id, inference_time, send_time):
+        if self.wire_format == "binary":
+            return joints.encode(self.sequence, capture_time, frame_id=frame_id,
+                                 inference_time=inference_time, send_time=send_time,
+                                 clock_offset=self.clock.offset)
+        data = joints.to_dict()
+        data["Timing"] = tracing.make_timing(frame_id, capture_time, inference_time,
+                                             send_time, self.clock.offset)
+        if self.transport == "udp":
+            # Cada datagrama es un mensaje completo con su secuencia
+            data.update(Sequence=self.sequence, Timestamp=capture_time)
+            return json.dumps(data).encode('utf-8')
+        return (json.dumps(data) + "\n").encode('utf-8')
+
+    def _send(self, item):
+        joints, capture_time, frame_id, inference_time = item
+        payload = self._encode(joints, capture_time, frame_id, inference_time, time.time())
+        self.sequence += 1
+        if self.transport == "udp":
+            self.sock.send(payload)
+        else:
+            self.sock.sendall(payload)
+        self.sent += 1
+
+    def _run(self):
+        backoff = self.backoff_initial
+        while not self._stop_event.is_set():
+            if self.sock is None:
+                try:
+                    self._connect()
+                    backoff = self.backoff_initial
+                except OSError as e:
+                    print(f"Error de conexión con NAO: {str(e)} (reintento en {backoff:.1f} s)")
+                    self._stop_event.wait(backoff)
+                    backoff = min(backoff * 2, self.backoff_max)
+                    continue
+
+            item = self.slot.get(timeout=0.1)
+            if item is None:
+                continue
+            try:
+                if self.metrics is not None:
+                    with self.metrics.stage("send"):
+                        self._send(item)
+                else:
+                    self._send(item)
+            except OSError as e:
+                self.errors += 1
+                print(f"Error en envío de datos: {str(e)}")
+                # En UDP un error (p.ej. ICMP) no invalida el socket; en TCP un
+                # envío a medias rompería el flujo, así que se reconecta
+                if self.transport != "udp":
+                    self._disconnect()
+
+    def _listen_sync_replies(self, sock):
+        """Hilo: recibe las respuestas (T0, T1, T2) del robot y estima el desfase"""
+        buffer = b""
+        while True:
+            try:
+                data = sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self.transport == "udp" and sock.fileno() != -1:
+                    continue  # En UDP un ICMP de puerto cerrado no invalida el socket
+                return  # Socket cerrado o conexión perdida
+            if not data:
+                return
+            arrival = time.time()
+            replies, buffer = tracing.parse_sync_replies(buffer + data)
+            for t0, t1, t2 in replies:
+                self.clock.add(t0, t1, t2, arrival)
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "sent": self.sent,
+            "dropped": self.slot.dropped,
+            "errors": self.errors,
+            "reconnects": self.reconnects
+        }
+
+    def close(self):
+        self._stop_event.set()
+        self.slot.close()
+        self._thread.join(timeout=self.timeout + 1.0)
+        self._disconnect()
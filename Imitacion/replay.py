@@ -0,0 +1,178 @@
+"""Reproducción de sesiones grabadas sin cámara ni modelos.
+
+Lee una grabación de landmarks (pipelineModule/recording.py, creada con
+RECORD_PATH en NAO/robot.py) y la pasa por las mismas etapas de ángulos
+(Landmarks, Elbows, HeadPoseEstimator) y salidas que el sistema en vivo:
+canal de memoria compartida (simulation/robot_virtual.py), JSON y socket
+hacia RobotActua/main.py.
+
+Uso:
+    python replay.py sesion.nlmk                          # tiempo real, canal compartido
+    python replay.py sesion.nlmk --speed 0 --send tcp     # lo más rápido posible hacia el robot
+    python replay.py sesion.nlmk --speed 0 --dump a.npz   # ángulos por frame para comparar
+"""
+import argparse
+import json
+import socket
+import time
+
+import numpy as np
+
+from computerVisionModules import elbows, head, Landmarks
+from computerVisionModules.filters import FilterBank
+from outputModule import output, channel, protocol, tracing
+from pipelineModule import recording
+
+ANGLE_TYPE = "Degree"
+
+
+class ReplaySession:
+    """Etapas de ángulos y salidas alimentadas desde una grabación"""
+
+    def __init__(self, json_path=None, use_channel=True, send=None, host="127.0.0.1",
+                 port=65432, wire_format="json", filter_on=True, filter_method="wma"):
+        """filter_on/filter_method: filtro de cabeza y codos; por defecto igual que el sistema en vivo"""
+        self.landmark_handler = Landmarks.Landmarks()
+        self.elbows_processor = elbows.Elbows(filter_method=filter_method)
+        self.elbows_processor.filter_on = filter_on
+        self.head_estimator = head.HeadPoseEstimator(draw_mesh=False, filter_on=filter_on,
+                                                     filter_method=filter_method)
+        self.program_output = output.Output()
+        self.pose_channel = channel.PoseChannelWriter() if use_channel else None
+        if json_path:
+            self.program_output.start_json_writer(json_path)
+        self.send = send
+        self.wire_format = wire_format
+        self.sequence = 0
+        self.client_socket = None
+        if send:
+            kind = socket.SOCK_DGRAM if send == "udp" else socket.SOCK_STREAM
+            self.client_socket = socket.socket(socket.AF_INET, kind)
+            self.client_socket.connect((host, port))
+        self._frames = {}
+
+    def blank_frame(self, width, height):
+        """Frame negro del tamaño grabado (las etapas solo usan sus dimensiones)"""
+        key = (int(width), int(height))
+        if key not in self._frames:
+            self._frames[key] = np.zeros((key[1], key[0], 3), dtype=np.uint8)
+        return self._frames[key]
+
+    def process(self, record):
+        """Recalcula los ángulos de un registro y los publica"""
+        frame = self.blank_frame(record["width"], record["height"])
+        body_results, face_results = recording.LandmarkLog.results(record)
+        # Los filtros usan el instante de captura grabado, no el reloj de la reproducción
+        capture_time = float(record["capture_time"])
+
+        if face_results is not None and face_results.multi_face_landmarks:
+            head_angle = self.head_estimator.get_head_positions(frame, face_results, ANGLE_TYPE, show_text=False,
+                                                                timestamp=capture_time)
+            self.program_output.set_group("Head", head_angle)
+        elif face_results is not None:
+            self.head_estimator.reset()  # Cara perdida en este frame
+
+        if body_results is not None and body_results.pose_landmarks:
+            body_info = self.landmark_handler.get_body_landmarks_array(body_results, frame)
+            elbows_angle = self.elbows_processor.get_elbows_info(frame, body_info, ANGLE_TYPE, show_text=False,
+                                                                 timestamp=capture_time)
+            self.program_output.set_group("Elbows", elbows_angle["Angles"]["Elbows"])
+
+        self.publish(int(record["frame_id"]))
+        return self.program_output.joints
+
+    def publish(self, frame_id=0):
+        # La reproducción hace de captura: el instante actual es captura y envío
+        timestamp = time.time()
+        joints = self.program_output.joints
+        if self.pose_channel is not None:
+            self.pose_channel.write_joints(joints, timestamp, frame_id=frame_id)
+        if self.program_output.json_writer is not None:
+            self.program_output.submit_json_data()
+        if self.client_socket is not None:
+            # Mismo formato que VisionSystem.send_to_nao
+            if self.wire_format == "binary":
+                payload = joints.encode(self.sequence, timestamp, frame_id=frame_id, send_time=timestamp)
+            else:
+                data = dict(self.program_output.output,
+                            Timing=tracing.make_timing(frame_id, timestamp, send=timestamp))
+                if self.send == "udp":
+                    data.update(Sequence=self.sequence, Timestamp=timestamp)
+                    payload = json.dumps(data).encode('utf-8')
+                else:
+                    payload = (json.dumps(data) + "\n").encode('utf-8')
+            if self.send == "udp":
+                self.client_socket.send(payload)
+            else:
+                self.client_socket.sendall(payload)
+        self.sequence += 1
+
+    def close(self):
+        if self.pose_channel is not None:
+            self.pose_channel.close()
+        if self.program_output.json_writer is not None:
+            self.program_output.json_writer.close()
+        if self.client_socket is not None:
+            self.client_socket.close()
+
+
+def run_replay(path, speed=1.0, loops=1, dump_path=None, **session_options):
+    log = recording.LandmarkLog(path)
+    print(f"{path}: {len(log)} frames, {log.duration():.1f} s grabados")
+    session = ReplaySession(**session_options)
+    radians = np.full((len(log) * loops, protocol.NUM_JOINTS), np.nan, dtype=np.float32)
+    lags = []
+
+    start = time.monotonic()
+    try:
+        row = 0
+        for _ in range(loops):
+            for record, lag in log.replay(speed):
+                radians[row] = session.process(record).radians
+                lags.append(lag)
+                row += 1
+    except KeyboardInterrupt:
+        radians = radians[:row]
+    finally:
+        session.close()
+        log.close()
+    elapsed = time.monotonic() - start
+
+    frames = len(lags)
+    line = f"{frames} frames en {elapsed:.2f} s ({frames / max(elapsed, 1e-9):.1f} FPS)"
+    if speed and lags:
+        line += f" | atraso p50 {np.percentile(lags, 50) * 1000:.1f} ms, máx {max(lags) * 1000:.1f} ms"
+    print(line)
+
+    if dump_path:
+        np.savez_compressed(dump_path, joint_radians=radians,
+                            joint_names=np.array(protocol.JOINT_NAMES))
+        print(f"Ángulos guardados en {dump_path}")
+    return radians
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce una grabación de landmarks")
+    parser.add_argument("path", help="Archivo de grabación")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="1 = tiempo original, 2 = doble de rápido, 0 = sin esperas")
+    parser.add_argument("--loops", type=int, default=1)
+    parser.add_argument("--no-channel", action="store_true", help="No publicar en el canal compartido")
+    parser.add_argument("--json", help="Escribir también el JSON de salida en esta ruta")
+    parser.add_argument("--send", choices=("tcp", "udp"), help="Enviar a RobotActua/main.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65432)
+    parser.add_argument("--wire-format", choices=("json", "binary"), default="json")
+    parser.add_argument("--no-filter", action="store_true",
+                        help="Sin el filtro de ángulos de cabeza y codos (el sistema en vivo lo aplica)")
+    parser.add_argument("--filter-method", choices=FilterBank.METHODS, default="wma")
+    parser.add_argument("--dump", help="Guardar los ángulos por frame (NPZ)")
+    args = parser.parse_args()
+    run_replay(args.path, args.speed, args.loops, args.dump,
+               json_path=args.json, use_channel=not args.no_channel, send=args.send,
+               host=args.host, port=args.port, wire_format=args.wire_format,
+               filter_on=not args.no_filter, filter_method=args.filter_method)
+
+
+if __name__ == "__main__":
+    main()
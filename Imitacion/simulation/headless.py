@@ -0,0 +1,316 @@
+# coding: utf-8
+"""Simulación sin ventana (pybullet DIRECT) con paso fijo de reloj real.
+
+A diferencia de robot_virtual.py, la física avanza un paso cada
+`timestep` segundos de reloj de pared, sin importar cuántas poses lleguen:
+en cada paso se toma la pose más reciente (si hay una nueva) y se aplica
+con un solo setAngles. Si un paso se atrasa se encadenan los siguientes
+sin esperar hasta `max_lag`; más atrás que eso se abandona el atraso y se
+cuenta como reinicio de reloj.
+
+Reporta pasos por segundo logrados, factor de tiempo real y la latencia
+pose -> articulación (captura -> paso que aplicó la pose). Sirve para
+correr en contenedores Linux sin pantalla y verificar que se mantiene el
+tiempo real.
+
+Uso:
+    python headless.py --duration 30                      # poses del canal compartido (robot.py)
+    python headless.py --pose-rate 30 --min-realtime 0.95 # poses sintéticas; código 1 si no llega
+    python headless.py --source json --robot pepper
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+sys.path.append('..')
+from outputModule import channel, output, tracing
+import retarget
+
+TIMESTEP = 1.0 / 240.0    # Paso de física por defecto de pybullet
+MAX_LAG = 0.25            # Segundos de atraso antes de reiniciar el reloj de pasos
+JSON_POLL_INTERVAL = 0.1  # Segundos entre lecturas de ../output.json
+STATS_INTERVAL = 5.0
+
+
+class HeadlessRunner:
+    def __init__(self, step, set_angles, read_pose, retargeter, timestep=TIMESTEP, max_lag=MAX_LAG):
+        """
+        Args:
+            step: Avanza la física un paso
+            set_angles: set_angles(nombres, radianes) con las articulaciones a mover
+            read_pose: Devuelve (radianes de `retargeter`, timing) o None si no hay pose nueva
+        """
+        self.step = step
+        self.set_angles = set_angles
+        self.read_pose = read_pose
+        self.retargeter = retargeter
+        self.timestep = timestep
+        self.max_lag = max_lag
+        self.trace = tracing.LatencyTrace()
+
+        self.steps = 0
+        self.poses = 0
+        self.clock_resets = 0
+        self.skipped_steps = 0
+        self.elapsed = 0.0
+
+    def run(self, duration=None, stats_interval=STATS_INTERVAL, stop_event=None):
+        """Pasos de `timestep` hasta `duration` segundos (None = hasta Ctrl+C o stop_event)"""
+        start = time.monotonic()
+        next_tick = start
+        last_stats = start
+        try:
+            while stop_event is None or not stop_event.is_set():
+                now = time.monotonic()
+                if duration is not None and now - start >= duration:
+                    break
+                if next_tick > now:
+                    time.sleep(next_tick - now)
+                elif now - next_tick > self.max_lag:
+                    # Demasiado atrás: no se intenta recuperar, se reinicia el reloj
+                    self.skipped_steps += int((now - next_tick) / self.timestep)
+                    self.clock_resets += 1
+                    next_tick = now
+
+                pose = self.read_pose()
+                if pose is not None:
+                    receive_time = time.time()
+                    self.apply(pose[0])
+                self.step()
+                self.steps += 1
+                if pose is not None:
+                    # La pose llega a las articulaciones con este paso
+                    self.trace.record(pose[1], receive_time, time.time())
+                    self.poses += 1
+                next_tick += self.timestep
+
+                if stats_interval and now - last_stats >= stats_interval:
+                    self.elapsed = now - start
+                    print(self.summary())
+                    last_stats = now
+        except KeyboardInterrupt:
+            pass
+        self.elapsed = time.monotonic() - start
+
+    def apply(self, values):
+        names, radians = self.retargeter.commands(values)
+        if names:
+            self.set_angles(names, radians)
+
+    def stats(self):
+        elapsed = max(self.elapsed, 1e-9)
+        return {
+            "steps": self.steps,
+            "steps_per_sec": round(self.steps / elapsed, 1),
+            "target_steps_per_sec": round(1.0 / self.timestep, 1),
+            "realtime_factor": round(self.steps * self.timestep / elapsed, 3),
+            "poses": self.poses,
+            "clock_resets": self.clock_resets,
+            "skipped_steps": self.skipped_steps
+        }
+
+    def summary(self):
+        return f"Simulación: {self.stats()}\n{self.trace.summary()}"
+
+
+def robot_retargeter(joint_dict):
+    """JointRetargeter limitado a las articulaciones de un robot de qibullet.
+
+    Pepper no tiene caderas izquierda/derecha, y sus rangos no son los del
+    NAO: se comandan solo las articulaciones de `joint_dict`, recortadas a los
+    límites del propio modelo. LHand/RHand no aparecen en joint_dict; qibullet
+    las traduce a los dedos, así que se conservan si el robot tiene dedos.
+    """
+    limits = {}
+    for name, joint in joint_dict.items():
+        limits[name] = (joint.getLowerLimit(), joint.getUpperLimit())
+    for hand, side in (("LHand", "L"), ("RHand", "R")):
+        if any(name.startswith(side) and "Finger" in name for name in joint_dict):
+            limits[hand] = retarget.JOINT_LIMITS[hand]
+    return retarget.JointRetargeter(limits=limits, joint_names=set(limits))
+
+
+def channel_source(retargeter, path=channel.DEFAULT_PATH):
+    """read_pose desde el canal de memoria compartida; devuelve (read_pose, close)"""
+    reader = channel.PoseChannelReader(path)
+
+    def read_pose():
+        packet = reader.read()
+        if packet is None:
+            return None
+        return retargeter.from_packet(packet)
+
+    return read_pose, reader.close
+
+
+def json_source(retargeter, path="../output.json", poll_interval=JSON_POLL_INTERVAL):
+    """read_pose desde output.json, releído solo si cambió y como máximo cada poll_interval"""
+    state = {"next_poll": 0.0, "mtime": None}
+
+    def read_pose():
+        now = time.monotonic()
+        if now < state["next_poll"]:
+            return None
+        state["next_poll"] = now + poll_interval
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime == state["mtime"]:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None  # Escritura a medias: se reintenta en la siguiente lectura
+        state["mtime"] = mtime
+        return retargeter.from_output(data), data.get("Timing")
+
+    return read_pose, lambda: None
+
+
+class SyntheticPublisher(threading.Thread):
+    """Publica poses sintéticas en un canal propio al ritmo pedido"""
+
+    def __init__(self, path, rate):
+        super().__init__(name="synthetic-poses", daemon=True)
+        self.writer = channel.PoseChannelWriter(path)
+        self.period = 1.0 / rate
+        self.stop_event = threading.Event()
+
+    def run(self):
+        joints = output.JointState()
+        start = time.time()
+        while not self.stop_event.wait(self.period):
+            t = time.time() - start
+            joints.set("HeadYaw", 0.8 * np.sin(t))
+            joints.set("HeadPitch", 0.3 * np.sin(0.5 * t))
+            joints.set("LElbowRoll", 2.0 + 0.8 * np.sin(2.0 * t))
+            joints.set("RElbowRoll", 2.0 + 0.8 * np.cos(2.0 * t))
+            self.writer.write_joints(joints, time.time())
+
+    def close(self):
+        self.stop_event.set()
+        self.join(timeout=1.0)
+        self.writer.close()
+
+
+def run_headless(args):
+    import pybullet as p
+    from qibullet import SimulationManager
+
+    simulation_manager = SimulationManager()
+    # gui=False lanza pybullet en modo DIRECT
+    client = simulation_manager.launchSimulation(gui=False, auto_step=False)
+    p.setTimeStep(args.timestep, physicsClientId=client)
+    if args.robot == "pepper":
+        robot = simulation_manager.spawnPepper(client, spawn_ground_plane=True)
+    else:
+        robot = simulation_manager.spawnNao(client, spawn_ground_plane=True)
+
+    retargeter = robot_retargeter(robot.joint_dict)
+    publisher = None
+    if args.pose_rate:
+        channel_path = os.path.join(tempfile.gettempdir(), "nao_pose_headless.channel")
+        publisher = SyntheticPublisher(channel_path, args.pose_rate)
+        publisher.start()
+        read_pose, close_source = channel_source(retargeter, channel_path)
+    elif args.source == "json":
+        read_pose, close_source = json_source(retargeter)
+    else:
+        read_pose, close_source = channel_source(retargeter)
+
+    runner = HeadlessRunner(lambda: simulation_manager.stepSimulation(client),
+                            lambda names, values: robot.setAngles(names, values, 1.0),
+                            read_pose, retargeter, args.timestep, args.max_lag)
+    print(f"Simulación headless ({args.robot}): paso {args.timestep * 1000:.2f} ms, Ctrl+C para salir")
+    try:
+        runner.run(args.duration, args.stats_interval)
+    finally:
+        if publisher is not None:
+            publisher.close()
+        close_source()
+        simulation_manager.stopSimulation(client)
+
+    print(runner.summary())
+    return runner
+
+
+def _self_test():
+    """Bucle de pasos con física y setAngles simulados, sin pybullet"""
+    class Joint:
+        def __init__(self, lower, upper):
+            self.lower, self.upper = lower, upper
+
+        def getLowerLimit(self):
+            return self.lower
+
+        def getUpperLimit(self):
+            return self.upper
+
+    # Articulaciones con el estilo de Pepper: sin caderas L/R, con dedos
+    joint_dict = {"HeadYaw": Joint(-2.0, 2.0), "HeadPitch": Joint(-0.5, 0.4),
+                  "LElbowRoll": Joint(-1.5, -0.01), "RElbowRoll": Joint(0.01, 1.5),
+                  "HipRoll": Joint(-0.5, 0.5), "LFinger21": Joint(0.0, 1.0)}
+    retargeter = robot_retargeter(joint_dict)
+    assert set(retargeter.names) == {"HeadYaw", "HeadPitch", "LElbowRoll", "RElbowRoll", "LHand"}, retargeter.names
+    head_pitch = retargeter.names.index("HeadPitch")
+    assert retargeter.upper[head_pitch] == 0.4
+
+    path = os.path.join(tempfile.gettempdir(), "nao_pose_selftest.channel")
+    publisher = SyntheticPublisher(path, 30.0)
+    publisher.start()
+    read_pose, close_source = channel_source(retargeter, path)
+    commands = []
+    runner = HeadlessRunner(lambda: time.sleep(0.001), lambda names, values: commands.append(names),
+                            read_pose, retargeter, timestep=1.0 / 240.0)
+    try:
+        runner.run(1.0, stats_interval=0)
+    finally:
+        publisher.close()
+        close_source()
+        os.remove(path)
+    stats = runner.stats()
+    assert stats["realtime_factor"] > 0.9 and stats["clock_resets"] == 0, stats
+    assert 20 <= stats["poses"] <= 31 and len(commands) == stats["poses"], stats
+    assert all(set(names) <= set(retargeter.names) for names in commands)
+
+    # Física más lenta que el paso: se reinicia el reloj en vez de acumular atraso
+    slow = HeadlessRunner(lambda: time.sleep(0.3), lambda names, values: None,
+                          lambda: None, retargeter, timestep=1.0 / 240.0)
+    slow.run(1.0, stats_interval=0)
+    assert slow.clock_resets > 0 and slow.skipped_steps > 0, slow.stats()
+    print("headless OK: " + str(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación sin ventana con paso fijo de reloj real")
+    parser.add_argument("--robot", choices=("nao", "pepper"), default="nao")
+    parser.add_argument("--source", choices=("channel", "json"), default="channel")
+    parser.add_argument("--pose-rate", type=float, default=0.0,
+                        help="Publicar poses sintéticas a este ritmo en lugar de leer la visión")
+    parser.add_argument("--duration", type=float, help="Segundos (por defecto hasta Ctrl+C)")
+    parser.add_argument("--timestep", type=float, default=TIMESTEP, help="Segundos por paso de física")
+    parser.add_argument("--max-lag", type=float, default=MAX_LAG)
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL)
+    parser.add_argument("--min-realtime", type=float,
+                        help="Código de salida 1 si el factor de tiempo real queda por debajo")
+    parser.add_argument("--self-test", action="store_true", help="Prueba del bucle sin pybullet")
+    args = parser.parse_args()
+    if args.self_test:
+        _self_test()
+        return
+
+    runner = run_headless(args)
+    if args.min_realtime is not None and runner.stats()["realtime_factor"] < args.min_realtime:
+        print(f"No se mantuvo el tiempo real (mínimo {args.min_realtime})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# coding: utf-8
+"""Tabla de retargeting pose -> articulaciones del NAO simulado.
+
+Nombres, fuentes, transformaciones y límites se compilan una sola vez en
+arreglos de NumPy; cada pose se convierte con unas pocas operaciones
+vectorizadas en lugar de una cadena de if/elif por articulación.
+
+La fuente de cada articulación es un vector en el orden de
+protocol.JOINTS seguido de las manos (1.0 = abierta). Transformación, en
+este orden:
+    1. fold:        valor absoluto
+    2. flip_above:  si el valor supera el umbral, se invierte el signo
+    3. scale/offset: valor * scale + offset
+    4. acople:      + shift si la articulación `couple` (fuente, sin
+                    transformar) supera `threshold` grados
+    5. recorte a [Min, Max]
+Las articulaciones sin dato (NaN) no se comandan.
+"""
+import sys
+
+import numpy as np
+sys.path.append('..')
+from outputModule import protocol
+
+SOURCE_NAMES = protocol.JOINT_NAMES + ("LHand", "RHand")
+SOURCE_INDEX = dict((name, index) for index, name in enumerate(SOURCE_NAMES))
+
+# Articulación del NAO -> (fuente, scale, offset, fold, flip_above, (couple, threshold, shift))
+RETARGET_TABLE = (
+    ("HeadYaw", "HeadYaw", 1.0, 0.0, False, None, None),
+    ("HeadPitch", "HeadPitch", -1.0, 0.0, False, None, None),  # El NAO mueve el Pitch de manera opuesta
+    ("LShoulderPitch", "LShoulderPitch", -1.0, np.pi / 2, False, None, None),
+    ("RShoulderPitch", "RShoulderPitch", -1.0, np.pi / 2, False, None, None),
+    ("LShoulderRoll", "LShoulderRoll", 1.0, 0.0, False, None, ("LShoulderPitch", 40.0, -np.pi / 10)),
+    ("RShoulderRoll", "RShoulderRoll", 1.0, 0.0, False, np.pi / 2, ("RShoulderPitch", 40.0, np.pi / 10)),
+    ("LElbowRoll", "LElbowRoll", 1.0, -np.pi, True, None, None),   # |r| - pi
+    ("RElbowRoll", "RElbowRoll", -1.0, np.pi, True, None, None),   # pi - |r|
+    ("LWristYaw", "LWristYaw", 1.0, 0.0, False, None, None),
+    ("RWristYaw", "RWristYaw", 1.0, 0.0, False, None, None),
+    ("LHipRoll", "LHipRoll", 1.0, 0.0, False, None, None),
+    ("RHipRoll", "RHipRoll", 1.0, 0.0, False, None, None),
+    ("LHipPitch", "LHipPitch", 1.0, 0.0, False, None, None),
+    ("RHipPitch", "RHipPitch", 1.0, 0.0, False, None, None),
+    ("LHand", "LHand", 1.0, 0.0, False, None, None),
+    ("RHand", "RHand", 1.0, 0.0, False, None, None),
+)
+
+# Límites del NAO en radianes (Min, Max)
+JOINT_LIMITS = {
+    "HeadYaw": (-2.0857, 2.0857),
+    "HeadPitch": (-0.6720, 0.5149),
+    "LShoulderRoll": (-0.3142, 1.3265),
+    "LShoulderPitch": (-2.0857, 2.0857),
+    "RShoulderRoll": (-1.3265, 0.3142),
+    "RShoulderPitch": (-2.0857, 2.0857),
+    "LElbowYaw": (-2.0857, 2.0857),
+    "LElbowRoll": (-1.5446, -0.0349),
+    "LWristYaw": (-1.8238, 1.8238),
+    "RElbowYaw": (-2.0857, 2.0857),
+    "RElbowRoll": (0.0349, 1.5446),
+    "RWristYaw": (-1.8238, 1.8238),
+    "LHipRoll": (-0.379472, 0.790477),
+    "RHipRoll": (-0.790477, 0.379472),
+    "LHipPitch": (-1.535889, 0.484090),
+    "RHipPitch": (-1.535889, 0.484090),
+    "LHand": (0.0, 1.0),
+    "RHand": (0.0, 1.0),
+}
+
+
+class JointRetargeter:
+    def __init__(self, table=RETARGET_TABLE, limits=None, joint_names=None):
+        """
+        Args:
+            limits: Dict articulación -> (Min, Max); por defecto JOINT_LIMITS
+            joint_names: Subconjunto de articulaciones a comandar (None = toda la tabla)
+        """
+        limits = JOINT_LIMITS if limits is None else limits
+        if joint_names is not None:
+            table = [row for row in table if row[0] in joint_names]
+        count = len(table)
+
+        self.names = tuple(row[0] for row in table)
+        self.source = np.array([SOURCE_INDEX[row[1]] for row in table], dtype=np.intp)
+        self.scale = np.array([row[2] for row in table])
+        self.offset = np.array([row[3] for row in table])
+        self.fold = np.array([row[4] for row in table], dtype=bool)
+        self.flip_above = np.array([np.inf if row[5] is None else row[5] for row in table])
+
+        # Acoples: solo las filas que los tienen
+        coupled = [(i, row[6]) for i, row in enumerate(table) if row[6] is not None]
+        self.couple_rows = np.array([i for i, _ in coupled], dtype=np.intp)
+        self.couple_source = np.array([SOURCE_INDEX[c[0]] for _, c in coupled], dtype=np.intp)
+        self.couple_threshold = np.radians([c[1] for _, c in coupled])
+        self.couple_shift = np.array([c[2] for _, c in coupled])
+
+        self.lower = np.full(count, -np.inf)
+        self.upper = np.full(count, np.inf)
+        for i, name in enumerate(self.names):
+            if name in limits:
+                self.lower[i], self.upper[i] = limits[name]
+
+        self._source = np.full(len(SOURCE_NAMES), np.nan)
+
+    def retarget(self, source):
+        """Vector fuente (orden de SOURCE_NAMES) -> radianes del NAO (NaN = sin dato)"""
+        values = source[self.source]
+        values = np.where(self.fold, np.abs(values), values)
+        values = np.where(values > self.flip_above, -values, values)
+        values = values * self.scale + self.offset
+        if len(self.couple_rows):
+            # NaN en la articulación de acople compara como False: sin corrección
+            active = source[self.couple_source] > self.couple_threshold
+            values[self.couple_rows] += np.where(active, self.couple_shift, 0.0)
+        return np.clip(values, self.lower, self.upper)
+
+    def from_radians(self, radians, flags=0):
+        """Radianes en orden de protocol.JOINTS (None/NaN = ausente) y flags de manos;
+        una mano sin su bit *_VALID queda en NaN, igual que is_open None en from_output"""
+        source = self._source
+        source[:protocol.NUM_JOINTS] = [np.nan if value is None else value for value in radians]
+        for name, valid, opened in (("LHand", protocol.FLAG_LEFT_HAND_VALID, protocol.FLAG_LEFT_HAND_OPEN),
+                                    ("RHand", protocol.FLAG_RIGHT_HAND_VALID, protocol.FLAG_RIGHT_HAND_OPEN)):
+            source[SOURCE_INDEX[name]] = (1.0 if flags & opened else 0.0) if flags & valid else np.nan
+        return self.retarget(source)
+
+    def from_packet(self, packet):
+        """Paquete de protocol.py -> (radianes del NAO, timing)"""
+        _, _, flags, radians, timing = protocol.decode(packet)
+        return self.from_radians(radians, flags), timing
+
+    def from_output(self, data):
+        """Esquema anidado de Output.output (p.ej. output.json)"""
+        angles = data.get("Angles", {})
+        source = self._source
+        for index, (_, path) in enumerate(protocol.JOINTS):
+            ref = angles
+            try:
+                for key in path:
+                    ref = ref[key]
+                value = ref.get("Radian")
+            except (KeyError, TypeError, AttributeError):
+                value = None
+            source[index] = np.nan if value is None else value
+        hands = data.get("Status", {}).get("Hands", {})
+        for name, side in (("LHand", "Left"), ("RHand", "Right")):
+            is_open = hands.get(side, {}).get("is_open")
+            source[SOURCE_INDEX[name]] = np.nan if is_open is None else float(is_open)
+        return self.retarget(source)
+
+    def commands(self, values):
+        """(nombres, valores) de las articulaciones con dato, para un solo setAngles"""
+        present = ~np.isnan(values)
+        return [name for name, ok in zip(self.names, present) if ok], values[present].tolist()
+
+
+def _self_test():
+    """Compara la tabla con la cadena if/elif original de robot_virtual.apply_pose"""
+    def reference(name, radian, source):
+        if name in ("LShoulderPitch", "RShoulderPitch"):
+            radian = 1.5708 - radian
+        elif name == "HeadPitch":
+            radian = -radian
+        elif name == "RShoulderRoll":
+            if radian > np.pi / 2:
+                radian = -radian
+            if np.degrees(source[SOURCE_INDEX["RShoulderPitch"]]) > 40:
+                radian = radian + np.pi / 10
+        elif name == "LShoulderRoll":
+            if np.degrees(source[SOURCE_INDEX["LShoulderPitch"]]) > 40:
+                radian = radian - np.pi / 10
+        elif name == "RElbowRoll":
+            radian = np.pi - radian if radian > 0 else np.pi + radian
+        elif name == "LElbowRoll":
+            radian = -radian - np.pi if radian < 0 else radian - np.pi
+            if radian > 0:
+                radian = -radian
+        low, high = JOINT_LIMITS[name]
+        return min(max(radian, low), high)
+
+    retargeter = JointRetargeter()
+    rng = np.random.default_rng(0)
+    for _ in range(1000):
+        source = rng.uniform(-np.pi, np.pi, len(SOURCE_NAMES))
+        source[SOURCE_INDEX["LHand"]] = rng.integers(2)
+        source[SOURCE_INDEX["RHand"]] = rng.integers(2)
+        values = retargeter.retarget(source)
+        for name, value in zip(retargeter.names, values):
+            expected = reference(name, source[SOURCE_INDEX[name]], source)
+            assert abs(value - expected) < 1e-3, (name, value, expected)
+
+    # Articulaciones ausentes no se comandan; el paquete y el dict dan lo mismo
+    radians = [None] * protocol.NUM_JOINTS
+    radians[protocol.JOINT_INDEX["HeadYaw"]] = 0.3
+    radians[protocol.JOINT_INDEX["RElbowRoll"]] = 2.0
+    for flags, hands in ((protocol.FLAG_LEFT_HAND_OPEN, []),
+                         (protocol.FLAG_LEFT_HAND_VALID | protocol.FLAG_LEFT_HAND_OPEN, [("LHand", 1.0)]),
+                         (protocol.FLAG_LEFT_HAND_VALID | protocol.FLAG_RIGHT_HAND_VALID
+                          | protocol.FLAG_LEFT_HAND_OPEN, [("LHand", 1.0), ("RHand", 0.0)])):
+        packet = protocol.encode(radians, 1, 0.0, flags)
+        values, _ = retargeter.from_packet(packet)
+        names, commanded = retargeter.commands(values)
+        assert names == ["HeadYaw", "RElbowRoll"] + [name for name, _ in hands], names
+        assert np.allclose(commanded, [0.3, np.pi - 2.0] + [value for _, value in hands])
+        assert np.array_equal(values, retargeter.from_output(protocol.decode_to_output(packet)), equal_nan=True)
+    print("retarget OK: {} articulaciones".format(len(retargeter.names)))
+
+
+if __name__ == "__main__":
+    _self_test()
@@ -10,36 +10,15 @@ import json
 from qibullet import SimulationManager
 from qibullet import PepperVirtual
 from qibullet import NaoVirtual
+sys.path.append('..')
+from outputModule import channel, tracing
+import retarget
 
-
-# Dict for mapping joints onto robot
-def get_joint_values(data, joint_name, angle_type="Radian"):
-
-    angles = data["Angles"]
-    status = data["Status"] 
-    
-    joint_angle_dict = {
-        "HeadPitch" : angles["Head"]["Pitch"][angle_type],
-        "HeadYaw" : angles["Head"]["Yaw"][angle_type],
-        
-        #"LShoulderRoll" : angles["Shoulders"]["Left"]["Roll"][angle_type],
-        #"LShoulderPitch" : angles["Shoulders"]["Left"]["Pitch"][angle_type],
-
-        #"RShoulderRoll" : angles["Shoulders"]["Right"]["Roll"][angle_type],
-        #"RShoulderPitch" : angles["Shoulders"]["Right"]["Pitch"][angle_type],
-
-        #"LElbowRoll" : angles["Elbows"]["Left"]["Roll"][angle_type],
-        #"RElbowRoll" : angles["Elbows"]["Right"]["Roll"][angle_type],
-
-        #"LHand" : status["Hands"]["Left"]["is_open"],
-        #"RHand" : status["Hands"]["Right"]["is_open"],
-
-        # "LHipRoll" : angles["Hips"]["Left"]["Roll"][angle_type],
-        # "RHipRoll" : angles["Hips"]["Right"]["Roll"][angle_type]
-    }
-
-        
-    return joint_angle_dict[joint_name]
+# Origen de las poses: "channel" (memoria compartida, cada paso) o "json" (../output.json)
+POSE_SOURCE = "channel"
+JSON_POLL_STEPS = 10
+STATS_INTERVAL = 5.0  # Segundos entre reportes de latencia captura -> setAngles
+JOINT_NAMES = None    # Articulaciones a mover (None = todas las de retarget.RETARGET_TABLE)
 
 
 def get_json_file(path):
@@ -51,82 +30,6 @@ def get_json_file(path):
         pass
 
 
-def scale_radian(value, joint_name):
-    # Dict for getting max and min angles
-    dictionaryAngles = {
-        "HeadYaw" : {
-            "Min" : -2.0857,
-            "Max" : 2.0857
-        },
-        "HeadPitch" : {
-            "Min" : -0.6720,
-            "Max" : 0.5149
-        },
-        "LShoulderRoll" :{
-            "Min" : -0.3142,
-            "Max" : 1.3265
-        },
-        "LShoulderPitch" : {
-            "Min" : -2.0857,
-            "Max" : 2.0857
-        },
-        "RShoulderRoll" : {
-            "Min" : -1.3265,
-            "Max" : 0.3142
-        },
-        "RShoulderPitch" : {
-            "Min" : -2.0857,
-            "Max" : 2.0857
-        },
-        "LElbowYaw" : {
-            "Min" : -2.0857,
-            "Max" : 2.0857
-        },
-        "LElbowRoll" : {
-            "Min" : -1.5446,
-            "Max" : -0.0349
-        },
-        "LWristYaw" : {
-            "Min" : -1.8238,
-            "Max" : 1.8238
-        },
-        "RElbowYaw" : {
-            "Min" : -2.0857,
-            "Max" : 2.0857
-        },
-        "RElbowRoll" : {
-            "Min" : 0.0349,
-            "Max" : 1.5446
-        },
-        "RWristYaw" : {
-            "Min" : -1.8238,
-            "Max" : 1.8238
-        },
-        "LHipRoll" : {
-            "Min" : -0.379472,
-            "Max" : 0.790477,
-        },    
-        "RHipRoll" : {
-            "Min" : -0.790477,
-            "Max" : 0.379472,
-        },
-        "LHand" : {
-            "Min" : 0.0,
-            "Max" : 1.0
-        },
-        "RHand" : {
-            "Min" : 0.0,
-            "Max" : 1.0
-        }
-    }
-
-    if value > dictionaryAngles[joint_name]["Max"]:
-        value = dictionaryAngles[joint_name]["Max"]
-    if value < dictionaryAngles[joint_name]["Min"]:
-        value = dictionaryAngles[joint_name]["Min"]
-    
-    return value
-
 def get_simulation_mouse_input(joint_parameters):
           
     for joint_parameter in joint_parameters:
@@ -140,6 +43,17 @@ def get_simulation_mouse_input(joint_parameters):
     simulation_manager.stepSimulation(client)
 
 
+def apply_pose(values):
+    """Radianes ya retargeteados (retarget.JointRetargeter) en un solo setAngles"""
+    names, radians = retargeter.commands(values)
+    if not names:
+        return
+    try:
+        robot.setAngles(names, radians, 1.0)
+    except:
+        print("could not set angle")
+
+
 def run_simulation():
     global simulation_manager
     simulation_manager = SimulationManager()
@@ -181,82 +95,35 @@ def run_simulation():
     counter = 0
 
     path = "../output.json"
+    pose_reader = channel.PoseChannelReader() if POSE_SOURCE == "channel" else None
+    global retargeter
+    retargeter = retarget.JointRetargeter(joint_names=JOINT_NAMES)
+    # Mismo proceso/reloj que la visión: no hace falta estimar desfase
+    trace = tracing.LatencyTrace()
+    last_stats = time.time()
 
     try:
         while True:
-            if counter % 10 == 0:
+            if pose_reader is not None:
+                # Lectura sin locks de la pose más reciente; None si no hay nueva
+                packet = pose_reader.read()
+                if packet is not None:
+                    receive_time = time.time()
+                    values, timing = retargeter.from_packet(packet)
+                    apply_pose(values)
+                    trace.record(timing, receive_time, time.time())
+                    if receive_time - last_stats >= STATS_INTERVAL:
+                        print(trace.summary())
+                        last_stats = receive_time
+            elif counter % JSON_POLL_STEPS == 0:
                 try: 
                     data = get_json_file(path)
 
                 except:
                     print("Couldn't read angle from JSON file.")
-                    continue
-                joint_names = ["HeadYaw","HeadPitch"]
-
-
-                for i in range(len(joint_names)):
-
-                    try:
-                        radian = get_joint_values(data, joint_names[i])
-
-                    except:
-                        print("error but program continues")
-                        continue
-
-                    if radian == None:
-                        continue
-                    
-                    if joint_names[i] == "LShoulderPitch" or joint_names[i] == "RShoulderPitch":
-                        radian = 1.5708 - radian
-
-                    elif joint_names[i] == "HeadPitch":
-                        radian = -radian
-
-                    elif joint_names[i] == "RShoulderRoll":
-                        
-                        if radian > np.pi/2:
-                            radian = -radian
-                        if data["Angles"]["Shoulders"]["Right"]["Pitch"]["Degree"] >40:
-                            radian = radian + np.pi/10
-
-
-                    elif joint_names[i] == "LShoulderRoll":
-                        
-                        if data["Angles"]["Shoulders"]["Right"]["Pitch"]["Degree"] >40:
-                            radian = radian - np.pi/10
-                        
-
-                    elif joint_names[i] == "RElbowRoll":
-                        if radian > 0:
-                            radian = np.pi-radian
-                        else:
-                            radian = np.pi+radian
-
-                    elif joint_names[i] == "LElbowRoll":
-
-                        if radian < 0:
-                            radian = -radian-np.pi
-                        else:
-                            radian = radian-np.pi
-
-                        if radian > 0:
-                            radian = -radian
-                    
-                    try:
-                        
-                        radian = scale_radian(radian,joint_names[i])
-                        
-                    except:
-                        print("could not scaled")
-
-                    if radian == None:
-                        radian = 0
-                    try:
-                        robot.setAngles(
-                        joint_names[i],
-                        radian, 1.0)
-                    except:
-                        print("could not set angle")
+                    data = None
+                if data is not None:
+                    apply_pose(retargeter.from_output(data))
             # Step the simulation
             simulation_manager.stepSimulation(client)
             counter += 1
@@ -268,6 +135,8 @@ def run_simulation():
     except KeyboardInterrupt:
         pass
     finally:
+        if pose_reader is not None:
+            pose_reader.close()
         simulation_manager.stopSimulation(client)
 
 
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Sustituto local de ALMotion para probar el servidor sin robot (compatible con Python 2.7).
+
+Registra cada llamada con su marca de tiempo y puede simular la latencia
+de una llamada RPC de NAOqi. Se inyecta con main.main(motion=FakeMotion())
+o con MOTION_BACKEND = "fake" en main.py.
+"""
+import random
+import threading
+import time
+
+
+class FakeMotion(object):
+    def __init__(self, latency=0.0, jitter=0.0, verbose=False):
+        """
+        Args:
+            latency: Segundos que bloquea cada llamada (como una RPC)
+            jitter: Variacion uniforme adicional (0..jitter segundos)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.verbose = verbose
+        self.calls = []  # (tiempo de inicio, metodo, argumentos, duracion)
+        self.angles = {}
+        self.stiffness = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method, args):
+        start = time.time()
+        delay = self.latency + (random.uniform(0.0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.calls.append((start, method, args, time.time() - start))
+        if self.verbose:
+            print(" [fake] {}{}".format(method, args))
+
+    def setAngles(self, names, angles, speed):
+        if isinstance(names, str):
+            names, angles = [names], [angles]
+        self._call("setAngles", (list(names), list(angles), speed))
+        with self._lock:
+            self.angles.update(zip(names, angles))
+
+    def setStiffnesses(self, names, stiffnesses):
+        self._call("setStiffnesses", (names, stiffnesses))
+        with self._lock:
+            self.stiffness[names] = stiffnesses
+
+    def getAngles(self, names, use_sensors):
+        if isinstance(names, str):
+            names = [names]
+        self._call("getAngles", (list(names), use_sensors))
+        with self._lock:
+            return [self.angles.get(name, 0.0) for name in names]
+
+    def calls_of(self, method):
+        with self._lock:
+            return [call for call in self.calls if call[1] == method]
+
+    def stats(self):
+        with self._lock:
+            calls = list(self.calls)
+        set_angles = [call for call in calls if call[1] == "setAngles"]
+        stats = {"calls": len(calls), "setAngles": len(set_angles)}
+        if len(set_angles) > 1:
+            span = set_angles[-1][0] - set_angles[0][0]
+            stats["setAngles_per_sec"] = round((len(set_angles) - 1) / max(span, 1e-9), 1)
+            stats["rpc_ms"] = round(1000.0 * sum(call[3] for call in set_angles) / len(set_angles), 2)
+        return stats
+
+
+def _self_test():
+    motion = FakeMotion(latency=0.01)
+    motion.setStiffnesses("Body", 1.0)
+    motion.setAngles(["HeadYaw", "HeadPitch"], [0.1, -0.2], 0.2)
+    motion.setAngles("HeadYaw", 0.3, 0.2)
+    assert motion.getAngles(["HeadYaw", "HeadPitch"], True) == [0.3, -0.2]
+    assert motion.stiffness == {"Body": 1.0}
+    assert len(motion.calls_of("setAngles")) == 2
+    assert all(call[3] >= 0.01 for call in motion.calls)
+    print("fake_motion OK: {}".format(motion.stats()))
+
+
+if __name__ == "__main__":
+    _self_test()
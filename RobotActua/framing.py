@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Lectura de frames del socket del sistema de vision (compatible con Python 2.7).
+
+Soporta JSON delimitado por salto de linea y paquetes binarios de tamaño
+fijo (protocol.py). Cuando hay varios frames completos pendientes solo se
+decodifica el mas reciente: el robot siempre actua sobre la pose actual.
+"""
+import json
+import select
+
+from shared import protocol
+
+RECV_SIZE = 65536
+MAX_DRAIN_BYTES = 1 << 20  # Limite de bytes leidos de golpe al vaciar el socket
+MAX_PENDING_BYTES = 1 << 20  # Limite de una linea JSON sin terminar; mas larga se descarta
+
+
+class FrameReader(object):
+    def __init__(self, sock, recv_size=RECV_SIZE):
+        self.sock = sock
+        self.recv_size = recv_size
+        self.buffer = bytearray()
+        self.format = None  # "json" o "binary", se detecta con el primer dato
+        self._scan_pos = 0
+        self._discarding = False  # Saltando el resto de una linea demasiado larga
+
+        # Contadores
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_applied = 0
+        self.frames_invalid = 0
+        self.frames_oversized = 0
+
+    def feed(self, data):
+        if not data:
+            return
+        self.buffer.extend(data)
+        self.bytes_received += len(data)
+        if self.format is None and len(self.buffer) >= len(protocol.MAGIC):
+            magic = bytes(self.buffer[:len(protocol.MAGIC)])
+            self.format = "binary" if magic == protocol.MAGIC else "json"
+
+    def recv(self):
+        """Lee del socket (bloqueante) y vacia lo que ya este disponible.
+
+        Devuelve False cuando el otro extremo cerro la conexion.
+        """
+        data = self.sock.recv(self.recv_size)
+        if not data:
+            return False
+        self.feed(data)
+
+        drained = 0
+        while drained < MAX_DRAIN_BYTES:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if not readable:
+                break
+            data = self.sock.recv(self.recv_size)
+            if not data:
+                return False
+            self.feed(data)
+            drained += len(data)
+        return True
+
+    def pop_latest(self):
+        """Consume todos los frames completos y devuelve el mas reciente decodificado.
+
+        Devuelve None si no hay ningun frame completo (o el ultimo es invalido).
+        """
+        if self.format == "binary":
+            frame = self._pop_latest_binary()
+            decode = protocol.decode_to_output
+        elif self.format == "json":
+            frame = self._pop_latest_json()
+            decode = lambda raw: json.loads(raw.decode("utf-8"))
+        else:
+            return None
+
+        if frame is None:
+            return None
+        try:
+            data = decode(frame)
+        except ValueError as e:
+            self.frames_invalid += 1
+            print("Frame invalido descartado: {}".format(str(e)))
+            return None
+        self.frames_applied += 1
+        return data
+
+    def _pop_latest_json(self):
+        if self._discarding:
+            # El resto de la linea descartada llega hasta el siguiente salto
+            newline = self.buffer.find(b"\n")
+            if newline < 0:
+                del self.buffer[:]
+                return None
+            del self.buffer[:newline + 1]
+            self._discarding = False
+
+        # Solo se busca en los bytes nuevos: coste lineal en el tamaño del mensaje
+        end = self.buffer.rfind(b"\n", self._scan_pos)
+        if end < 0:
+            if len(self.buffer) > MAX_PENDING_BYTES:
+                # Cliente roto u hostil: no se acumula memoria esperando el salto
+                self.frames_oversized += 1
+                print("Linea JSON de mas de {} bytes descartada".format(MAX_PENDING_BYTES))
+                del self.buffer[:]
+                self._discarding = True
+                self._scan_pos = 0
+                return None
+            self._scan_pos = len(self.buffer)
+            return None
+
+        count = self.buffer.count(b"\n", 0, end + 1)
+        start = self.buffer.rfind(b"\n", 0, end) + 1
+        frame = bytes(self.buffer[start:end])
+        del self.buffer[:end + 1]
+        self._scan_pos = 0
+
+        self.frames_received += count
+        self.frames_dropped += count - 1
+        if not frame.strip():
+            return None
+        return frame
+
+    def _pop_latest_binary(self):
+        size = protocol.PACKET_SIZE
+        count = len(self.buffer) // size
+        if count == 0:
+            return None
+
+        end = count * size
+        frame = bytes(self.buffer[end - size:end])
+        del self.buffer[:end]
+
+        self.frames_received += count
+        self.frames_dropped += count - 1
+        return frame
+
+    def stats(self):
+        return {
+            "bytes": self.bytes_received,
+            "received": self.frames_received,
+            "dropped": self.frames_dropped,
+            "applied": self.frames_applied,
+            "invalid": self.frames_invalid,
+            "oversized": self.frames_oversized,
+            "pending_bytes": len(self.buffer)
+        }
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Generador de carga para el servidor del robot (compatible con Python 2.7).
+
+Envia poses sinteticas a un ritmo fijo por TCP o UDP, en JSON o binario.
+Por defecto levanta el servidor de main.py en este mismo proceso con
+fake_motion.FakeMotion, asi se mide sin robot: poses enviadas, comandos
+emitidos, poses descartadas y demora entre el envio y el setAngles.
+
+Para medir la demora cada pose codifica su secuencia en HeadYaw (pasos de
+YAW_STEP radianes, mayores que la zona muerta), y el valor recibido por
+FakeMotion identifica la pose que lo origino.
+
+Uso:
+    python loadgen.py --rate 60 --duration 10
+    python loadgen.py --transport udp --wire-format binary --latency 0.02
+    python loadgen.py --external --port 65432      # contra un main.py ya en marcha
+"""
+import argparse
+import bisect
+import json
+import math
+import socket
+import threading
+import time
+
+from shared import protocol
+
+YAW_STEP = 0.01   # Radianes entre poses consecutivas
+YAW_SLOTS = 300   # Valores distintos de HeadYaw antes de repetir
+
+
+def synthetic_radians(sequence, elapsed):
+    """Radianes por articulacion de protocol.JOINTS (NaN las que no se mueven)"""
+    radians = [float("nan")] * protocol.NUM_JOINTS
+    radians[protocol.JOINT_INDEX["HeadYaw"]] = (sequence % YAW_SLOTS - YAW_SLOTS // 2) * YAW_STEP
+    radians[protocol.JOINT_INDEX["HeadPitch"]] = 0.2 * math.sin(elapsed)
+    radians[protocol.JOINT_INDEX["LElbowRoll"]] = 0.8 + 0.6 * math.sin(2.0 * elapsed)
+    radians[protocol.JOINT_INDEX["RElbowRoll"]] = 0.8 + 0.6 * math.cos(2.0 * elapsed)
+    return radians
+
+
+def sequence_from_yaw(yaw):
+    return int(round(yaw / YAW_STEP)) + YAW_SLOTS // 2
+
+
+def pose_dict(radians):
+    """Esquema anidado de Output.output con las articulaciones presentes"""
+    angles = {}
+    for (name, path), value in zip(protocol.JOINTS, radians):
+        if value != value:
+            continue
+        ref = angles
+        for key in path[:-1]:
+            ref = ref.setdefault(key, {})
+        ref[path[-1]] = {"Degree": math.degrees(value), "Radian": value}
+    return {"Angles": angles}
+
+
+def encode_pose(radians, sequence, timestamp, transport, wire_format):
+    """Mensaje en el mismo formato que VisionSystem.send_to_nao"""
+    if wire_format == "binary":
+        return protocol.encode(radians, sequence, timestamp)
+    data = pose_dict(radians)
+    if transport == "udp":
+        data["Sequence"] = sequence
+        data["Timestamp"] = timestamp
+        return json.dumps(data).encode("utf-8")
+    return (json.dumps(data) + "\n").encode("utf-8")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoadGenerator(object):
+    def __init__(self, host, port, transport="tcp", wire_format="json", rate=30.0):
+        self.address = (host, port)
+        self.transport = transport
+        self.wire_format = wire_format
+        self.period = 1.0 / rate
+        self.sock = None
+
+        self.sent = 0
+        self.late = 0          # Envios que empezaron mas de un periodo tarde
+        self.errors = 0
+        self.elapsed = 0.0
+        self.send_times = []   # time.time() de cada envio, indexado por secuencia
+
+    def connect(self, timeout=2.0):
+        """Conecta reintentando mientras el servidor arranca"""
+        deadline = time.time() + timeout
+        while True:
+            kind = socket.SOCK_DGRAM if self.transport == "udp" else socket.SOCK_STREAM
+            self.sock = socket.socket(socket.AF_INET, kind)
+            try:
+                self.sock.connect(self.address)
+                return
+            except socket.error:
+                self.sock.close()
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def run(self, duration):
+        start = time.time()
+        next_send = start
+        sequence = 0
+        while True:
+            now = time.time()
+            if now - start >= duration:
+                break
+            if next_send > now:
+                time.sleep(next_send - now)
+            elif now - next_send > self.period:
+                self.late += 1
+            timestamp = time.time()
+            payload = encode_pose(synthetic_radians(sequence, timestamp - start), sequence,
+                                  timestamp, self.transport, self.wire_format)
+            try:
+                if self.transport == "udp":
+                    self.sock.send(payload)
+                else:
+                    self.sock.sendall(payload)
+            except socket.error:
+                self.errors += 1
+            self.send_times.append(timestamp)
+            self.sent += 1
+            sequence += 1
+            next_send += self.period
+        self.elapsed = time.time() - start
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "rate": round(self.sent / max(self.elapsed, 1e-9), 1),
+            "late": self.late,
+            "errors": self.errors
+        }
+
+    def command_delays(self, motion):
+        """Demoras envio -> setAngles (segundos) y secuencias comandadas"""
+        delays = []
+        commanded = set()
+        for start, _, args, _ in motion.calls_of("setAngles"):
+            names, values = args[0], args[1]
+            if "HeadYaw" not in names:
+                continue
+            slot = sequence_from_yaw(values[names.index("HeadYaw")])
+            # La ultima pose con ese valor de HeadYaw enviada antes del comando
+            last = bisect.bisect_right(self.send_times, start) - 1
+            if last < 0:
+                continue
+            sequence = last - (last - slot) % YAW_SLOTS
+            if sequence < 0:
+                continue
+            commanded.add(sequence)
+            delays.append(start - self.send_times[sequence])
+        return delays, commanded
+
+
+def run_local(args):
+    """Servidor de main.py con FakeMotion en un hilo + generador"""
+    import fake_motion
+    import main
+    import motion_commands
+
+    motion = fake_motion.FakeMotion(latency=args.latency, jitter=args.jitter)
+    commander = motion_commands.JointCommander(motion, max_rate=args.max_rate or None)
+    serve = main.servir_udp if args.transport == "udp" else main.servir_tcp
+    server_thread = threading.Thread(target=serve, args=(commander, args.host, args.port))
+    server_thread.daemon = True
+    server_thread.start()
+
+    if args.transport == "udp":
+        time.sleep(0.2)  # connect en UDP no espera al bind del servidor
+    generator = LoadGenerator(args.host, args.port, args.transport, args.wire_format, args.rate)
+    generator.connect()
+    try:
+        generator.run(args.duration)
+    finally:
+        generator.close()
+    time.sleep(0.2)  # Ultimos comandos pendientes; el servidor sigue como daemon
+
+    delays, commanded = generator.command_delays(motion)
+    print(" Generador: {}".format(generator.stats()))
+    print(" Servidor: {}".format(commander.stats()))
+    print(" ALMotion simulado: {}".format(motion.stats()))
+    dropped = generator.sent - len(commanded)
+    print(" Poses comandadas: {} | descartadas o combinadas: {} ({:.0%})".format(
+        len(commanded), dropped, dropped / float(max(generator.sent, 1))))
+    if delays:
+        print(" Demora envio->setAngles: p50 {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms".format(
+            1000 * percentile(delays, 0.5), 1000 * percentile(delays, 0.95), 1000 * max(delays)))
+
+
+def run_external(args):
+    generator = LoadGenerator(args.host, args.port, args.transport, args.wire_format, args.rate)
+    generator.connect()
+    try:
+        generator.run(args.duration)
+    finally:
+        generator.close()
+    print(" Generador: {}".format(generator.stats()))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Carga sintetica para el servidor del robot")
+    parser.add_argument("--rate", type=float, default=30.0, help="Poses por segundo")
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos")
+    parser.add_argument("--transport", choices=("tcp", "udp"), default="tcp")
+    parser.add_argument("--wire-format", choices=("json", "binary"), default="json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65433)
+    parser.add_argument("--latency", type=float, default=0.005, help="Segundos por RPC simulada")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--max-rate", type=float, default=20.0, help="Limite de setAngles/s (0 = sin limite)")
+    parser.add_argument("--external", action="store_true",
+                        help="Solo generar carga contra un servidor ya en marcha")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.external:
+        run_external(arguments)
+    else:
+        run_local(arguments)
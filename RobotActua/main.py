@@ -1,129 +1,134 @@
 # -*- coding: utf-8 -*-
 
+import time
 import socket
-import json
-from naoqi import ALProxy
+
+import motion_commands
+import server
+import transport
+from shared import tracing
 
 # Dirección IP del robot NAO
 ROBOT_IP = "localhost"  # ip 
 ROBOT_PORT = 54403
 
+MOTION_BACKEND = "naoqi"  # "naoqi" (ALProxy) o "fake" (fake_motion.FakeMotion, sin robot)
+FAKE_LATENCY = 0.005      # Segundos por llamada simulada con MOTION_BACKEND = "fake"
+
 # Dirección del servidor socket
 HOST = '127.0.0.1'
 PORT = 65432
 
-def get_joint_value(data, path_list, angle_type="Radian"):
-    try:
-        ref = data
-        for key in path_list:
-            ref = ref[key]
-        value = ref.get(angle_type)
-        if value is None:
-            print(u" Valor nulo: " + " -> ".join(path_list) + " [" + angle_type + "]")
-        return value
-    except (KeyError, TypeError) as e:
-        print(u" Error extrayendo {}: {}".format(" -> ".join(path_list), str(e)))
-        return None
-
-def mover_cabeza_nao(motion_proxy, angles):
-    pitch = get_joint_value(angles, ["Angles", "Head", "Pitch"])
-    yaw = get_joint_value(angles, ["Angles", "Head", "Yaw"])
-    
-    if pitch is not None and yaw is not None:
-        names = ["HeadPitch", "HeadYaw"]
-        values = [-pitch, yaw]  # El NAO mueve el Pitch de manera opuesta
-        speed = 0.2  # Velocidad de movimiento
-        motion_proxy.setAngles(names, values, speed)
-        print(u" Moviendo cabeza: Pitch={}, Yaw={}".format(pitch, yaw))
-    else:
-        print(u"No se puede mover la cabeza por valores nulos.")
-
-def mover_codos_nao(motion_proxy, angles, speed=0.2, verbose=True):
-    """Versión compatible con Python 2.7"""
-    def clamp(value, min_val, max_val):
-        return max(min(value, max_val), min_val)
-
-    # Rangos reales del NAO (en radianes)
-    NAO_RANGES = {
-        "Left": (-1.54, -0.03),  # LElbowRoll
-        "Right": (0.03, 1.54)     # RElbowRoll
-    }
-
-    # Compatibilidad con ambas estructuras (antigua y nueva)
+TRANSPORT = "tcp"  # "tcp" (flujo) o "udp" (datagramas con secuencia, solo la última pose)
+
+# Servidor TCP: varios clientes, reconexión sin reiniciar y arbitraje entre fuentes
+TCP_PRIORITY = 10         # Prioridad de los clientes de HOST:PORT (sistema de visión)
+EXTRA_LISTENERS = []      # (host, puerto, prioridad) adicionales, p. ej. [(HOST, 65433, 0)] para replay/monitor
+ARBITRATION = "newest"    # "newest" (la pose más reciente gana) o "priority" (server.py)
+PRIORITY_HOLD = 0.5       # Segundos que un cliente prioritario conserva el control tras su última pose
+CLIENT_TIMEOUT = None     # Segundos sin datos para cerrar un cliente (None = nunca)
+
+UDP_MAX_AGE = None  # Segundos; descarta poses más viejas (requiere relojes sincronizados)
+
+STATS_INTERVAL = 5.0  # Segundos entre reportes de frames recibidos/descartados/aplicados
+
+COMMAND_SPEED = 0.2       # Fraccion de la velocidad maxima en setAngles
+COMMAND_MAX_RATE = 20.0   # setAngles por segundo como maximo (poses intermedias se combinan)
+
+TRACE_LATENCY = True      # Desglose captura->comando con el bloque "Timing" de cada pose
+SYNC_INTERVAL = 1.0       # Segundos entre respuestas para estimar el desfase de relojes (0 = no responder)
+
+def responder_sync(send, json_data, receive_time, last_sync):
+    """Responde (T0 envío, T1 recepción, T2 ahora) a una pose para que la
+    visión estime el desfase de relojes; devuelve el instante de la última respuesta"""
+    timing = json_data.get("Timing") if isinstance(json_data, dict) else None
+    if (not SYNC_INTERVAL or not timing or timing.get("Send") is None or
+            receive_time - last_sync < SYNC_INTERVAL):
+        return last_sync
     try:
-        left_roll = angles.get("Angles", {}).get("Elbows", {}).get("Left", {}).get("Roll", {})
-        right_roll = angles.get("Angles", {}).get("Elbows", {}).get("Right", {}).get("Roll", {})
-        
-        left_angle = left_roll.get("Radian")
-        right_angle = right_roll.get("Radian")
-    except AttributeError:
-        left_angle = right_angle = None
-
-    if left_angle is None or right_angle is None:
-        if verbose:
-            print("Advertencia: Angulos de codos no validos")
-        return False
+        send(tracing.sync_reply(timing["Send"], receive_time, time.time()))
+    except socket.error:
+        pass
+    return receive_time
+
+def resumen(commander):
+    line = u"Comandos: {}".format(commander.stats())
+    if commander.trace is not None:
+        line += u"\n " + commander.trace.summary()
+    return line
+
+def servir_tcp(commander, host=HOST, port=PORT):
+    """Atiende clientes TCP hasta Ctrl+C; los clientes pueden ir y volver"""
+    listeners = [(host, port, TCP_PRIORITY)] + list(EXTRA_LISTENERS)
+    pose_server = server.PoseServer(commander, listeners, policy=ARBITRATION,
+                                    hold_time=PRIORITY_HOLD, client_timeout=CLIENT_TIMEOUT,
+                                    sync_interval=SYNC_INTERVAL)
+
+    def reportar(pose_server):
+        print(u" Servidor: {} | {}".format(pose_server.stats(), resumen(commander)))
 
     try:
-        # Mapeo invertido para el codo izquierdo
-        left_min, left_max = NAO_RANGES["Left"]
-        right_min, right_max = NAO_RANGES["Right"]
-        
-        left_value = clamp(-left_angle, left_min, left_max)
-        right_value = clamp(right_angle, right_min, right_max)
-
-        # Configurar movimiento
-        names = ["LElbowRoll", "RElbowRoll"]
-        speed = clamp(speed, 0.1, 1.0)
-        motion_proxy.setAngles(names, [left_value, right_value], speed)
-
-        if verbose:
-            print(u"Movimiento codos NAO - L: {:.1f}° ({:.3f} rad), R: {:.1f}° ({:.3f} rad)".format(
-                np.degrees(left_angle), left_value,
-                np.degrees(right_angle), right_value))
-        
-        return True
+        pose_server.serve_forever(STATS_INTERVAL, reportar)
+    finally:
+        reportar(pose_server)
+        pose_server.close()
+
+def servir_udp(commander, host=HOST, port=PORT):
+    receiver = transport.UdpPoseReceiver(host, port, max_age=UDP_MAX_AGE)
+    print(" Esperando datagramas UDP en {}:{}".format(host, port))
+    def reply(data):
+        receiver.sock.sendto(data, receiver.last_address)
 
-    except Exception as e:
-        print("Error al mover codos: {}".format(str(e)))
-        return False
-    
-def main():
     try:
-        motion = ALProxy("ALMotion", ROBOT_IP, ROBOT_PORT)
+        last_stats = time.time()
+        last_sync = 0.0
+        while True:
+            timeout = commander.time_until_due()
+            json_data = receiver.receive(timeout=STATS_INTERVAL if timeout is None else timeout)
+            if json_data is not None:
+                receive_time = time.time()
+                commander.submit(json_data, receive_time)
+                last_sync = responder_sync(reply, json_data, receive_time, last_sync)
+            commander.flush()
+
+            now = time.time()
+            if now - last_stats >= STATS_INTERVAL:
+                print(u" UDP: {} | {}".format(receiver.stats(), resumen(commander)))
+                last_stats = now
+    finally:
+        receiver.close()
+
+def crear_motion():
+    if MOTION_BACKEND == "fake":
+        import fake_motion
+        print(u" Usando ALMotion simulado (latencia {} s)".format(FAKE_LATENCY))
+        return fake_motion.FakeMotion(latency=FAKE_LATENCY)
+    from naoqi import ALProxy  # Solo disponible con el SDK de NAOqi
+    return ALProxy("ALMotion", ROBOT_IP, ROBOT_PORT)
+
+def main(motion=None):
+    """motion: proxy de ALMotion ya creado (p. ej. fake_motion.FakeMotion); por defecto según MOTION_BACKEND"""
+    try:
+        if motion is None:
+            motion = crear_motion()
         motion.setStiffnesses("Body", 1.0)  # Activar rigidez para poder mover
         print(u" Conectado a NAO")
     except Exception as e:
         print(" No se pudo conectar a NAO:", str(e))
         return
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    trace = tracing.LatencyTrace() if TRACE_LATENCY else None
+    commander = motion_commands.JointCommander(motion, speed=COMMAND_SPEED,
+                                               max_rate=COMMAND_MAX_RATE, trace=trace)
     try:
-        s.bind((HOST, PORT))
-        s.listen(1)
-        print(" Esperando conexión del sistema de vision...")
-        conn, addr = s.accept()
-        print(" Conectado por {}".format(addr))
-
-        buffer = ""
-        while True:
-            data = conn.recv(1024)
-            if not data:
-                break
-
-            buffer += data.decode("utf-8")
-            try:
-                json_data = json.loads(buffer)
-                mover_cabeza_nao(motion, json_data)
-                mover_codos_nao(motion, json_data)  # Nueva función para codos
-                buffer = ""
-            except ValueError:
-                continue  # JSON incompleto, seguir esperando
-
+        if TRANSPORT == "udp":
+            servir_udp(commander)
+        else:
+            servir_tcp(commander)
+    except KeyboardInterrupt:
+        pass
     finally:
         motion.setStiffnesses("Body", 0.0)  # Relajar los motores al terminar
-        s.close()
 
 if __name__ == "__main__":
-    import numpy as np  # Necesario para las conversiones de ángulos
     main()
\ No newline at end of file
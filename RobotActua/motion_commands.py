@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Etapa de comandos hacia ALMotion (compatible con Python 2.7).
+
+Cada pose recibida se reduce a un solo setAngles con las articulaciones
+que cambiaron mas que su zona muerta. Las poses que llegan antes de que
+toque el siguiente comando se combinan (gana la mas nueva), asi el numero
+de llamadas RPC queda acotado por max_rate y no por el ritmo de la vision.
+"""
+import math
+import time
+
+from shared import protocol
+
+# Articulacion -> (signo, minimo, maximo) aplicados al angulo recibido (radianes)
+COMMAND_JOINTS = (
+    ("HeadPitch", -1.0, None, None),     # El NAO mueve el Pitch de manera opuesta
+    ("HeadYaw", 1.0, None, None),
+    ("LElbowRoll", -1.0, -1.54, -0.03),  # Mapeo invertido para el codo izquierdo
+    ("RElbowRoll", 1.0, 0.03, 1.54),
+)
+JOINT_PATHS = dict(protocol.JOINTS)
+
+DEFAULT_DEADBAND = math.radians(1.0)
+DEADBANDS = {
+    "HeadPitch": math.radians(0.5),
+    "HeadYaw": math.radians(0.5),
+}
+DEFAULT_SPEED = 0.2      # Fraccion de la velocidad maxima
+DEFAULT_MAX_RATE = 20.0  # Comandos por segundo como maximo
+LOG_INTERVAL = 2.0       # Segundos minimos entre mensajes del mismo tipo
+
+
+def get_joint_value(data, path, angle_type="Radian"):
+    """Valor de Output.output["Angles"][path...][angle_type] o None"""
+    ref = data.get("Angles") if isinstance(data, dict) else None
+    try:
+        for key in path:
+            ref = ref[key]
+        value = ref.get(angle_type)
+    except (KeyError, TypeError, AttributeError):
+        return None
+    if value is None or value != value:  # None o NaN
+        return None
+    return value
+
+
+class RateLimitedLog(object):
+    """print con un mensaje por clave cada `interval` segundos como maximo"""
+
+    def __init__(self, interval=LOG_INTERVAL):
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+
+    def log(self, key, message):
+        now = time.time()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            message += u" (+{} omitidos)".format(suppressed)
+        self._last[key] = now
+        print(message)
+
+
+class JointCommander(object):
+    def __init__(self, motion, speed=DEFAULT_SPEED, max_rate=DEFAULT_MAX_RATE,
+                 deadbands=None, log_interval=LOG_INTERVAL, trace=None):
+        """
+        Args:
+            motion: Proxy de ALMotion (o cualquier objeto con setAngles)
+            max_rate: Comandos por segundo como maximo (None = sin limite)
+            deadbands: Radianes por articulacion; las que no aparecen usan DEFAULT_DEADBAND
+            trace: tracing.LatencyTrace opcional; registra cada pose comandada
+        """
+        self.motion = motion
+        self.speed = speed
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.deadbands = dict(DEADBANDS)
+        if deadbands:
+            self.deadbands.update(deadbands)
+        self.logger = RateLimitedLog(log_interval)
+        self.sent = {}          # Ultimo valor enviado por articulacion
+        self.pending = None     # Ultima pose aun no comandada
+        self.pending_receive_time = None
+        self.trace = trace
+        self.last_command = 0.0
+
+        # Estadisticas
+        self.poses = 0
+        self.coalesced = 0      # Poses reemplazadas por otra antes de comandarse
+        self.commands = 0       # Llamadas a setAngles
+        self.joints_sent = 0
+        self.joints_suppressed = 0  # Dentro de la zona muerta
+        self.errors = 0
+
+    def submit(self, pose, receive_time=None):
+        """Guarda la pose para el proximo comando (reemplaza la pendiente)"""
+        if self.pending is not None:
+            self.coalesced += 1
+        self.pending = pose
+        self.pending_receive_time = time.time() if receive_time is None else receive_time
+        self.poses += 1
+
+    def time_until_due(self):
+        """Segundos hasta poder comandar la pose pendiente (None si no hay)"""
+        if self.pending is None:
+            return None
+        return max(0.0, self.last_command + self.min_interval - time.time())
+
+    def targets(self, pose):
+        """Lista de (articulacion, valor NAO) validos en la pose"""
+        targets = []
+        for name, sign, low, high in COMMAND_JOINTS:
+            value = get_joint_value(pose, JOINT_PATHS[name])
+            if value is None:
+                self.logger.log("null_" + name, u" Valor nulo: {}".format(name))
+                continue
+            value *= sign
+            if low is not None:
+                value = max(min(value, high), low)
+            targets.append((name, value))
+        return targets
+
+    def flush(self):
+        """Envia la pose pendiente si ya toca; devuelve True si hubo setAngles"""
+        if self.pending is None:
+            return False
+        now = time.time()
+        if now - self.last_command < self.min_interval:
+            return False
+        pose, self.pending = self.pending, None
+
+        names = []
+        values = []
+        for name, value in self.targets(pose):
+            last = self.sent.get(name)
+            if last is not None and abs(value - last) < self.deadbands.get(name, DEFAULT_DEADBAND):
+                self.joints_suppressed += 1
+                continue
+            names.append(name)
+            values.append(value)
+        if not names:
+            return False
+
+        try:
+            self.motion.setAngles(names, values, self.speed)
+        except Exception as e:
+            self.errors += 1
+            self.logger.log("error", u" Error en setAngles: {}".format(str(e)))
+            return False
+        self.last_command = now
+        if self.trace is not None and isinstance(pose, dict):
+            self.trace.record(pose.get("Timing"), self.pending_receive_time, now)
+        self.commands += 1
+        self.joints_sent += len(names)
+        for name, value in zip(names, values):
+            self.sent[name] = value
+        self.logger.log("command", " Comando (grados): " + ", ".join(
+            "{}={:.1f}".format(name, math.degrees(value)) for name, value in zip(names, values)))
+        return True
+
+    def apply(self, pose):
+        """submit + flush"""
+        self.submit(pose)
+        return self.flush()
+
+    def stats(self):
+        return {
+            "poses": self.poses,
+            "coalesced": self.coalesced,
+            "commands": self.commands,
+            "joints_sent": self.joints_sent,
+            "joints_suppressed": self.joints_suppressed,
+            "errors": self.errors
+        }
+
+
+def _self_test():
+    """Zona muerta, combinacion de poses y limite de ritmo con un proxy falso"""
+    class Motion(object):
+        def __init__(self):
+            self.calls = []
+
+        def setAngles(self, names, values, speed):
+            self.calls.append((list(names), list(values)))
+
+    def pose(pitch, yaw, left, right):
+        def pair(value):
+            return {"Radian": value, "Degree": None if value is None else math.degrees(value)}
+        return {"Angles": {"Head": {"Pitch": pair(pitch), "Yaw": pair(yaw)},
+                           "Elbows": {"Left": {"Roll": pair(left)}, "Right": {"Roll": pair(right)}}}}
+
+    motion = Motion()
+    commander = JointCommander(motion, max_rate=None, log_interval=60.0)
+    assert commander.apply(pose(0.1, 0.2, 0.5, 0.5))
+    assert motion.calls[0][0] == ["HeadPitch", "HeadYaw", "LElbowRoll", "RElbowRoll"]
+    assert abs(motion.calls[0][1][0] + 0.1) < 1e-9 and abs(motion.calls[0][1][2] + 0.5) < 1e-9
+
+    # Cambios por debajo de la zona muerta no generan RPC; uno solo por encima si
+    assert not commander.apply(pose(0.1 + 1e-4, 0.2, 0.5 + 1e-3, 0.5))
+    assert commander.apply(pose(0.1, 0.3, 0.5, None))
+    assert motion.calls[-1][0] == ["HeadYaw"]
+    assert commander.joints_suppressed == 6
+
+    # Con limite de ritmo las poses intermedias se combinan en la ultima
+    commander = JointCommander(Motion(), max_rate=10.0, log_interval=60.0)
+    commander.apply(pose(0.0, 0.0, 0.5, 0.5))
+    for value in (0.1, 0.2, 0.3):
+        assert not commander.apply(pose(value, 0.0, 0.5, 0.5))
+    assert commander.coalesced == 2 and commander.time_until_due() > 0
+    time.sleep(commander.time_until_due() + 0.01)
+    assert commander.flush()
+    assert abs(commander.motion.calls[-1][1][0] + 0.3) < 1e-9
+    print("commands OK: {}".format(commander.stats()))
+
+
+if __name__ == "__main__":
+    _self_test()
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""Servidor TCP de poses con varios clientes y reconexion (compatible con Python 2.7).
+
+Un solo hilo con select atiende los sockets de escucha y todos los
+clientes; ningun cliente lento o detenido bloquea el comando al robot,
+porque solo se lee lo que ya llego y las respuestas de sincronizacion no
+esperan: lo que el socket no acepta queda en la bandeja del cliente hasta
+que select lo marque como escribible, y mientras tanto no se empieza otra.
+Si el sistema de vision se reinicia, simplemente vuelve a conectarse.
+
+Cada puerto de escucha tiene una prioridad; la politica de arbitraje
+decide que pose se comanda cuando hay varias fuentes:
+    "newest":   la pose recibida mas recientemente, de cualquier cliente
+    "priority": solo el cliente de mayor prioridad que envio algo en los
+                ultimos `hold_time` segundos; los demas se ignoran
+"""
+import errno
+import select
+import socket
+import time
+
+import framing
+from shared import tracing
+
+POLICIES = ("newest", "priority")
+SYNC_INTERVAL = 1.0  # Segundos entre respuestas de sincronizacion por cliente
+
+
+class ClientConnection(object):
+    def __init__(self, sock, address, priority):
+        self.sock = sock
+        self.address = address
+        self.priority = priority
+        self.reader = framing.FrameReader(sock)
+        self.connected_at = time.time()
+        self.last_activity = self.connected_at
+        self.last_pose_time = None
+        self.last_sync = 0.0
+        self.outbox = b""  # Resto sin enviar de una respuesta de sincronizacion
+
+        self.applied = 0   # Poses entregadas al comando
+        self.ignored = 0   # Poses descartadas por el arbitraje
+        self.replies_dropped = 0
+
+    def send_nowait(self, data):
+        """Envia sin bloquear; si aun queda una respuesta a medias, la nueva se descarta
+        para no pegarla a una linea incompleta"""
+        if self.outbox:
+            self.replies_dropped += 1
+            return
+        self.outbox = data
+        self.flush()
+
+    def flush(self):
+        """Envia lo que el socket acepte de la bandeja; el resto espera a select"""
+        try:
+            sent = self.sock.send(self.outbox)
+        except socket.error as e:
+            if e.args and e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                sent = 0
+            else:
+                raise
+        self.outbox = self.outbox[sent:]
+
+    def stats(self):
+        stats = dict(self.reader.stats())
+        stats.update(priority=self.priority, applied=self.applied, ignored=self.ignored)
+        return stats
+
+
+class PoseServer(object):
+    def __init__(self, commander, listeners, policy="newest", hold_time=0.5,
+                 client_timeout=None, sync_interval=SYNC_INTERVAL):
+        """
+        Args:
+            commander: motion_commands.JointCommander
+            listeners: Lista de (host, puerto, prioridad)
+            hold_time: Con "priority", segundos que un cliente conserva el control
+                despues de su ultima pose
+            client_timeout: Segundos sin datos tras los que se cierra un cliente
+                (None = nunca; util con conexiones medio abiertas)
+        """
+        if policy not in POLICIES:
+            raise ValueError("Politica de arbitraje desconocida: {}".format(policy))
+        self.commander = commander
+        self.policy = policy
+        self.hold_time = hold_time
+        self.client_timeout = client_timeout
+        self.sync_interval = sync_interval
+        self.listeners = {}
+        self.clients = {}
+        self.running = True
+
+        self.accepted = 0
+        self.disconnected = 0
+
+        for host, port, priority in listeners:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((host, port))
+            listener.listen(5)
+            listener.setblocking(False)
+            self.listeners[listener] = priority
+            print(" Esperando conexiones del sistema de vision en {}:{} (prioridad {})".format(
+                host, listener.getsockname()[1], priority))
+
+    def _accept(self, listener):
+        try:
+            sock, address = listener.accept()
+        except socket.error:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.clients[sock] = ClientConnection(sock, address, self.listeners[listener])
+        self.accepted += 1
+        print(" Conectado por {} (prioridad {}, {} clientes)".format(
+            address, self.listeners[listener], len(self.clients)))
+
+    def _drop(self, client, reason):
+        del self.clients[client.sock]
+        client.sock.close()
+        self.disconnected += 1
+        print(u" Cliente {} desconectado ({}). Frames: {}".format(client.address, reason, client.stats()))
+
+    def _owner(self, now):
+        """Cliente activo de mayor prioridad (politica "priority")"""
+        owner = None
+        for client in self.clients.values():
+            if client.last_pose_time is None or now - client.last_pose_time > self.hold_time:
+                continue
+            if owner is None or client.priority > owner.priority:
+                owner = client
+        return owner
+
+    def _read(self, client):
+        try:
+            closed = not client.reader.recv()
+        except socket.error as e:
+            if e.args and e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            self._drop(client, str(e))
+            return
+
+        # Lo recibido antes del cierre todavia se procesa
+        now = time.time()
+        client.last_activity = now
+        pose = client.reader.pop_latest()
+        if pose is not None:
+            self._arbitrate(client, pose, now, reply=not closed)
+        if closed:
+            self._drop(client, "cerrado")
+
+    def _arbitrate(self, client, pose, now, reply=True):
+        owner = self._owner(now) if self.policy == "priority" else None
+        client.last_pose_time = now
+        if owner is not None and owner.priority > client.priority:
+            client.ignored += 1
+        else:
+            client.applied += 1
+            self.commander.submit(pose, now)
+        # Un cliente ignorado también necesita sincronizar su reloj
+        if reply:
+            self._reply_sync(client, pose, now)
+
+    def _reply_sync(self, client, pose, receive_time):
+        timing = pose.get("Timing") if isinstance(pose, dict) else None
+        if (not self.sync_interval or not timing or timing.get("Send") is None or
+                receive_time - client.last_sync < self.sync_interval):
+            return
+        client.last_sync = receive_time
+        try:
+            client.send_nowait(tracing.sync_reply(timing["Send"], receive_time, time.time()))
+        except socket.error as e:
+            self._drop(client, str(e))
+
+    def _expire(self, now):
+        if self.client_timeout is None:
+            return
+        for client in list(self.clients.values()):
+            if now - client.last_activity > self.client_timeout:
+                self._drop(client, "sin datos por {:.0f} s".format(now - client.last_activity))
+
+    def poll(self, timeout):
+        """Una vuelta del bucle: espera hasta `timeout`, lee, arbitra y comanda"""
+        due = self.commander.time_until_due()
+        if due is not None:
+            timeout = due if timeout is None else min(timeout, due)
+        sockets = list(self.listeners) + list(self.clients)
+        pending = [client.sock for client in self.clients.values() if client.outbox]
+        readable, writable, _ = select.select(sockets, pending, [], timeout)
+        for sock in readable:
+            if sock in self.listeners:
+                self._accept(sock)
+            elif sock in self.clients:
+                self._read(self.clients[sock])
+        for sock in writable:
+            client = self.clients.get(sock)
+            if client is None:
+                continue  # Cerrado al leer
+            try:
+                client.flush()
+            except socket.error as e:
+                self._drop(client, str(e))
+        self.commander.flush()
+        self._expire(time.time())
+
+    def serve_forever(self, stats_interval=None, report=None):
+        """Atiende clientes hasta stop(); `report` se llama cada stats_interval segundos.
+
+        stop() se nota en la siguiente vuelta: sin stats_interval el select
+        puede esperar indefinidamente a que llegue algo.
+        """
+        last_stats = time.time()
+        while self.running:
+            self.poll(stats_interval)
+            now = time.time()
+            if report is not None and stats_interval and now - last_stats >= stats_interval:
+                report(self)
+                last_stats = now
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "accepted": self.accepted,
+            "disconnected": self.disconnected,
+            "per_client": dict(("{}:{}".format(*client.address), client.stats())
+                               for client in self.clients.values())
+        }
+
+    def close(self):
+        for client in list(self.clients.values()):
+            client.sock.close()
+        self.clients.clear()
+        for listener in self.listeners:
+            listener.close()
+
+
+def _self_test():
+    """Reconexion, prioridad y cliente detenido por localhost con un comando falso"""
+    import json
+    import threading
+
+    class Commander(object):
+        def __init__(self):
+            self.poses = []
+
+        def submit(self, pose, receive_time=None):
+            self.poses.append(pose["Source"])
+
+        def time_until_due(self):
+            return None
+
+        def flush(self):
+            return False
+
+    def message(source, send_time=None):
+        pose = {"Angles": {}, "Source": source}
+        if send_time is not None:
+            pose["Timing"] = tracing.make_timing(0, send_time, send=send_time)
+        return (json.dumps(pose) + "\n").encode("utf-8")
+
+    def connect(port):
+        return socket.create_connection(("127.0.0.1", port))
+
+    commander = Commander()
+    pose_server = PoseServer(commander, [("127.0.0.1", 0, 10), ("127.0.0.1", 0, 0)],
+                             policy="priority", hold_time=0.3)
+    ports = dict((priority, listener.getsockname()[1])
+                 for listener, priority in pose_server.listeners.items())
+    high_port, low_port = ports[10], ports[0]
+
+    thread = threading.Thread(target=pose_server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+
+    # Un cliente que se conecta y nunca envia no afecta a los demas
+    stalled = connect(high_port)
+    vision = connect(high_port)
+    replay = connect(low_port)
+    vision.sendall(message("vision", time.time()))
+    time.sleep(0.1)
+    replay.sendall(message("replay", time.time()))  # Ignorado: vision tiene el control
+    time.sleep(0.1)
+    assert commander.poses == ["vision"], commander.poses
+    assert b"SyncReply" in vision.recv(4096)
+    assert b"SyncReply" in replay.recv(4096)  # Aun ignorado recibe la sincronizacion
+
+    # La vision se "reinicia": sin su conexion la repeticion pasa a mandar
+    vision.close()
+    time.sleep(0.1)
+    replay.sendall(message("replay"))
+    time.sleep(0.1)
+    vision = connect(high_port)
+    vision.sendall(message("vision"))
+    time.sleep(0.1)
+    assert commander.poses == ["vision", "replay", "vision"], commander.poses
+    assert pose_server.accepted == 4 and pose_server.disconnected == 1
+
+    pose_server.stop()
+    thread.join(1.0)
+    for sock in (stalled, vision, replay):
+        sock.close()
+    pose_server.close()
+    print("server OK: {}".format(pose_server.stats()))
+
+
+if __name__ == "__main__":
+    _self_test()
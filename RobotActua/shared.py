@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Acceso a los modulos compartidos con el sistema de vision (Imitacion/outputModule)."""
+import os
+import sys
+
+OUTPUT_MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "..", "Imitacion", "outputModule")
+if OUTPUT_MODULE_DIR not in sys.path:
+    sys.path.append(OUTPUT_MODULE_DIR)
+
+import protocol  # noqa: E402
+import tracing  # noqa: E402
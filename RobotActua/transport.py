@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Recepcion de poses por UDP con numeros de secuencia (compatible con Python 2.7).
+
+Cada datagrama lleva una sola muestra de pose: un paquete binario de
+protocol.py o un JSON con los campos "Sequence" y "Timestamp". Se descartan
+los paquetes fuera de orden, duplicados o demasiado viejos y se acumulan
+estadisticas de perdida y reordenamiento.
+"""
+import json
+import select
+import socket
+import time
+
+from shared import protocol
+
+DATAGRAM_SIZE = 65536
+SEQUENCE_MODULO = 1 << 32
+RESYNC_GAP = 1000  # Salto hacia atras mayor + timestamp mas nuevo = reinicio del emisor
+
+
+def decode_datagram(datagram):
+    """Devuelve (secuencia, timestamp, pose) de un datagrama binario o JSON"""
+    if datagram[:len(protocol.MAGIC)] == protocol.MAGIC:
+        pose = protocol.decode_to_output(datagram)
+    else:
+        pose = json.loads(datagram.decode("utf-8"))
+    sequence = pose.get("Sequence")
+    if sequence is None:
+        raise ValueError("Datagrama sin numero de secuencia")
+    return int(sequence), pose.get("Timestamp"), pose
+
+
+def sequence_delta(sequence, last):
+    """Diferencia con signo entre secuencias de 32 bits (aritmetica de numeros de serie)"""
+    delta = (sequence - last) % SEQUENCE_MODULO
+    if delta >= SEQUENCE_MODULO // 2:
+        delta -= SEQUENCE_MODULO
+    return delta
+
+
+class UdpPoseReceiver(object):
+    def __init__(self, host, port, max_age=None):
+        """
+        Args:
+            max_age: Segundos maximos entre captura y recepcion (None = sin limite).
+                Solo tiene sentido si ambos procesos comparten reloj.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.max_age = max_age
+        self.last_sequence = None
+        self.last_timestamp = None
+        self.last_address = None  # Emisor de la ultima pose aceptada (para responderle)
+
+        # Estadisticas
+        self.received = 0
+        self.accepted = 0
+        self.superseded = 0   # Validos pero reemplazados por uno mas nuevo del mismo lote
+        self.out_of_order = 0
+        self.duplicates = 0
+        self.stale = 0
+        self.invalid = 0
+        self.lost = 0
+        self.resyncs = 0
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def receive(self, timeout=None):
+        """Espera datagramas, vacia el socket y devuelve la pose mas nueva o None"""
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return None
+
+        newest = None
+        while True:
+            try:
+                datagram, address = self.sock.recvfrom(DATAGRAM_SIZE)
+            except socket.error:
+                break  # Socket vacio
+            self.received += 1
+            try:
+                sequence, timestamp, pose = decode_datagram(datagram)
+            except ValueError:
+                self.invalid += 1
+                continue
+
+            if not self._accept(sequence, timestamp):
+                continue
+            if newest is not None:
+                self.superseded += 1
+            newest = pose
+            self.last_address = address
+
+        if newest is not None:
+            self.accepted += 1
+        return newest
+
+    def _accept(self, sequence, timestamp):
+        if self.max_age is not None and timestamp is not None:
+            if time.time() - timestamp > self.max_age:
+                self.stale += 1
+                return False
+
+        if self.last_sequence is not None:
+            delta = sequence_delta(sequence, self.last_sequence)
+            if delta == 0:
+                self.duplicates += 1
+                return False
+            if delta < 0:
+                # Solo un emisor reiniciado trae una captura mas nueva; un
+                # datagrama viejo o perdido no debe mover last_sequence
+                if (-delta <= RESYNC_GAP or timestamp is None or self.last_timestamp is None or
+                        timestamp <= self.last_timestamp):
+                    self.out_of_order += 1
+                    return False
+                self.resyncs += 1
+            elif delta > 1:
+                self.lost += delta - 1
+
+        self.last_sequence = sequence
+        self.last_timestamp = timestamp
+        return True
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "accepted": self.accepted,
+            "superseded": self.superseded,
+            "out_of_order": self.out_of_order,
+            "duplicates": self.duplicates,
+            "stale": self.stale,
+            "invalid": self.invalid,
+            "lost": self.lost,
+            "resyncs": self.resyncs
+        }
+
+    def close(self):
+        self.sock.close()
+
+
+def _self_test():
+    """Prueba por localhost: perdida, reordenamiento, duplicados, datagrama viejo, reinicio y JSON"""
+    receiver = UdpPoseReceiver("127.0.0.1", 0)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    radians = [0.0] * protocol.NUM_JOINTS
+    try:
+        def send(sequence, timestamp=None):
+            timestamp = time.time() if timestamp is None else timestamp
+            sender.sendto(protocol.encode(radians, sequence, timestamp), receiver.address)
+
+        for sequence in (0, 1, 3):  # se pierde el 2
+            send(sequence)
+        time.sleep(0.05)
+        pose = receiver.receive(timeout=1.0)
+        assert pose["Sequence"] == 3, pose["Sequence"]
+
+        send(2)  # llega tarde
+        send(3)  # duplicado
+        sender.sendto(json.dumps({"Sequence": 4, "Angles": {}}).encode("utf-8"), receiver.address)
+        time.sleep(0.05)
+        pose = receiver.receive(timeout=1.0)
+        assert pose["Sequence"] == 4
+
+        send(5000)
+        send(5001)
+        time.sleep(0.05)
+        pose = receiver.receive(timeout=1.0)
+        assert pose["Sequence"] == 5001
+
+        # Datagrama viejo a mitad del flujo: se descarta sin mover last_sequence
+        send(3000, time.time() - 60.0)
+        send(5002)
+        time.sleep(0.05)
+        pose = receiver.receive(timeout=1.0)
+        assert pose["Sequence"] == 5002 and receiver.last_sequence == 5002
+
+        send(1)  # reinicio del emisor: secuencia baja con captura mas nueva
+        time.sleep(0.05)
+        pose = receiver.receive(timeout=1.0)
+        assert pose["Sequence"] == 1
+
+        stats = receiver.stats()
+        assert stats["lost"] == 1 + 4995, stats
+        assert stats["out_of_order"] == 2 and stats["duplicates"] == 1, stats
+        assert stats["superseded"] == 3 and stats["resyncs"] == 1, stats
+        print("transport OK {}".format(stats))
+    finally:
+        sender.close()
+        receiver.close()
+
+
+if __name__ == "__main__":
+    _self_test()